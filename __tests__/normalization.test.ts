@@ -0,0 +1,30 @@
+import { describe, test, expect, mock } from 'bun:test';
+import golden from './fixtures/normalization-golden.json';
+
+// artistService imports the app's Supabase client (AsyncStorage, expo-constants);
+// only the pure normalization functions are under test here.
+mock.module('../lib/supabase/client', () => ({
+  supabase: {},
+  isSupabaseConfigured: () => false,
+}));
+
+const { normalizeText, generateSlug } = await import('../lib/supabase/artistService');
+
+// The same corpus is checked against scripts/text_normalization.py by
+// scripts/tests/test_text_normalization.py. The keys match except where the
+// Python scripts keep non-ASCII letters this \w drops; the cleanup leaves
+// such keys out of merges. Regenerate with
+// node scripts/generate-normalization-golden.mjs.
+describe('normalization golden corpus', () => {
+  test.each(golden.cases.map((c) => [c.input, c.normalized]))(
+    'normalizeText(%p)', (input, expected) => {
+      expect(normalizeText(input)).toBe(expected);
+    },
+  );
+
+  test.each(golden.cases.map((c) => [c.input, c.slug]))(
+    'generateSlug(%p)', (input, expected) => {
+      expect(generateSlug(input)).toBe(expected);
+    },
+  );
+});
@@ -0,0 +1,8 @@
+// Generated by scripts/mocks_writer.py. Do not edit; re-run the importer instead.
+import { SetList } from '@/types';
+import { reviveSet, ScrapedSetRecord } from './revive';
+
+// Shards hold sets oldest first; the library lists the newest first
+const records: ScrapedSetRecord[] = [];
+
+export const scrapedSetLists: SetList[] = records.reverse().map(reviveSet);
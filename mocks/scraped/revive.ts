@@ -0,0 +1,19 @@
+import { SetList, Track } from '@/types';
+
+/**
+ * Sets as stored in the generated shards (sets-NNNN.ts): plain JSON, so the
+ * dates are ISO strings until revived.
+ */
+export type ScrapedTrackRecord = Omit<Track, 'addedAt'> & { addedAt: string };
+export type ScrapedSetRecord = Omit<SetList, 'date' | 'tracks'> & {
+  date: string;
+  tracks: ScrapedTrackRecord[];
+};
+
+export function reviveSet(record: ScrapedSetRecord): SetList {
+  return {
+    ...record,
+    date: new Date(record.date),
+    tracks: record.tracks.map((track) => ({ ...track, addedAt: new Date(track.addedAt) })),
+  };
+}
@@ -1,4 +1,5 @@
 import { Track, SetList, SocialComment, User, UserContribution } from '@/types';
+import { scrapedSetLists } from './scraped';
 
 export const mockTracks: Track[] = [
   {
@@ -175,6 +176,7 @@ export const mockTracks: Track[] = [
 ];
 
 export const mockSetLists: SetList[] = [
+  ...scrapedSetLists,
 // Auto-generated imported sets
 // Generated: 2026-01-22T23:50:12.958Z
 
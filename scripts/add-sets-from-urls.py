@@ -10,9 +10,6 @@ Usage:
 """
 
 import sys
-import json
-import re
-from datetime import datetime
 from pathlib import Path
 
 # Add the 1001-tracklists-api to path
@@ -28,23 +25,14 @@ except ImportError as e:
     print("   cd 1001-tracklists-api && python3 -m pip install --target . beautifulsoup4 requests fake-headers")
     sys.exit(1)
 
-def parse_timestamp(timestamp_str):
-    """Parse timestamp string (e.g., '1:23:45' or '23:45') to seconds"""
-    if not timestamp_str:
-        return 0
-    
-    parts = timestamp_str.split(':')
-    if len(parts) == 3:
-        return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-    elif len(parts) == 2:
-        return int(parts[0]) * 60 + int(parts[1])
-    return 0
+from mocks_writer import add_sets
+from tracklist_cache import load_tracklist
 
 def scrape_set_from_url(url):
     """Scrape a single set from a 1001tracklists URL"""
     try:
         print(f"  Scraping: {url}")
-        tl = Tracklist(url)
+        tl = load_tracklist(url, Tracklist)
         
         # Extract artist (DJ)
         artist = 'Unknown Artist'
@@ -91,95 +79,6 @@ def scrape_set_from_url(url):
         print(f"    ✗ Error: {e}")
         return None
 
-def convert_to_typescript_format(sets_data):
-    """Convert scraped sets to TypeScript format for mocks/tracks.ts"""
-    
-    sets_code = []
-    base_time = int(datetime.now().timestamp() * 1000)
-    
-    for i, set_data in enumerate(sets_data):
-        if not set_data or not set_data.get('tracks'):
-            continue
-        
-        # Format tracks
-        tracks_code = []
-        for j, track in enumerate(set_data['tracks']):
-            timestamp_seconds = parse_timestamp(track['timestamp'])
-            track_code = f"""    {{
-      id: "luke-dean-{base_time}-{i}-{j}",
-      title: {json.dumps(track['title'])},
-      artist: {json.dumps(track['artist'])},
-      timestamp: {timestamp_seconds},
-      duration: 0,
-      coverUrl: {json.dumps('https://images.unsplash.com/photo-1493225457124-a3eb161ffa5f?w=300&h=300&fit=crop')},
-      addedAt: new Date("{datetime.now().isoformat()}"),
-      source: "link",
-      verified: false,
-    }}"""
-            tracks_code.append(track_code)
-        
-        # Format set
-        set_code = f"""  {{
-    id: "luke-dean-{base_time}-{i}",
-    name: {json.dumps(set_data['title'])},
-    artist: {json.dumps(set_data['artist'])},
-    {f'venue: {json.dumps(set_data["venue"])},' if set_data.get("venue") else ''}
-    date: new Date("{set_data.get('date', datetime.now().isoformat())}"),
-    tracks: [
-{chr(10).join(tracks_code)}
-    ],
-    {f'coverUrl: {json.dumps(set_data["thumbnail"])},' if set_data.get("thumbnail") else ''}
-    sourceLinks: [{json.dumps({'platform': '1001tracklists', 'url': set_data['url']})}],
-    totalDuration: 0,
-    aiProcessed: false,
-    commentsScraped: 0,
-    tracksIdentified: {len(set_data['tracks'])},
-    plays: 0,
-  }}"""
-        sets_code.append(set_code)
-    
-    return ',\n'.join(sets_code)
-
-def add_to_mocks_file(sets_code):
-    """Add the sets to mocks/tracks.ts"""
-    mocks_path = Path(__file__).parent.parent / 'mocks' / 'tracks.ts'
-    
-    if not mocks_path.exists():
-        print(f"❌ mocks/tracks.ts not found at {mocks_path}")
-        return False
-    
-    content = mocks_path.read_text(encoding='utf-8')
-    
-    # Find the mockSetLists array
-    pattern = r'(export const mockSetLists[^=]*=\s*\[)'
-    match = re.search(pattern, content)
-    
-    if not match:
-        print("❌ Could not find mockSetLists export")
-        return False
-    
-    array_start = match.end()
-    
-    # Find the closing bracket
-    bracket_count = 0
-    array_end = array_start
-    for i in range(array_start, len(content)):
-        if content[i] == '[':
-            bracket_count += 1
-        elif content[i] == ']':
-            bracket_count -= 1
-            if bracket_count == 0:
-                array_end = i
-                break
-    
-    # Insert new sets at the beginning
-    before = content[:array_start + 1]
-    after = content[array_start + 1:array_end]
-    new_content = before + '\n' + sets_code + (',\n' + after if after.strip() else '') + content[array_end:]
-    
-    mocks_path.write_text(new_content, encoding='utf-8')
-    return True
-
 def main():
     if len(sys.argv) < 2:
         print("Usage:")
@@ -189,6 +88,10 @@ def main():
         print('  python3 scripts/add-sets-from-urls.py "https://www.1001tracklists.com/tracklist/..."')
         sys.exit(1)
     
+    # Library fetches share one connection pool and the host-wide request budget
+    from tracklist_http import use_pooled_session
+    use_pooled_session()
+
     # Get URLs
     urls = []
     if sys.argv[1] == '--file':
@@ -222,12 +125,14 @@ def main():
     print(f"\n✓ Successfully scraped {len(all_sets)} sets")
     print(f"  Total tracks: {sum(len(s['tracks']) for s in all_sets)}\n")
     
-    # Convert to TypeScript format
-    sets_code = convert_to_typescript_format(all_sets)
-    
-    # Add to mocks file
-    if add_to_mocks_file(sets_code):
-        print("✓ Added sets to mocks/tracks.ts")
+    # Append to the generated set library (mocks/scraped/, spread into mocks/tracks.ts)
+    try:
+        added = add_sets(all_sets, id_prefix="luke-dean")
+    except (OSError, ValueError) as e:
+        print(f"❌ Failed to add sets to mocks library: {e}")
+        return
+    if added:
+        print(f"✓ Added {added} sets to mocks/scraped (mockSetLists)")
         print("\n========================================")
         print("Complete!")
         print("========================================\n")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Per-artist changes to the denormalized tracks_count / sets_count.
+
+Scripts that add, move or delete tracks and sets record what they changed
+here instead of leaving the counts to a full recount:
+
+- the import path (daily_house_sync.py): +1 set for a new set's artist,
+  +1 track for each new track's artist
+- the cleanup merges (daily_db_cleanup.py): tracks and sets moved onto a
+  canonical artist, tracks and sets deleted as duplicates
+
+Deltas are summed per artist in memory and written to the
+artist_count_deltas journal (supabase/migrations/030_artist_count_deltas.sql)
+with one insert. The cleanup's counts phase applies the journal with
+apply_artist_count_deltas(), one batched UPDATE over the affected artists.
+"""
+
+import threading
+from collections import defaultdict
+
+DELTA_TABLE = "artist_count_deltas"
+INSERT_CHUNK_SIZE = 500
+
+
+class CountDeltas:
+    """Summed tracks/sets count changes per artist id, safe to add to from threads."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self._deltas = defaultdict(lambda: [0, 0])
+        self._lock = threading.Lock()
+
+    def add(self, artist_id: str, tracks: int = 0, sets: int = 0):
+        if not artist_id or not (tracks or sets):
+            return
+        with self._lock:
+            delta = self._deltas[artist_id]
+            delta[0] += tracks
+            delta[1] += sets
+
+    def rows(self) -> list:
+        """Non-zero deltas as artist_count_deltas rows (without `source`)."""
+        with self._lock:
+            return [{"artist_id": artist_id, "tracks_delta": tracks, "sets_delta": sets}
+                    for artist_id, (tracks, sets) in sorted(self._deltas.items()) if tracks or sets]
+
+    def clear(self):
+        with self._lock:
+            self._deltas.clear()
+
+    def flush(self, supabase) -> int:
+        """Journal the pending deltas and clear them. Returns the rows written."""
+        with self._lock:
+            rows = [{"artist_id": artist_id, "tracks_delta": tracks, "sets_delta": sets, "source": self.source}
+                    for artist_id, (tracks, sets) in sorted(self._deltas.items()) if tracks or sets]
+            self._deltas.clear()
+        for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+            try:
+                supabase.table(DELTA_TABLE).insert(rows[i:i + INSERT_CHUNK_SIZE]).execute()
+            except Exception:
+                # Keep what wasn't written for the next flush
+                for row in rows[i:]:
+                    self.add(row["artist_id"], row["tracks_delta"], row["sets_delta"])
+                raise
+        return len(rows)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the string similarity kernel against the old full-matrix Levenshtein.
+
+Generates artist names and track titles at realistic lengths, with typo
+variants, and reports pairs/sec for each implementation.
+
+Usage:
+    python scripts/bench_string_similarity.py [--candidates N] [--queries N]
+"""
+
+import random
+import string
+import time
+import argparse
+
+import string_similarity as ss
+
+ARTIST_WORDS = ["chris", "stussy", "luke", "dean", "sonny", "fodera", "max", "marsolo", "rossi",
+                "alisha", "robbie", "doherty", "ranger", "trucco", "locklead", "dj", "east", "end",
+                "dubs", "mk", "kerri", "chandler", "jamie", "jones", "solardo", "fisher"]
+TITLE_WORDS = ["first", "light", "seen", "it", "all", "subsonic", "deep", "in", "the", "night",
+               "groove", "feel", "body", "move", "on", "my", "mind", "original", "mix", "extended",
+               "dub", "edit", "remix", "vip", "warehouse", "sunrise"]
+
+
+def make_corpus(words: list, min_words: int, max_words: int, size: int, rng: random.Random) -> list:
+    corpus = []
+    for _ in range(size):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(min_words, max_words)))
+        if rng.random() < 0.3:  # typo variant
+            i = rng.randrange(len(text))
+            text = text[:i] + rng.choice(string.ascii_lowercase) + text[i + 1:]
+        corpus.append(text)
+    return corpus
+
+
+def matrix_similarity(s1: str, s2: str) -> float:
+    """The previous implementation: full (len1+1) x (len2+1) list-of-lists matrix."""
+    if s1 == s2:
+        return 1.0
+    len1, len2 = len(s1), len(s2)
+    if len1 == 0 or len2 == 0:
+        return 0.0
+    matrix = [[0] * (len2 + 1) for _ in range(len1 + 1)]
+    for i in range(len1 + 1):
+        matrix[i][0] = i
+    for j in range(len2 + 1):
+        matrix[0][j] = j
+    for i in range(1, len1 + 1):
+        for j in range(1, len2 + 1):
+            cost = 0 if s1[i - 1] == s2[j - 1] else 1
+            matrix[i][j] = min(
+                matrix[i - 1][j] + 1,
+                matrix[i][j - 1] + 1,
+                matrix[i - 1][j - 1] + cost,
+            )
+    return 1 - matrix[len1][len2] / max(len1, len2)
+
+
+def bench(label: str, fn, queries: list, candidates: list) -> float:
+    start = time.perf_counter()
+    fn(queries, candidates)
+    elapsed = time.perf_counter() - start
+    rate = len(queries) * len(candidates) / elapsed
+    print(f"  {label:<34} {elapsed:8.3f}s  {rate:>12,.0f} pairs/s")
+    return rate
+
+
+def run(name: str, corpus: list, n_queries: int, threshold: float):
+    rng = random.Random(7)
+    queries = rng.sample(corpus, n_queries)
+    avg_len = sum(map(len, corpus)) / len(corpus)
+    print(f"\n{name}: {n_queries} queries x {len(corpus)} candidates (avg length {avg_len:.1f})")
+
+    # The matrix version is slow; time it on a slice and compare rates
+    matrix_candidates = corpus[: max(1, len(corpus) // 20)]
+    base = bench("full matrix (old)", lambda qs, cs: [matrix_similarity(q, c) for q in qs for c in cs],
+                 queries, matrix_candidates)
+    rate = bench("myers", lambda qs, cs: [ss.similarity(q, c) for q in qs for c in cs],
+                 queries, corpus)
+    print(f"  {'':<34} {rate / base:8.1f}x")
+    rate = bench(f"myers, early exit at {threshold}",
+                 lambda qs, cs: [ss.similarity(q, c, threshold) for q in qs for c in cs],
+                 queries, corpus)
+    print(f"  {'':<34} {rate / base:8.1f}x")
+    if ss.np is not None:
+        rate = bench("similarities() one-vs-many (numpy)",
+                     lambda qs, cs: [ss.similarities(q, cs) for q in qs], queries, corpus)
+        print(f"  {'':<34} {rate / base:8.1f}x")
+    else:
+        print("  (numpy not installed: skipping the batch path)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark string similarity implementations")
+    parser.add_argument("--candidates", type=int, default=5000, help="Candidates per query (default: 5000)")
+    parser.add_argument("--queries", type=int, default=50, help="Number of queries (default: 50)")
+    parser.add_argument("--threshold", type=float, default=0.9, help="Early-exit threshold (default: 0.9)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    run("Artist names", make_corpus(ARTIST_WORDS, 1, 3, args.candidates, rng), args.queries, args.threshold)
+    run("Track titles", make_corpus(TITLE_WORDS, 2, 6, args.candidates, rng), args.queries, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,758 @@
+#!/usr/bin/env python3
+"""
+Offline snapshots and reviewed plans for daily_db_cleanup.py.
+
+Instead of running the cleanup phases against production:
+
+1. The tables the phases read are dumped into a local SQLite file
+   (write_snapshot).
+2. The phases run against a scratch copy of it through SnapshotClient, which
+   answers the same supabase query-builder calls with SQL. Every write is
+   applied to the scratch copy (so later phases see earlier merges, exactly
+   as they would live) and recorded as one line of a JSONL plan.
+3. apply_plan() replays a reviewed plan against the live database in bulk,
+   with optimistic checks: a row the plan expects to change must still have
+   the updated_at it had in the snapshot, otherwise the op (or the whole
+   merge it belongs to) is skipped and reported.
+
+Plan lines:
+    {"kind": "unit", "unit": 3, "phase": "track_dedup", "label": "...",
+     "expect": {"tracks": {"<id>": "<updated_at>", ...}}}
+    {"kind": "op", "seq": 17, "phase": "track_dedup", "unit": 3, "table": "tracks",
+     "op": "update", "values": {...}, "filters": [["eq", "id", "<id>"]],
+     "expect": {"<id>": "<updated_at>"}}
+
+A unit groups the ops of one merge. Its rows are checked once, before its
+first op, and the unit is skipped whole if any changed; that check is only
+optimistic, since a row can still change while the ops run. The ops are
+then sent one request at a time, with no transaction (PostgREST has none):
+if one fails, the earlier ops of the unit stay applied. The unit is reported
+under "conflicts" either way, and those merges are planned again from a
+fresh snapshot.
+"""
+
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+
+SNAPSHOT_TABLES = ("artists", "artist_aliases", "tracks", "track_aliases", "sets", "set_tracks",
+                   "artist_count_deltas")
+SNAPSHOT_INDEXES = {
+    "artists": ("name_normalized", "updated_at"),
+    "artist_aliases": ("artist_id", "alias_lower"),
+    "tracks": ("title_normalized", "artist_id", "updated_at"),
+    "track_aliases": ("track_id", "title_alias_normalized"),
+    "sets": ("external_id", "name_normalized", "artist_id", "updated_at"),
+    "set_tracks": ("set_id", "track_id", "raw_artist", "created_at"),
+}
+# Tables with an updated_at trigger: the version an optimistic check compares
+VERSIONED_TABLES = {"artists", "tracks", "sets"}
+
+APPLY_CHUNK_SIZE = 100      # ids per in_() filter when applying / checking
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _kind_of(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (dict, list)):
+        return "json"
+    return "value"
+
+
+# ---------------------------------------------------------------------------
+# SQLite store
+# ---------------------------------------------------------------------------
+
+class _Store:
+    """Tables of JSON-ish rows in SQLite, with the JSON type of each column
+    remembered so booleans and json columns come back as they went in."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        conn.execute("CREATE TABLE IF NOT EXISTS _columns (tbl TEXT, col TEXT, kind TEXT, PRIMARY KEY (tbl, col))")
+        conn.execute("CREATE TABLE IF NOT EXISTS _meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.columns = {}
+        for tbl, col, kind in conn.execute("SELECT tbl, col, kind FROM _columns ORDER BY rowid"):
+            self.columns.setdefault(tbl, {})[col] = kind
+
+    def ensure_table(self, table: str):
+        if table not in self.columns:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} (id PRIMARY KEY)")
+            self.conn.execute("INSERT OR REPLACE INTO _columns VALUES (?, 'id', 'null')", (table,))
+            self.columns[table] = {"id": "null"}
+
+    def ensure_columns(self, table: str, row_or_columns):
+        """Add missing columns; with a row, also record the kinds of its values."""
+        self.ensure_table(table)
+        known = self.columns[table]
+        items = row_or_columns.items() if isinstance(row_or_columns, dict) else ((c, None) for c in row_or_columns)
+        for col, value in items:
+            kind = _kind_of(value)
+            if col not in known:
+                self.conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(col)}")
+                known[col] = kind
+                self.conn.execute("INSERT OR REPLACE INTO _columns VALUES (?, ?, ?)", (table, col, kind))
+            elif known[col] == "null" and kind != "null":
+                known[col] = kind
+                self.conn.execute("UPDATE _columns SET kind = ? WHERE tbl = ? AND col = ?", (kind, table, col))
+
+    def encode(self, value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    def decode_row(self, table: str, names: list, values) -> dict:
+        kinds = self.columns[table]
+        row = {}
+        for name, value in zip(names, values):
+            kind = kinds.get(name)
+            if value is not None and kind == "bool":
+                value = bool(value)
+            elif value is not None and kind == "json":
+                value = json.loads(value)
+            row[name] = value
+        return row
+
+    def insert_rows(self, table: str, rows: list, replace: bool = False):
+        for row in rows:
+            self.ensure_columns(table, row)
+        verb = "INSERT OR REPLACE" if replace else "INSERT"
+        for row in rows:
+            cols = list(row)
+            self.conn.execute(
+                f"{verb} INTO {_quote(table)} ({', '.join(map(_quote, cols))}) "
+                f"VALUES ({', '.join('?' * len(cols))})",
+                [self.encode(row[c]) for c in cols],
+            )
+
+    def select(self, table: str, columns: list, where: str, params: list, order: list = (),
+               limit: int = None, offset: int = None) -> list:
+        self.ensure_columns(table, columns)
+        sql = f"SELECT {', '.join(map(_quote, columns))} FROM {_quote(table)} WHERE {where}"
+        if order:
+            sql += " ORDER BY " + ", ".join(order)
+        if limit is not None or offset:
+            sql += f" LIMIT {-1 if limit is None else int(limit)} OFFSET {int(offset or 0)}"
+        return [self.decode_row(table, columns, r) for r in self.conn.execute(sql, params)]
+
+    def count(self, table: str, where: str, params: list) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {_quote(table)} WHERE {where}", params).fetchone()[0]
+
+
+def write_snapshot(path, tables: dict, batch_size: int = 1000) -> dict:
+    """
+    Write {table: iterable of rows} to a new SQLite snapshot at `path`
+    (replaced atomically). Returns row counts per table.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    conn = sqlite3.connect(tmp_path)
+    store = _Store(conn)
+    counts = {}
+    for table, rows in tables.items():
+        store.ensure_table(table)
+        batch = []
+        counts[table] = 0
+        for row in rows:
+            batch.append(dict(row))
+            if len(batch) >= batch_size:
+                store.insert_rows(table, batch)
+                counts[table] += len(batch)
+                batch = []
+        store.insert_rows(table, batch)
+        counts[table] += len(batch)
+        for col in SNAPSHOT_INDEXES.get(table, ()):
+            if col in store.columns[table]:
+                conn.execute(f"CREATE INDEX {_quote(f'idx_{table}_{col}')} ON {_quote(table)} ({_quote(col)})")
+    conn.execute("INSERT OR REPLACE INTO _meta VALUES ('taken_at', ?)",
+                 (datetime.now(timezone.utc).isoformat(),))
+    conn.execute("INSERT OR REPLACE INTO _meta VALUES ('row_counts', ?)", (json.dumps(counts),))
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, path)
+    return counts
+
+
+def snapshot_info(path) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM _meta"))
+    finally:
+        conn.close()
+    return {"taken_at": meta.get("taken_at"), "row_counts": json.loads(meta.get("row_counts", "{}"))}
+
+
+# ---------------------------------------------------------------------------
+# Query builder over the snapshot
+# ---------------------------------------------------------------------------
+
+_COMPARISONS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _split_top_level(expr: str) -> list:
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(expr):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(expr[start:i])
+            start = i + 1
+    parts.append(expr[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _like_sql(column: str, pattern: str) -> tuple:
+    """PostgREST like ("*" or "%" any run, "_" one char, "\\" escapes; case-sensitive) as a SQLite GLOB."""
+    glob, chars = [], iter(pattern)
+    for ch in chars:
+        if ch in "*%":
+            glob.append("*")
+        elif ch == "_":
+            glob.append("?")
+        else:
+            if ch == "\\":
+                ch = next(chars, ch)
+            glob.append(f"[{ch}]" if ch in "*?[" else ch)
+    return f"{_quote(column)} GLOB ?", ["".join(glob)]
+
+
+def _logic_sql(expr: str, joiner: str) -> tuple:
+    """PostgREST logic tree ("a.gt.1,and(a.eq.1,id.gt.x)") to SQL."""
+    clauses, params = [], []
+    for item in _split_top_level(expr):
+        nested = re.fullmatch(r"(and|or)\((.*)\)", item, re.S)
+        if nested:
+            sql, sub = _logic_sql(nested.group(2), nested.group(1).upper())
+        else:
+            column, op, value = item.split(".", 2)
+            if len(value) > 1 and value[0] == value[-1] == '"':
+                value = re.sub(r"\\(.)", r"\1", value[1:-1], flags=re.S)
+            if op == "is":
+                sql, sub = f"{_quote(column)} IS NULL", []
+            elif op == "like":
+                sql, sub = _like_sql(column, value)
+            else:
+                sql, sub = f"{_quote(column)} {_COMPARISONS[op]} ?", [value]
+        clauses.append(f"({sql})")
+        params.extend(sub)
+    return f" {joiner} ".join(clauses), params
+
+
+class SnapshotResponse:
+    def __init__(self, data: list, count: int = None):
+        self.data = data
+        self.count = count
+
+
+class SnapshotQuery:
+    """The subset of the postgrest query builder the cleanup phases use."""
+
+    def __init__(self, client: "SnapshotClient", table: str):
+        self._client = client
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._count = None
+        self._payload = None
+        self._on_conflict = None
+        self._filters = []      # (op, column, value), as recorded in the plan
+        self._negate_next = False
+        self._order = []
+        self._limit = None
+        self._offset = None
+
+    # -- operations --
+    def select(self, columns: str = "*", count: str = None):
+        self._op, self._columns, self._count = "select", columns, count
+        return self
+
+    def update(self, values: dict):
+        self._op, self._payload = "update", values
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    def insert(self, rows):
+        self._op, self._payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: str = "id", **_):
+        self._op, self._payload, self._on_conflict = "upsert", rows, on_conflict
+        return self
+
+    # -- filters --
+    def _filter(self, op: str, column: str, value):
+        if self._negate_next:
+            op, self._negate_next = "not." + op, False
+        self._filters.append((op, column, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column, value):
+        return self._filter("neq", column, value)
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column, value):
+        return self._filter("lte", column, value)
+
+    def in_(self, column, values):
+        return self._filter("in", column, list(values))
+
+    def is_(self, column, value):
+        return self._filter("is", column, value)
+
+    def like(self, column, pattern):
+        return self._filter("like", column, pattern)
+
+    def or_(self, expr: str):
+        return self._filter("or", None, expr)
+
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        # Postgres sorts NULLs last ascending and first descending
+        q = _quote(column)
+        self._order.append(f"{q} IS NULL DESC, {q} DESC" if desc else f"{q} IS NULL, {q}")
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    # -- SQL --
+    def _where(self) -> tuple:
+        clauses, params = [], []
+        for op, column, value in self._filters:
+            negate = op.startswith("not.")
+            op = op[4:] if negate else op
+            if op == "or":
+                sql, sub = _logic_sql(value, "OR")
+            elif op == "in":
+                sql = f"{_quote(column)} IN ({', '.join('?' * len(value))})" if value else "0"
+                sub = list(value)
+            elif op == "like":
+                sql, sub = _like_sql(column, value)
+            elif op == "is":
+                if value in (None, "null"):
+                    sql, sub = f"{_quote(column)} IS NULL", []
+                else:
+                    sql, sub = f"{_quote(column)} IS ?", [bool(value in (True, "true"))]
+            else:
+                sql, sub = f"{_quote(column)} {_COMPARISONS[op]} ?", [value]
+            clauses.append(f"NOT ({sql})" if negate else f"({sql})")
+            params.extend(sub)
+        return (" AND ".join(clauses) or "1"), params
+
+    def _filter_columns(self) -> list:
+        return [c for _, c, _ in self._filters if c]
+
+    def execute(self) -> SnapshotResponse:
+        return self._client._execute(self)
+
+
+# ---------------------------------------------------------------------------
+# Client and plan recording
+# ---------------------------------------------------------------------------
+
+class _SnapshotCore:
+    """State shared by a SnapshotClient and its per-phase views."""
+
+    def __init__(self, conn, plan_file):
+        self.conn = conn
+        self.store = _Store(conn)
+        self.lock = threading.RLock()
+        self.plan_file = plan_file
+        self.seq = 0
+        self.units = 0
+        self.ops = 0
+        self.local = threading.local()
+
+
+class SnapshotClient:
+    """
+    Stands in for a supabase Client: reads come from the scratch snapshot,
+    writes go to it and to the plan.
+    """
+
+    def __init__(self, core: _SnapshotCore, phase: str = None):
+        self._core = core
+        self.phase = phase
+
+    def for_phase(self, phase: str) -> "SnapshotClient":
+        return SnapshotClient(self._core, phase)
+
+    def table(self, name: str) -> SnapshotQuery:
+        return SnapshotQuery(self, name)
+
+    def rpc(self, fn: str, params: dict = None, **_):
+        raise NotImplementedError(f"rpc({fn!r}) can't be answered from a snapshot")
+
+    @property
+    def planned_ops(self) -> int:
+        return self._core.ops
+
+    # -- units --
+    @contextmanager
+    def begin_unit(self, label: str, table: str, ids: list):
+        core = self._core
+        with core.lock:
+            core.units += 1
+            unit = core.units
+            self._write_plan({"kind": "unit", "unit": unit, "phase": self.phase, "label": label,
+                              "expect": {table: self._versions(table, ids)}})
+        previous = getattr(core.local, "unit", None)
+        core.local.unit = unit
+        try:
+            yield unit
+        finally:
+            core.local.unit = previous
+
+    def _versions(self, table: str, ids) -> dict:
+        """Snapshot updated_at per id (versioned tables only)."""
+        ids = sorted({i for i in ids if i})
+        if table not in VERSIONED_TABLES or not ids:
+            return {}
+        store = self._core.store
+        versions = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            for row in store.select(table, ["id", "updated_at"],
+                                    f"id IN ({', '.join('?' * len(chunk))})", chunk):
+                versions[row["id"]] = row["updated_at"]
+        return versions
+
+    def _write_plan(self, entry: dict):
+        self._core.plan_file.write(json.dumps(entry, default=str) + "\n")
+
+    # -- execution --
+    def _execute(self, q: SnapshotQuery) -> SnapshotResponse:
+        core = self._core
+        store = core.store
+        with core.lock:
+            store.ensure_table(q._table)
+            store.ensure_columns(q._table, q._filter_columns())
+            where, params = q._where()
+            if q._op == "select":
+                columns = (list(store.columns[q._table]) if q._columns.strip() == "*"
+                           else [c.strip() for c in q._columns.split(",") if c.strip()])
+                rows = store.select(q._table, columns, where, params, q._order, q._limit, q._offset)
+                count = store.count(q._table, where, params) if q._count else None
+                return SnapshotResponse(rows, count)
+            return self._write(q, where, params)
+
+    def _write(self, q: SnapshotQuery, where: str, params: list) -> SnapshotResponse:
+        core = self._core
+        store = core.store
+        table = q._table
+        entry = {"kind": "op", "seq": None, "phase": self.phase, "unit": getattr(core.local, "unit", None),
+                 "table": table, "op": q._op, "values": q._payload,
+                 "filters": [list(f) for f in q._filters]}
+
+        if q._op in ("update", "delete"):
+            targeted = _targeted_ids(q._filters)
+            if targeted is not None:
+                entry["expect"] = self._versions(table, targeted)
+            matched = store.select(table, list(store.columns[table]), where, params)
+            ids = [r["id"] for r in matched]
+            id_where = f"id IN ({', '.join('?' * len(ids))})" if ids else "0"
+            if q._op == "update":
+                store.ensure_columns(table, q._payload)
+                assignments = ", ".join(f"{_quote(c)} = ?" for c in q._payload)
+                core.conn.execute(f"UPDATE {_quote(table)} SET {assignments} WHERE {id_where}",
+                                  [store.encode(v) for v in q._payload.values()] + ids)
+                data = [{**r, **q._payload} for r in matched]
+            else:
+                core.conn.execute(f"DELETE FROM {_quote(table)} WHERE {id_where}", ids)
+                data = matched
+        else:
+            rows = q._payload if isinstance(q._payload, list) else [q._payload]
+            rows = [dict(r) for r in rows]
+            data = []
+            for row in rows:
+                existing = []
+                if q._op == "upsert":
+                    keys = [c.strip() for c in (q._on_conflict or "id").split(",")]
+                    if all(k in row for k in keys):
+                        store.ensure_columns(table, keys)
+                        existing = store.select(table, ["id"], " AND ".join(f"{_quote(k)} IS ?" for k in keys),
+                                                [row[k] for k in keys])
+                if existing:
+                    row = {**row, "id": existing[0]["id"]}
+                    store.ensure_columns(table, row)
+                    assignments = ", ".join(f"{_quote(c)} = ?" for c in row)
+                    core.conn.execute(f"UPDATE {_quote(table)} SET {assignments} WHERE id = ?",
+                                      [store.encode(v) for v in row.values()] + [row["id"]])
+                else:
+                    row.setdefault("id", str(uuid.uuid4()))
+                    store.insert_rows(table, [row])
+                data.append(row)
+
+        core.seq += 1
+        core.ops += 1
+        entry["seq"] = core.seq
+        self._write_plan(entry)
+        return SnapshotResponse(data, None)
+
+
+def _targeted_ids(filters) -> list:
+    """Ids an op addresses directly (eq/in on id), or None for other filters."""
+    for op, column, value in filters:
+        if column == "id" and op == "eq":
+            return [value]
+        if column == "id" and op == "in":
+            return list(value)
+    return None
+
+
+def plan_unit(client, label: str, table: str, rows):
+    """
+    Group the writes made inside the block into one plan unit, skipped whole
+    at apply time if any of `rows` (of `table`) changed since the snapshot.
+    A no-op on a live client.
+    """
+    begin = getattr(client, "begin_unit", None)
+    if begin is None:
+        return nullcontext()
+    return begin(label, table, [r["id"] for r in rows])
+
+
+@contextmanager
+def open_snapshot(path, plan_path):
+    """
+    Yield a SnapshotClient over a scratch copy of the snapshot at `path`,
+    recording writes to `plan_path`. The snapshot itself is never modified.
+    """
+    path = Path(path)
+    plan_path = Path(plan_path)
+    plan_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, scratch = tempfile.mkstemp(prefix=path.stem + ".", suffix=".scratch", dir=path.parent)
+    os.close(fd)
+    tmp_plan = plan_path.with_name(plan_path.name + ".tmp")
+    conn = None
+    try:
+        shutil.copyfile(path, scratch)
+        conn = sqlite3.connect(scratch, check_same_thread=False)
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        with open(tmp_plan, "w") as plan_file:
+            yield SnapshotClient(_SnapshotCore(conn, plan_file))
+        os.replace(tmp_plan, plan_path)
+    finally:
+        if conn is not None:
+            conn.close()
+        for leftover in (scratch, tmp_plan):
+            if os.path.exists(leftover):
+                os.unlink(leftover)
+
+
+# ---------------------------------------------------------------------------
+# Applying a plan
+# ---------------------------------------------------------------------------
+
+def read_plan(path) -> list:
+    """
+    Plan steps in order: ("unit", header, [ops]) for merges and ("op", op)
+    for standalone writes. A unit is placed where its first op was.
+    """
+    units = {}
+    steps = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry["kind"] == "unit":
+                units[entry["unit"]] = (entry, [])
+            elif entry.get("unit") is not None:
+                header, ops = units[entry["unit"]]
+                if not ops:
+                    steps.append(("unit", header, ops))
+                ops.append(entry)
+            else:
+                steps.append(("op", entry))
+    return steps
+
+
+def _current_versions(supabase, steps) -> dict:
+    """Live updated_at for every row the plan expects, keyed by (table, id)."""
+    wanted = {}
+    for step in steps:
+        if step[0] == "unit":
+            expectations = list(step[1]["expect"].items())
+            expectations += [(op["table"], op.get("expect") or {}) for op in step[2]]
+        else:
+            expectations = [(step[1]["table"], step[1].get("expect") or {})]
+        for table, versions in expectations:
+            wanted.setdefault(table, set()).update(versions)
+    current = {}
+    for table, ids in wanted.items():
+        ids = sorted(ids)
+        for i in range(0, len(ids), APPLY_CHUNK_SIZE):
+            rows = (supabase.table(table).select("id, updated_at")
+                    .in_("id", ids[i:i + APPLY_CHUNK_SIZE]).execute().data or [])
+            for row in rows:
+                current[(table, row["id"])] = row.get("updated_at")
+    return current
+
+
+def _build(supabase, op: dict, ids: list = None):
+    table = supabase.table(op["table"])
+    if op["op"] == "update":
+        query = table.update(op["values"])
+    elif op["op"] == "delete":
+        query = table.delete()
+    elif op["op"] == "insert":
+        return table.insert(op["values"])
+    else:
+        return table.upsert(op["values"])
+    for name, column, value in op["filters"]:
+        if ids is not None and column == "id" and name in ("eq", "in"):
+            query = query.in_("id", ids)
+            continue
+        target = query
+        if name.startswith("not."):
+            target, name = query.not_, name[4:]
+        if name == "or":
+            query = target.or_(value)
+        elif name == "in":
+            query = target.in_(column, value)
+        else:
+            query = getattr(target, name)(column, value)
+    return query
+
+
+def _batch_key(op: dict) -> str:
+    """Ops with equal keys differ only in the ids they target."""
+    return json.dumps([op["table"], op["op"], op["values"], [f for f in op["filters"] if f[1] != "id"]],
+                      sort_keys=True, default=str)
+
+
+def apply_plan(supabase, plan_path, dry_run: bool = False, log=None) -> dict:
+    """
+    Apply a plan written by a snapshot run to the live database.
+    Rows changed since the snapshot (updated_at differs, or the row is gone)
+    are left alone: a unit touching one is skipped whole, a standalone op
+    drops those ids. Rows this apply itself already changed are exempt.
+    Consecutive standalone ops that differ only in the ids they target are
+    sent as one in_() request per chunk.
+    """
+    steps = read_plan(plan_path)
+    current = _current_versions(supabase, steps)
+    touched = set()
+    stats = {"steps": len(steps), "ops_applied": 0, "requests": 0, "units_applied": 0,
+             "units_skipped": 0, "units_failed": 0, "ids_skipped": 0, "conflicts": []}
+
+    def fresh(table: str, row_id: str, version) -> bool:
+        return (table, row_id) in touched or current.get((table, row_id), object()) == version
+
+    def run(query, table: str):
+        stats["requests"] += 1
+        if dry_run:
+            return
+        response = query.execute()
+        for row in response.data or []:
+            if isinstance(row, dict) and row.get("id"):
+                touched.add((table, row["id"]))
+
+    pending = []    # standalone id-targeted ops sharing table/op/values
+
+    def flush():
+        if not pending:
+            return
+        first = pending[0][0]
+        ids = list(dict.fromkeys(i for _, ids in pending for i in ids))
+        for i in range(0, len(ids), APPLY_CHUNK_SIZE):
+            chunk = ids[i:i + APPLY_CHUNK_SIZE]
+            run(_build(supabase, first, chunk), first["table"])
+            touched.update((first["table"], row_id) for row_id in chunk)
+        stats["ops_applied"] += len(pending)
+        pending.clear()
+
+    for step in steps:
+        if step[0] == "unit":
+            flush()
+            header, ops = step[1], step[2]
+            stale = [(t, i) for t, versions in header["expect"].items()
+                     for i, v in versions.items() if not fresh(t, i, v)]
+            if stale:
+                stats["units_skipped"] += 1
+                stats["conflicts"].append({"unit": header["unit"], "label": header["label"],
+                                           "changed": [f"{t}:{i}" for t, i in stale]})
+                if log:
+                    log.warning(f"  Skipping '{header['label']}': {len(stale)} row(s) changed since the snapshot")
+                continue
+            try:
+                for op in ops:
+                    run(_build(supabase, op), op["table"])
+                    stats["ops_applied"] += 1
+            except Exception as e:
+                # PostgREST has no transactions: earlier ops of the unit stay applied
+                stats["units_failed"] += 1
+                stats["conflicts"].append({"unit": header["unit"], "label": header["label"], "error": str(e)})
+                if log:
+                    log.error(f"  '{header['label']}' failed at op {op['seq']}: {e}")
+                continue
+            stats["units_applied"] += 1
+            continue
+
+        op = step[1]
+        targeted = _targeted_ids(op["filters"])
+        if targeted is None or op["op"] not in ("update", "delete"):
+            flush()
+            run(_build(supabase, op), op["table"])
+            stats["ops_applied"] += 1
+            continue
+
+        expect = op.get("expect") or {}
+        if op["table"] in VERSIONED_TABLES:
+            keep = [i for i in targeted if i in expect and fresh(op["table"], i, expect[i])]
+        else:
+            keep = targeted
+        if len(keep) < len(targeted):
+            stats["ids_skipped"] += len(targeted) - len(keep)
+            stats["conflicts"].append({"seq": op["seq"], "table": op["table"],
+                                       "changed": sorted(set(targeted) - set(keep))})
+        if not keep:
+            continue
+        if pending and _batch_key(pending[0][0]) != _batch_key(op):
+            flush()
+        pending.append((op, keep))
+    flush()
+    return stats
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory tables for cleanup snapshots.
+
+PostgREST rows arrive as one dict per row, which costs several hundred bytes
+of overhead per row before counting the values. CompactTable stores a fetched
+table column by column instead:
+
+- UUID columns as 16 bytes per row in one bytearray
+- integer columns in array('q'), booleans in a bytearray
+- text columns as lists of interned strings, so repeated artist names and
+  labels are stored once
+
+Iterating yields CompactRow views that behave like the read-only dicts the
+cleanup phases already use (row["id"], row.get("label")).
+"""
+
+import sys
+import uuid
+from array import array
+from collections.abc import Mapping
+
+UUID_COLUMNS = {"id", "artist_id", "set_id", "track_id", "remix_artist_id", "verified_by"}
+INT_COLUMNS = {"sets_count", "tracks_count", "times_played", "position", "bpm",
+               "duration_seconds", "release_year", "timestamp_seconds"}
+BOOL_COLUMNS = {"verified", "is_unreleased"}
+
+_INT_NULL = -(2 ** 63)
+_UUID_NULL = bytes(16)
+_BOOL_NULL = 2
+
+
+def _kind(column: str) -> str:
+    if column in UUID_COLUMNS:
+        return "uuid"
+    if column in INT_COLUMNS:
+        return "int"
+    if column in BOOL_COLUMNS:
+        return "bool"
+    return "str"
+
+
+class CompactTable:
+    """Column-oriented storage for rows with a fixed set of columns."""
+
+    __slots__ = ("columns", "_index", "_kinds", "_data", "_overflow", "_size")
+
+    def __init__(self, columns):
+        if isinstance(columns, str):
+            columns = [c.strip() for c in columns.split(",")]
+        self.columns = list(columns)
+        self._index = {c: i for i, c in enumerate(self.columns)}
+        self._kinds = [_kind(c) for c in self.columns]
+        self._data = []
+        for kind in self._kinds:
+            if kind == "uuid":
+                self._data.append(bytearray())
+            elif kind == "int":
+                self._data.append(array("q"))
+            elif kind == "bool":
+                self._data.append(bytearray())
+            else:
+                self._data.append([])
+        # Values that don't fit their column's kind, keyed by (column index, row)
+        self._overflow = {}
+        self._size = 0
+
+    def append(self, row: dict):
+        n = self._size
+        for ci, (column, kind) in enumerate(zip(self.columns, self._kinds)):
+            value = row.get(column)
+            data = self._data[ci]
+            if kind == "str":
+                data.append(sys.intern(value) if isinstance(value, str) else value)
+                continue
+            if kind == "uuid":
+                packed = _UUID_NULL
+                if value is not None:
+                    try:
+                        packed = uuid.UUID(value).bytes
+                        # Must come back unchanged, and the nil UUID would read as NULL
+                        if packed == _UUID_NULL or str(uuid.UUID(bytes=packed)) != value:
+                            raise ValueError(value)
+                    except (ValueError, TypeError, AttributeError):
+                        packed = _UUID_NULL
+                        self._overflow[(ci, n)] = value
+                data += packed
+            elif kind == "int":
+                if value is None:
+                    data.append(_INT_NULL)
+                elif isinstance(value, int) and not isinstance(value, bool) and value != _INT_NULL:
+                    data.append(value)
+                else:
+                    data.append(_INT_NULL)
+                    self._overflow[(ci, n)] = value
+            else:
+                if value is None:
+                    data.append(_BOOL_NULL)
+                elif isinstance(value, bool):
+                    data.append(int(value))
+                else:
+                    data.append(_BOOL_NULL)
+                    self._overflow[(ci, n)] = value
+        self._size += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def value(self, i: int, column: str, default=None):
+        ci = self._index.get(column)
+        if ci is None:
+            return default
+        if (ci, i) in self._overflow:
+            return self._overflow[(ci, i)]
+        kind = self._kinds[ci]
+        data = self._data[ci]
+        if kind == "str":
+            return data[i]
+        if kind == "uuid":
+            packed = bytes(data[i * 16:(i + 1) * 16])
+            return None if packed == _UUID_NULL else str(uuid.UUID(bytes=packed))
+        if kind == "int":
+            return None if data[i] == _INT_NULL else data[i]
+        return None if data[i] == _BOOL_NULL else bool(data[i])
+
+    def column(self, column: str, start: int = 0, stop: int = None) -> list:
+        """Values of one column for rows [start, stop), decoded in bulk."""
+        stop = self._size if stop is None else min(stop, self._size)
+        ci = self._index.get(column)
+        if ci is None or start >= stop:
+            return [None] * max(0, stop - start)
+        kind = self._kinds[ci]
+        data = self._data[ci]
+        if kind == "str":
+            values = data[start:stop]
+        elif kind == "int":
+            values = [None if v == _INT_NULL else v for v in data[start:stop]]
+        elif kind == "bool":
+            values = [None if v == _BOOL_NULL else bool(v) for v in data[start:stop]]
+        else:
+            values = [self.value(i, column) for i in range(start, stop)]
+        for (oci, i), value in self._overflow.items():
+            if oci == ci and start <= i < stop:
+                values[i - start] = value
+        return values
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by the column buffers (strings counted once each)."""
+        total = sys.getsizeof(self._overflow)
+        seen = set()
+        for kind, data in zip(self._kinds, self._data):
+            total += sys.getsizeof(data)
+            if kind == "str":
+                for value in data:
+                    if value is not None and id(value) not in seen:
+                        seen.add(id(value))
+                        total += sys.getsizeof(value)
+        return total
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, i: int) -> "CompactRow":
+        if not -self._size <= i < self._size:
+            raise IndexError(i)
+        return CompactRow(self, i % self._size)
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield CompactRow(self, i)
+
+
+class CompactRow(Mapping):
+    """Read-only dict-like view of one CompactTable row."""
+
+    __slots__ = ("_table", "_i")
+
+    def __init__(self, table: CompactTable, i: int):
+        self._table = table
+        self._i = i
+
+    def __getitem__(self, column):
+        if column not in self._table._index:
+            raise KeyError(column)
+        return self._table.value(self._i, column)
+
+    def get(self, column, default=None):
+        if column not in self._table._index:
+            return default
+        return self._table.value(self._i, column)
+
+    def __iter__(self):
+        return iter(self._table.columns)
+
+    def __len__(self):
+        return len(self._table.columns)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactRow):
+            return other._table is self._table and other._i == self._i
+        return Mapping.__eq__(self, other)
+
+    def __hash__(self):
+        return hash((id(self._table), self._i))
+
+    def __repr__(self):
+        return repr(dict(self))
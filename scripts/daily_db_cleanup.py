@@ -1,22 +1,54 @@
 #!/usr/bin/env python3
 """
 Daily Database Cleanup Script
-Deduplicates artists, tracks, and sets; normalizes data; fixes broken references.
+Deduplicates artists, tracks, and sets; normalizes data; fixes broken references;
+reports near-duplicate names for review.
 
-Runs after the daily sync to keep the database clean.
+Runs after the daily sync to keep the database clean. By default only rows
+changed since the last successful run are checked; --full rescans everything
+(done automatically once a week).
+
+Artist tracks_count / sets_count are maintained from per-artist deltas that
+the import path and the merges journal (artist_count_deltas.py); full rescans
+and --reconcile-counts recount every artist and report drift instead.
 
 Usage:
-    python scripts/daily_db_cleanup.py [--dry-run]
+    python scripts/daily_db_cleanup.py [--dry-run] [--workers N] [--full]
+
+Snapshot-and-plan mode runs the phases offline against a local SQLite copy of
+the tables and writes every change they would make to a JSONL plan, which can
+be reviewed and then applied (see cleanup_snapshot.py):
+    python scripts/daily_db_cleanup.py --snapshot logs/cleanup.sqlite [--plan plan.jsonl]
+    python scripts/daily_db_cleanup.py --apply plan.jsonl
+
+--engine sql runs artist/track/set dedup and the count updates server-side as
+set-based SQL (supabase/migrations/029_cleanup_set_based_dedup.sql).
 """
 
 import os
 import sys
 import re
 import logging
+import json
+import time
+import zlib
+import random
 import argparse
-from datetime import datetime, timezone
+import cProfile
+import multiprocessing
+import threading
+import tracemalloc
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from collections import defaultdict
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from difflib import SequenceMatcher
+from functools import partial
+from itertools import chain, combinations
+from typing import Callable
 
 # Load .env
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -31,9 +63,49 @@ if env_path.exists():
 
 from supabase import create_client, Client
 
+from artist_count_deltas import DELTA_TABLE, CountDeltas
+from cleanup_snapshot import (SNAPSHOT_TABLES, apply_plan, open_snapshot, plan_unit,
+                              snapshot_info, write_snapshot)
+from compact_rows import CompactTable
+from string_similarity import similarity, similarities, np
+from text_normalization import normalize_text, normalize_batch, generate_slug, is_lossy_key
+
 SUPABASE_URL = os.environ.get("EXPO_PUBLIC_SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
 
+# Phases whose data doesn't overlap run concurrently (PostgREST calls are I/O bound)
+DEFAULT_WORKERS = 4
+
+# Incremental mode: rows changed since the last successful run's watermark
+STATE_PATH = PROJECT_ROOT / "logs" / "cleanup_state.json"
+FULL_RESCAN_DAYS = 7                        # force a full rescan at least weekly
+WATERMARK_OVERLAP = timedelta(minutes=15)   # tolerate clock skew vs the database
+IN_CHUNK_SIZE = 100                         # values per in_() filter (UUIDs ~37 chars each)
+
+# Sharded dedup planning (--processes): grouping and scoring run in a process pool
+SHARD_MIN_ROWS = 20000      # below this, pickling rows to workers costs more than it saves
+
+# Memory budget (--max-memory): whole-table grouping switches to hash-partitioned passes
+MEMORY_HEADROOM = 0.7       # leave the rest of the budget for grouping and merging
+MIN_SPLIT_GROWTH = 0.05     # a pass must itself hold this share of the budget to be worth splitting
+MEMORY_SAMPLE_SECONDS = 0.1
+MAX_PARTITIONS = 64         # each partition re-streams the whole table: up to this many full scans
+
+# Fuzzy near-duplicate candidates (written for review, never merged automatically)
+FUZZY_THRESHOLD = 0.9
+FUZZY_QGRAM = 3
+FUZZY_LIKE_CHUNK = 40       # q-grams per or_() filter when fetching an incremental run's candidates
+FUZZY_REPORT_DIR = PROJECT_ROOT / "logs"
+
+# Snapshot-and-plan mode (--snapshot / --apply)
+PLAN_DIR = PROJECT_ROOT / "logs"
+
+# Sets with the same tracklist under different titles (MinHash + LSH, review only)
+CONTENT_NUM_PERM = 64
+CONTENT_BANDS = 16          # 16 bands x 4 rows: pairs above ~0.5 Jaccard almost always collide
+CONTENT_THRESHOLD = 0.6     # flag when Jaccard or ordered-sequence overlap reaches this
+CONTENT_MIN_TRACKS = 5      # sets with fewer identified tracks are too noisy to compare
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
@@ -43,69 +115,152 @@ log = logging.getLogger("db_cleanup")
 
 
 # ---------------------------------------------------------------------------
-# Text Normalization (mirrors the app's normalizeText)
+# Text Matching (normalization shared with the app, see text_normalization.py)
 # ---------------------------------------------------------------------------
 
-def normalize_text(text: str) -> str:
-    """Normalize text for matching - mirrors lib/supabase/artistService.ts"""
-    if not text:
-        return ""
-    text = text.lower().strip()
-    text = re.sub(r"[^\w\s]", "", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+def levenshtein_similarity(s1: str, s2: str) -> float:
+    """Calculate similarity between two strings (0-1)."""
+    return similarity(normalize_text(s1), normalize_text(s2))
 
 
-def generate_slug(name: str) -> str:
-    """Generate URL-friendly slug."""
-    slug = name.lower().strip()
-    slug = re.sub(r"[^\w\s-]", "", slug)
-    slug = re.sub(r"[\s_]+", "-", slug)
-    slug = re.sub(r"-+", "-", slug)
-    return slug.strip("-")
+# ---------------------------------------------------------------------------
+# Memory Budget
+# ---------------------------------------------------------------------------
 
+def current_rss() -> int:
+    """Resident set size of this process in bytes (traced heap where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
 
-def levenshtein_similarity(s1: str, s2: str) -> float:
-    """Calculate similarity between two strings (0-1)."""
-    s1 = normalize_text(s1)
-    s2 = normalize_text(s2)
-    if s1 == s2:
-        return 1.0
-    len1, len2 = len(s1), len(s2)
-    if len1 == 0 or len2 == 0:
-        return 0.0
-    matrix = [[0] * (len2 + 1) for _ in range(len1 + 1)]
-    for i in range(len1 + 1):
-        matrix[i][0] = i
-    for j in range(len2 + 1):
-        matrix[0][j] = j
-    for i in range(1, len1 + 1):
-        for j in range(1, len2 + 1):
-            cost = 0 if s1[i - 1] == s2[j - 1] else 1
-            matrix[i][j] = min(
-                matrix[i - 1][j] + 1,
-                matrix[i][j - 1] + 1,
-                matrix[i - 1][j - 1] + cost,
-            )
-    distance = matrix[len1][len2]
-    return 1 - distance / max(len1, len2)
+
+class MemoryMonitor:
+    """
+    Samples process memory while phases run and answers "is this pass about
+    to blow the budget?". Idle (max_bytes None) unless run_cleanup sets a budget.
+    Memory is only measured for the whole process. A phase's peak (the highest
+    memory seen while it ran, and how far that is above where it started) is
+    its own only if no other phase ran alongside it; otherwise the report
+    lists the phases it overlapped and gives no growth figure.
+    """
+
+    def __init__(self):
+        self.max_bytes = None
+        self.peaks = {}
+        self.passes = {}
+        self._start_rss = {}
+        self._running = set()
+        self._overlapped = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started_tracing = False
+
+    def start(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.peaks, self.passes, self._start_rss, self._overlapped = {}, {}, {}, {}
+        if not os.path.exists("/proc/self/statm") and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="cleanup-memory", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.max_bytes = None
+
+    def _sample_loop(self):
+        while not self._stop.wait(MEMORY_SAMPLE_SECONDS):
+            self.sample()
+
+    def sample(self) -> int:
+        used = current_rss()
+        with self._lock:
+            for name in self._running:
+                self.peaks[name] = max(self.peaks.get(name, 0), used)
+        return used
+
+    @contextmanager
+    def phase(self, name: str):
+        if self.max_bytes is None:
+            yield
+            return
+        with self._lock:
+            self._overlapped.setdefault(name, set()).update(self._running)
+            for other in self._running:
+                self._overlapped[other].add(name)
+            self._running.add(name)
+            self._start_rss[name] = current_rss()
+        self.sample()
+        try:
+            yield
+        finally:
+            self.sample()
+            with self._lock:
+                self._running.discard(name)
+
+    def over_budget(self, pass_start_rss: int) -> bool:
+        """
+        True when memory is past the headroom and this pass accounts for a
+        real part of it. Memory freed by earlier passes often stays resident
+        but is reused, and caches grow a little on their own, so a high but
+        flat RSS is not a reason to split.
+        """
+        if self.max_bytes is None:
+            return False
+        used = self.sample()
+        return (used >= self.max_bytes * MEMORY_HEADROOM
+                and used - pass_start_rss >= self.max_bytes * MIN_SPLIT_GROWTH)
+
+    def report(self) -> dict:
+        mb = 1024 * 1024
+        return {
+            "max_mb": round(self.max_bytes / mb, 1),
+            "peak_mb": round(max(self.peaks.values(), default=0) / mb, 1),
+            "phases": {
+                name: {"peak_mb": round(peak / mb, 1),
+                       "growth_mb": (None if self._overlapped.get(name) else
+                                     round(max(0, peak - self._start_rss.get(name, peak)) / mb, 1)),
+                       "overlapped": sorted(self._overlapped.get(name, ()))}
+                for name, peak in self.peaks.items()
+            },
+            "partitioned_passes": dict(self.passes),
+        }
+
+
+MEMORY = MemoryMonitor()
+
+# Count changes made by this run's merges; the counts phase applies them
+COUNT_DELTAS = CountDeltas("cleanup")
 
 
 # ---------------------------------------------------------------------------
 # Fetch helpers (paginated for large tables)
 # ---------------------------------------------------------------------------
 
-def fetch_all(supabase: Client, table: str, columns: str, page_size: int = 1000) -> list:
-    """Fetch all rows from a table, handling pagination."""
-    all_rows = []
+def fetch_all(supabase: Client, table: str, columns: str, page_size: int = 1000,
+              since: str = None, since_column: str = "updated_at") -> CompactTable:
+    """Fetch all rows from a table, handling pagination.
+
+    Rows are packed into a CompactTable page by page, so a full-table snapshot
+    never holds one dict per row. With `since`, only rows whose `since_column`
+    is at or after it are returned.
+    """
+    all_rows = CompactTable(columns)
     offset = 0
     while True:
-        result = (
-            supabase.table(table)
-            .select(columns)
-            .range(offset, offset + page_size - 1)
-            .execute()
-        )
+        query = supabase.table(table).select(columns)
+        if since:
+            query = query.gte(since_column, since)
+        result = query.range(offset, offset + page_size - 1).execute()
         rows = result.data or []
         all_rows.extend(rows)
         if len(rows) < page_size:
@@ -114,45 +269,276 @@ def fetch_all(supabase: Client, table: str, columns: str, page_size: int = 1000)
     return all_rows
 
 
+def fetch_in(supabase: Client, table: str, columns: str, column: str, values,
+             chunk_size: int = IN_CHUNK_SIZE, page_size: int = 1000) -> CompactTable:
+    """Fetch rows whose `column` is one of `values`, in chunks small enough for a URL."""
+    values = sorted({v for v in values if v})
+    all_rows = CompactTable(columns)
+    for i in range(0, len(values), chunk_size):
+        chunk = values[i:i + chunk_size]
+        offset = 0
+        while True:
+            result = (
+                supabase.table(table)
+                .select(columns)
+                .in_(column, chunk)
+                .range(offset, offset + page_size - 1)
+                .execute()
+            )
+            rows = result.data or []
+            all_rows.extend(rows)
+            if len(rows) < page_size:
+                break
+            offset += page_size
+    return all_rows
+
+
+def iter_keyset(supabase: Client, table: str, columns: str, order_by: str = "id",
+                page_size: int = 1000, skip_null: bool = False):
+    """
+    Stream rows ordered by (`order_by`, id) with keyset pagination, so only one
+    page is held at a time and later pages don't slow down like large offsets.
+    """
+    last = None
+    while True:
+        query = supabase.table(table).select(columns)
+        if skip_null:
+            query = query.not_.is_(order_by, "null")
+        if last is not None:
+            if order_by == "id":
+                query = query.gt("id", last[1])
+            else:
+                query = query.or_(f"{order_by}.gt.{last[0]},and({order_by}.eq.{last[0]},id.gt.{last[1]})")
+        query = query.order(order_by)
+        if order_by != "id":
+            query = query.order("id")
+        rows = query.limit(page_size).execute().data or []
+        yield from rows
+        if len(rows) < page_size:
+            break
+        last = (rows[-1][order_by], rows[-1]["id"])
+
+
+def _partition_of(key, modulus: int) -> int:
+    return zlib.crc32(repr(key).encode("utf-8")) % modulus
+
+
+def fetch_partitions(supabase: Client, table: str, columns: str, key_fn: Callable,
+                     page_size: int = 1000):
+    """
+    Yield a table as CompactTables to group by `key_fn`.
+    Without a memory budget this is one fetch_all(). With one, rows are
+    streamed and, if a pass gets close to the budget, it is abandoned and
+    split by hash of the key (rows with the same key always land in the same
+    partition); each partition is then a separate streaming pass. The split
+    factor is sized from how far through the table the pass got.
+    Every pass streams the whole table and keeps only its partition's rows,
+    so a split costs one full scan per partition on top of the abandoned
+    passes; MAX_PARTITIONS bounds how many.
+    Rows whose key is empty are left out, since they're never grouped.
+    """
+    if MEMORY.max_bytes is None:
+        yield fetch_all(supabase, table, columns, page_size)
+        return
+
+    total = None
+    queue = [(1, 0)]   # (modulus, residue): rows whose key hash % modulus == residue
+    passes = 0
+    while queue:
+        modulus, residue = queue.pop(0)
+        rows = CompactTable(columns)
+        pass_start = MEMORY.sample()
+        streamed = 0
+        split = False
+        for streamed, row in enumerate(iter_keyset(supabase, table, columns, page_size=page_size), 1):
+            key = key_fn(row)
+            if not key or (modulus > 1 and _partition_of(key, modulus) != residue):
+                continue
+            rows.append(row)
+            if streamed % page_size == 0 and modulus < MAX_PARTITIONS and MEMORY.over_budget(pass_start):
+                split = True
+                break
+        passes += 1
+        if split:
+            if total is None:
+                total = supabase.table(table).select("id", count="exact").limit(1).execute().count
+            factor = max(2, -(-(total or 0) // streamed))
+            factor = min(factor, max(2, MAX_PARTITIONS // modulus))
+            log.info(f"  {table}: near the memory budget after {len(rows)} rows, "
+                     f"splitting partition {residue}/{modulus} into {factor}")
+            rows = None
+            queue[:0] = [(modulus * factor, residue + k * modulus) for k in range(factor)]
+            continue
+        if modulus > 1:
+            log.info(f"  {table}: partition {residue}/{modulus}, {len(rows)} rows")
+        yield rows
+    MEMORY.passes[table] = passes
+
+
+# ---------------------------------------------------------------------------
+# Merge Planning (optionally sharded across processes)
+# ---------------------------------------------------------------------------
+
+_shard_pool = None
+_shard_processes = 1
+
+
+def start_shard_pool(processes: int):
+    """Start the process pool dedup planning shards into (spawned, not forked:
+    the phases run in threads)."""
+    global _shard_pool, _shard_processes
+    _shard_processes = processes
+    if processes > 1:
+        _shard_pool = ProcessPoolExecutor(max_workers=processes,
+                                          mp_context=multiprocessing.get_context("spawn"))
+
+
+def stop_shard_pool():
+    global _shard_pool, _shard_processes
+    if _shard_pool is not None:
+        _shard_pool.shutdown()
+    _shard_pool, _shard_processes = None, 1
+
+
+def _rank_groups(items) -> list:
+    """
+    Group (index, key, score) items, given in index order, by key and rank
+    each group best first (ties keep index order). Returns
+    [(first index, key, [indexes])] for groups of two or more.
+    """
+    groups = defaultdict(list)
+    for index, key, score in items:
+        groups[key].append((index, score))
+    plans = []
+    for key, members in groups.items():
+        if len(members) > 1:
+            ranked = sorted(members, key=lambda m: m[1], reverse=True)
+            plans.append((members[0][0], key, [index for index, _ in ranked]))
+    return plans
+
+
+def _key_chunk(key_fn: Callable, score_fn: Callable, start: int, columns: dict, shards: int) -> list:
+    """
+    Process pool map step: key and score one chunk of rows (given as column
+    lists) and bucket them by hash of the key.
+    """
+    names = list(columns)
+    buckets = [[] for _ in range(shards)]
+    for offset, values in enumerate(zip(*columns.values())):
+        row = dict(zip(names, values))
+        key = key_fn(row)
+        if key:
+            buckets[_partition_of(key, shards)].append((start + offset, key, score_fn(row)))
+    return buckets
+
+
+def _rank_shard(chunks: list) -> list:
+    """Process pool reduce step: rank the groups of one shard."""
+    return _rank_groups(chain.from_iterable(chunks))
+
+
+def plan_merges(partitions, key_fn: Callable, score_fn: Callable, plan_columns: tuple):
+    """
+    Yield (key, rows) for every group of two or more rows sharing a key, rows
+    ranked best first by `score_fn`, in order of each group's first row.
+    With a shard pool, workers key and score contiguous chunks (only
+    `plan_columns` are sent), bucketing them by hash of the key; each bucket
+    is then grouped and ranked by one worker. The plans are identical to the
+    in-process ones.
+    """
+    for rows in partitions:
+        if _shard_pool is None or len(rows) < SHARD_MIN_ROWS:
+            items = ((i, key, score_fn(row)) for i, row in enumerate(rows) if (key := key_fn(row)))
+            plans = _rank_groups(items)
+        else:
+            shards = _shard_processes
+            chunk_size = -(-len(rows) // (shards * 4))
+            mapped = [
+                _shard_pool.submit(_key_chunk, key_fn, score_fn, start,
+                                   {c: rows.column(c, start, start + chunk_size) for c in plan_columns},
+                                   shards)
+                for start in range(0, len(rows), chunk_size)
+            ]
+            buckets = [f.result() for f in mapped]   # chunk order, so each bucket stays in index order
+            reduced = [_shard_pool.submit(_rank_shard, [chunk[shard] for chunk in buckets])
+                       for shard in range(shards)]
+            plans = sorted(chain.from_iterable(f.result() for f in reduced))
+        for _, key, indexes in plans:
+            yield key, [rows[i] for i in indexes]
+
+
+def anti_join(rows, key: str, sorted_ids):
+    """
+    Yield rows (sorted by `key`) whose `key` is not in `sorted_ids`.
+    Both inputs are consumed as streams in one sorted-merge pass.
+    """
+    ids = iter(sorted_ids)
+    current = next(ids, None)
+    for row in rows:
+        value = row[key]
+        while current is not None and current < value:
+            current = next(ids, None)
+        if current != value:
+            yield row
+
+
+def union_rows(*row_lists) -> list:
+    """Concatenate row lists, keeping the first copy of each id."""
+    seen = set()
+    merged = []
+    for rows in row_lists:
+        for row in rows:
+            if row["id"] not in seen:
+                seen.add(row["id"])
+                merged.append(row)
+    return merged
+
+
 # ---------------------------------------------------------------------------
 # 1. Artist Deduplication
 # ---------------------------------------------------------------------------
 
-def dedup_artists(supabase: Client, dry_run: bool = False) -> dict:
+def _artist_key(a: dict) -> str:
+    return normalize_text(a["name"])
+
+
+ARTIST_PLAN_COLUMNS = ("name", "sets_count", "tracks_count", "verified", "spotify_url")
+
+
+def _artist_score(a: dict) -> int:
+    """Canonical preference: verified, then most data, then has spotify."""
+    s = (a.get("sets_count") or 0) + (a.get("tracks_count") or 0)
+    if a.get("verified"):
+        s += 10000
+    if a.get("spotify_url"):
+        s += 100
+    return s
+
+
+def dedup_artists(supabase: Client, dry_run: bool = False, since: str = None) -> dict:
     """
     Find and merge duplicate artists.
     Keeps the artist with the most data (sets_count + tracks_count) as canonical.
     Re-points tracks, sets, and set_tracks to the canonical artist.
     Creates aliases for the merged names.
+    With `since`, only groups containing an artist changed since then are checked.
     """
     stats = {"duplicates_found": 0, "artists_merged": 0}
 
     log.info("--- Artist Deduplication ---")
-    artists = fetch_all(supabase, "artists", "id, name, slug, sets_count, tracks_count, spotify_url, verified")
-
-    # Group by normalized name
-    name_groups = defaultdict(list)
-    for a in artists:
-        key = normalize_text(a["name"])
-        if key:
-            name_groups[key].append(a)
-
-    for norm_name, group in name_groups.items():
-        if len(group) <= 1:
-            continue
-
+    columns = "id, name, slug, sets_count, tracks_count, spotify_url, verified"
+    if since:
+        changed = fetch_all(supabase, "artists", columns, since=since)
+        keys = {normalize_text(a["name"]) for a in changed}
+        artists = union_rows(changed, fetch_in(supabase, "artists", columns, "name_normalized", keys))
+        log.info(f"  Incremental: {len(changed)} changed artists, {len(artists)} rows to group")
+        partitions = [artists]
+    else:
+        partitions = fetch_partitions(supabase, "artists", columns, _artist_key)
+
+    # Group by normalized name, best candidate first
+    for norm_name, group in plan_merges(partitions, _artist_key, _artist_score, ARTIST_PLAN_COLUMNS):
         stats["duplicates_found"] += len(group) - 1
-
-        # Pick canonical: prefer verified, then most data, then has spotify
-        def score(a):
-            s = (a.get("sets_count") or 0) + (a.get("tracks_count") or 0)
-            if a.get("verified"):
-                s += 10000
-            if a.get("spotify_url"):
-                s += 100
-            return s
-
-        group.sort(key=score, reverse=True)
         canonical = group[0]
         duplicates = group[1:]
 
@@ -162,51 +548,53 @@ def dedup_artists(supabase: Client, dry_run: bool = False) -> dict:
         if dry_run:
             continue
 
-        for dup in duplicates:
-            dup_id = dup["id"]
-            canonical_id = canonical["id"]
-
-            # Re-point tracks to canonical artist
-            supabase.table("tracks").update(
-                {"artist_id": canonical_id, "artist_name": canonical["name"]}
-            ).eq("artist_id", dup_id).execute()
-
-            # Re-point sets to canonical artist
-            supabase.table("sets").update(
-                {"artist_id": canonical_id, "artist_name": canonical["name"]}
-            ).eq("artist_id", dup_id).execute()
-
-            # Re-point set_tracks raw_artist
-            supabase.table("set_tracks").update(
-                {"raw_artist": canonical["name"]}
-            ).eq("raw_artist", dup["name"]).execute()
-
-            # Create alias for the duplicate name if different
-            if dup["name"] != canonical["name"]:
-                alias_lower = normalize_text(dup["name"])
-                # Check if alias already exists
-                existing = (
-                    supabase.table("artist_aliases")
-                    .select("id")
-                    .eq("artist_id", canonical_id)
-                    .eq("alias_lower", alias_lower)
-                    .execute()
-                )
-                if not existing.data:
-                    supabase.table("artist_aliases").insert({
-                        "artist_id": canonical_id,
-                        "alias": dup["name"],
-                        "alias_lower": alias_lower,
-                    }).execute()
-
-            # Move any aliases from the dup to canonical
-            supabase.table("artist_aliases").update(
-                {"artist_id": canonical_id}
-            ).eq("artist_id", dup_id).execute()
-
-            # Delete the duplicate artist
-            supabase.table("artists").delete().eq("id", dup_id).execute()
-            stats["artists_merged"] += 1
+        with plan_unit(supabase, f"merge artist '{norm_name}'", "artists", group):
+            for dup in duplicates:
+                dup_id = dup["id"]
+                canonical_id = canonical["id"]
+
+                # Re-point tracks to canonical artist
+                moved_tracks = supabase.table("tracks").update(
+                    {"artist_id": canonical_id, "artist_name": canonical["name"]}
+                ).eq("artist_id", dup_id).execute().data or []
+
+                # Re-point sets to canonical artist
+                moved_sets = supabase.table("sets").update(
+                    {"artist_id": canonical_id, "artist_name": canonical["name"]}
+                ).eq("artist_id", dup_id).execute().data or []
+                COUNT_DELTAS.add(canonical_id, tracks=len(moved_tracks), sets=len(moved_sets))
+
+                # Re-point set_tracks raw_artist
+                supabase.table("set_tracks").update(
+                    {"raw_artist": canonical["name"]}
+                ).eq("raw_artist", dup["name"]).execute()
+
+                # Create alias for the duplicate name if different
+                if dup["name"] != canonical["name"]:
+                    alias_lower = normalize_text(dup["name"])
+                    # Check if alias already exists
+                    existing = (
+                        supabase.table("artist_aliases")
+                        .select("id")
+                        .eq("artist_id", canonical_id)
+                        .eq("alias_lower", alias_lower)
+                        .execute()
+                    )
+                    if not existing.data:
+                        supabase.table("artist_aliases").insert({
+                            "artist_id": canonical_id,
+                            "alias": dup["name"],
+                            "alias_lower": alias_lower,
+                        }).execute()
+
+                # Move any aliases from the dup to canonical
+                supabase.table("artist_aliases").update(
+                    {"artist_id": canonical_id}
+                ).eq("artist_id", dup_id).execute()
+
+                # Delete the duplicate artist
+                supabase.table("artists").delete().eq("id", dup_id).execute()
+                stats["artists_merged"] += 1
 
     log.info(f"  Artist dedup: {stats['duplicates_found']} duplicates found, {stats['artists_merged']} merged")
     return stats
@@ -216,55 +604,66 @@ def dedup_artists(supabase: Client, dry_run: bool = False) -> dict:
 # 2. Track Deduplication
 # ---------------------------------------------------------------------------
 
-def dedup_tracks(supabase: Client, dry_run: bool = False) -> dict:
+def _track_key(t: dict):
+    title_norm = (t.get("title_normalized") or normalize_text(t.get("title", ""))).strip()
+    if not title_norm:
+        return None
+    # A key the app wrote with its accents dropped would match the wrong
+    # track; title normalization rewrites it and the next run merges it.
+    if t.get("title_normalized") and is_lossy_key(t.get("title"), title_norm):
+        return None
+    return (title_norm, normalize_text(t.get("artist_name") or ""))
+
+
+TRACK_PLAN_COLUMNS = ("title", "title_normalized", "artist_name", "verified", "enriched_at",
+                      "spotify_url", "bpm", "label", "beatport_url", "times_played")
+
+
+def _track_score(t: dict) -> int:
+    """Canonical preference: verified, then enriched, then most metadata."""
+    s = 0
+    if t.get("verified"):
+        s += 10000
+    if t.get("enriched_at"):
+        s += 1000
+    if t.get("spotify_url"):
+        s += 100
+    if t.get("bpm"):
+        s += 50
+    if t.get("label"):
+        s += 25
+    if t.get("beatport_url"):
+        s += 25
+    s += (t.get("times_played") or 0)
+    return s
+
+
+def dedup_tracks(supabase: Client, dry_run: bool = False, since: str = None) -> dict:
     """
     Find and merge duplicate tracks (same normalized title + artist).
     Keeps the track with the most metadata as canonical.
     Re-points set_tracks to the canonical track.
+    With `since`, only groups containing a track changed since then are checked.
     """
     stats = {"duplicates_found": 0, "tracks_merged": 0}
 
     log.info("--- Track Deduplication ---")
-    tracks = fetch_all(
-        supabase, "tracks",
-        "id, title, title_normalized, artist_id, artist_name, label, bpm, spotify_url, "
-        "beatport_url, soundcloud_url, times_played, verified, enriched_at"
-    )
-
-    # Group by (title_normalized, artist_name normalized)
-    track_groups = defaultdict(list)
-    for t in tracks:
-        title_norm = (t.get("title_normalized") or normalize_text(t.get("title", ""))).strip()
-        artist_norm = normalize_text(t.get("artist_name") or "")
-        key = (title_norm, artist_norm)
-        if title_norm:
-            track_groups[key].append(t)
-
-    for (title_norm, artist_norm), group in track_groups.items():
-        if len(group) <= 1:
-            continue
-
+    columns = ("id, title, title_normalized, artist_id, artist_name, label, bpm, key, spotify_url, "
+               "beatport_url, soundcloud_url, youtube_url, release_year, isrc, artwork_url, "
+               "duration_seconds, times_played, verified, enriched_at")
+    if since:
+        changed = fetch_all(supabase, "tracks", columns, since=since)
+        keys = {(t.get("title_normalized") or normalize_text(t.get("title", ""))).strip() for t in changed}
+        tracks = union_rows(changed, fetch_in(supabase, "tracks", columns, "title_normalized", keys))
+        log.info(f"  Incremental: {len(changed)} changed tracks, {len(tracks)} rows to group")
+        partitions = [tracks]
+    else:
+        partitions = fetch_partitions(supabase, "tracks", columns, _track_key)
+
+    # Group by (title_normalized, artist_name normalized), best candidate first
+    for (title_norm, artist_norm), group in plan_merges(partitions, _track_key, _track_score,
+                                                        TRACK_PLAN_COLUMNS):
         stats["duplicates_found"] += len(group) - 1
-
-        # Pick canonical: prefer verified, then enriched, then most metadata
-        def score(t):
-            s = 0
-            if t.get("verified"):
-                s += 10000
-            if t.get("enriched_at"):
-                s += 1000
-            if t.get("spotify_url"):
-                s += 100
-            if t.get("bpm"):
-                s += 50
-            if t.get("label"):
-                s += 25
-            if t.get("beatport_url"):
-                s += 25
-            s += (t.get("times_played") or 0)
-            return s
-
-        group.sort(key=score, reverse=True)
         canonical = group[0]
         duplicates = group[1:]
 
@@ -274,56 +673,61 @@ def dedup_tracks(supabase: Client, dry_run: bool = False) -> dict:
         if dry_run:
             continue
 
-        for dup in duplicates:
-            dup_id = dup["id"]
-            canonical_id = canonical["id"]
-
-            # Re-point set_tracks to canonical
-            supabase.table("set_tracks").update(
-                {"track_id": canonical_id}
-            ).eq("track_id", dup_id).execute()
-
-            # Create track alias if titles differ
-            if dup.get("title") and dup["title"] != canonical.get("title"):
-                alias_norm = normalize_text(dup["title"])
-                existing = (
-                    supabase.table("track_aliases")
-                    .select("id")
-                    .eq("track_id", canonical_id)
-                    .eq("title_alias_normalized", alias_norm)
-                    .execute()
-                )
-                if not existing.data:
-                    supabase.table("track_aliases").insert({
-                        "track_id": canonical_id,
-                        "title_alias": dup["title"],
-                        "title_alias_normalized": alias_norm,
-                    }).execute()
-
-            # Move aliases from dup to canonical
-            supabase.table("track_aliases").update(
-                {"track_id": canonical_id}
-            ).eq("track_id", dup_id).execute()
-
-            # Merge metadata: fill in blanks on canonical from the dup
-            updates = {}
-            for field in ["label", "bpm", "key", "spotify_url", "beatport_url",
-                          "soundcloud_url", "youtube_url", "release_year", "isrc",
-                          "artwork_url", "duration_seconds"]:
-                if not canonical.get(field) and dup.get(field):
-                    updates[field] = dup[field]
-            if updates:
-                supabase.table("tracks").update(updates).eq("id", canonical_id).execute()
-
-            # Aggregate times_played
-            combined_plays = (canonical.get("times_played") or 0) + (dup.get("times_played") or 0)
-            supabase.table("tracks").update(
-                {"times_played": combined_plays}
-            ).eq("id", canonical_id).execute()
-
-            # Delete the duplicate
-            supabase.table("tracks").delete().eq("id", dup_id).execute()
-            stats["tracks_merged"] += 1
+        # The canonical as updated by earlier duplicates of this group
+        merged = dict(canonical)
+        with plan_unit(supabase, f"merge track '{artist_norm} - {title_norm}'", "tracks", group):
+            for dup in duplicates:
+                dup_id = dup["id"]
+                canonical_id = canonical["id"]
+
+                # Re-point set_tracks to canonical
+                supabase.table("set_tracks").update(
+                    {"track_id": canonical_id}
+                ).eq("track_id", dup_id).execute()
+
+                # Create track alias if titles differ
+                if dup.get("title") and dup["title"] != canonical.get("title"):
+                    alias_norm = normalize_text(dup["title"])
+                    existing = (
+                        supabase.table("track_aliases")
+                        .select("id")
+                        .eq("track_id", canonical_id)
+                        .eq("title_alias_normalized", alias_norm)
+                        .execute()
+                    )
+                    if not existing.data:
+                        supabase.table("track_aliases").insert({
+                            "track_id": canonical_id,
+                            "title_alias": dup["title"],
+                            "title_alias_normalized": alias_norm,
+                        }).execute()
+
+                # Move aliases from dup to canonical
+                supabase.table("track_aliases").update(
+                    {"track_id": canonical_id}
+                ).eq("track_id", dup_id).execute()
+
+                # Merge metadata: fill in blanks on canonical from the dup
+                updates = {}
+                for field in ["label", "bpm", "key", "spotify_url", "beatport_url",
+                              "soundcloud_url", "youtube_url", "release_year", "isrc",
+                              "artwork_url", "duration_seconds"]:
+                    if not merged.get(field) and dup.get(field):
+                        updates[field] = dup[field]
+                if updates:
+                    supabase.table("tracks").update(updates).eq("id", canonical_id).execute()
+                    merged.update(updates)
+
+                # Aggregate times_played
+                merged["times_played"] = (merged.get("times_played") or 0) + (dup.get("times_played") or 0)
+                supabase.table("tracks").update(
+                    {"times_played": merged["times_played"]}
+                ).eq("id", canonical_id).execute()
+
+                # Delete the duplicate
+                supabase.table("tracks").delete().eq("id", dup_id).execute()
+                COUNT_DELTAS.add(dup.get("artist_id"), tracks=-1)
+                stats["tracks_merged"] += 1
 
     log.info(f"  Track dedup: {stats['duplicates_found']} duplicates found, {stats['tracks_merged']} merged")
     return stats
@@ -333,59 +737,126 @@ def dedup_tracks(supabase: Client, dry_run: bool = False) -> dict:
 # 3. Set Deduplication
 # ---------------------------------------------------------------------------
 
-def dedup_sets(supabase: Client, dry_run: bool = False) -> dict:
-    """Find and merge duplicate sets (same external_id or same name+artist)."""
+class UnionFind:
+    """Disjoint sets over hashable ids (path halving, union by size)."""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        self.size.setdefault(x, 1)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+
+    def union_all(self, items):
+        items = list(items)
+        for other in items[1:]:
+            self.union(items[0], other)
+
+    def components(self) -> list:
+        """All groups with more than one member."""
+        groups = defaultdict(list)
+        for x in self.parent:
+            groups[self.find(x)].append(x)
+        return [g for g in groups.values() if len(g) > 1]
+
+
+def _set_name_key(s: dict) -> tuple:
+    return (normalize_text(s.get("name", "")), normalize_text(s.get("artist_name", "")))
+
+
+def delete_in_batches(supabase: Client, table: str, column: str, values: list,
+                      chunk_size: int = IN_CHUNK_SIZE):
+    """Delete rows whose `column` is one of `values`, one request per chunk."""
+    values = sorted(values)
+    for i in range(0, len(values), chunk_size):
+        supabase.table(table).delete().in_(column, values[i:i + chunk_size]).execute()
+
+
+def dedup_sets(supabase: Client, dry_run: bool = False, since: str = None) -> dict:
+    """
+    Find and merge duplicate sets (same external_id or same name+artist).
+    Duplicate relations are clustered with union-find, so A~B by external_id
+    and B~C by name end up as one cluster with one canonical set.
+    With `since`, only clusters containing a set changed since then are checked.
+    """
     stats = {"duplicates_found": 0, "sets_merged": 0}
 
     log.info("--- Set Deduplication ---")
-    sets = fetch_all(supabase, "sets", "id, name, artist_name, external_id, tracks_count, created_at")
+    columns = "id, name, artist_id, artist_name, external_id, tracks_count, created_at"
+    if since:
+        changed = fetch_all(supabase, "sets", columns, since=since)
+        sets = list(changed)
+        # Expand until no new rows join, so transitive duplicates are included
+        frontier = changed
+        while frontier:
+            found = union_rows(
+                fetch_in(supabase, "sets", columns, "external_id", {s.get("external_id") for s in frontier}),
+                fetch_in(supabase, "sets", columns, "name_normalized",
+                         {normalize_text(s.get("name", "")) for s in frontier}),
+            )
+            known = {s["id"] for s in sets}
+            frontier = [s for s in found if s["id"] not in known]
+            sets.extend(frontier)
+        log.info(f"  Incremental: {len(changed)} changed sets, {len(sets)} rows to group")
+    else:
+        sets = fetch_all(supabase, "sets", columns)
 
-    # Group by external_id first (most reliable)
-    ext_id_groups = defaultdict(list)
-    for s in sets:
-        if s.get("external_id"):
-            ext_id_groups[s["external_id"]].append(s)
+    by_id = {s["id"]: s for s in sets}
 
-    # Also group by normalized name + artist
+    # Union sets sharing an external_id (most reliable) or a normalized name + artist
+    ext_id_groups = defaultdict(list)
     name_groups = defaultdict(list)
     for s in sets:
-        key = (normalize_text(s.get("name", "")), normalize_text(s.get("artist_name", "")))
+        if s.get("external_id"):
+            ext_id_groups[s["external_id"]].append(s["id"])
+        key = _set_name_key(s)
         if key[0]:
-            name_groups[key].append(s)
-
-    # Merge both group sources, dedup by set id
-    all_groups = []
-    seen_set_ids = set()
+            name_groups[key].append(s["id"])
 
-    for group in list(ext_id_groups.values()) + list(name_groups.values()):
-        if len(group) <= 1:
-            continue
-        group_ids = frozenset(s["id"] for s in group)
-        if group_ids not in seen_set_ids:
-            seen_set_ids.add(group_ids)
-            all_groups.append(group)
+    clusters = UnionFind()
+    for ids in list(ext_id_groups.values()) + list(name_groups.values()):
+        if len(ids) > 1:
+            clusters.union_all(ids)
 
-    for group in all_groups:
-        stats["duplicates_found"] += len(group) - 1
+    # Keep the one with more tracks; ties go to the oldest, then the lowest id
+    def rank(s):
+        return (-(s.get("tracks_count") or 0), s.get("created_at") or "", s["id"])
 
-        # Keep the one with more tracks
-        group.sort(key=lambda s: (s.get("tracks_count") or 0), reverse=True)
+    dup_ids = []
+    for component in sorted(clusters.components(), key=lambda c: min(c)):
+        group = sorted((by_id[i] for i in component), key=rank)
         canonical = group[0]
         duplicates = group[1:]
+        stats["duplicates_found"] += len(duplicates)
+        dup_ids.extend(d["id"] for d in duplicates)
 
         log.info(f"  Merging set '{canonical.get('name', 'Unknown')}': "
                  f"keeping id={canonical['id'][:8]} ({canonical.get('tracks_count', 0)} tracks), "
                  f"merging {len(duplicates)} dup(s)")
 
-        if dry_run:
-            continue
-
-        for dup in duplicates:
-            # Delete set_tracks for the dup (cascade should handle this,
-            # but be explicit to avoid orphans)
-            supabase.table("set_tracks").delete().eq("set_id", dup["id"]).execute()
-            supabase.table("sets").delete().eq("id", dup["id"]).execute()
-            stats["sets_merged"] += 1
+    if dup_ids and not dry_run:
+        # Delete set_tracks for the dups (cascade should handle this,
+        # but be explicit to avoid orphans)
+        with plan_unit(supabase, "delete duplicate sets", "sets", [by_id[i] for i in dup_ids]):
+            delete_in_batches(supabase, "set_tracks", "set_id", dup_ids)
+            delete_in_batches(supabase, "sets", "id", dup_ids)
+        for dup_id in dup_ids:
+            COUNT_DELTAS.add(by_id[dup_id].get("artist_id"), sets=-1)
+        stats["sets_merged"] = len(dup_ids)
 
     log.info(f"  Set dedup: {stats['duplicates_found']} duplicates found, {stats['sets_merged']} merged")
     return stats
@@ -395,16 +866,14 @@ def dedup_sets(supabase: Client, dry_run: bool = False) -> dict:
 # 4. Data Normalization Fixes
 # ---------------------------------------------------------------------------
 
-def fix_normalization(supabase: Client, dry_run: bool = False) -> dict:
-    """Fix missing normalized fields, slugs, and broken references."""
-    stats = {"tracks_fixed": 0, "artists_fixed": 0, "orphans_cleaned": 0}
-
-    log.info("--- Data Normalization ---")
+def fix_title_normalization(supabase: Client, dry_run: bool = False, since: str = None) -> dict:
+    """Fix tracks with a missing or stale title_normalized."""
+    stats = {"tracks_fixed": 0}
 
-    # Fix tracks missing title_normalized
-    tracks = fetch_all(supabase, "tracks", "id, title, title_normalized")
-    for t in tracks:
-        expected_norm = normalize_text(t.get("title", ""))
+    log.info("--- Title Normalization ---")
+    tracks = fetch_all(supabase, "tracks", "id, title, title_normalized", since=since)
+    expected_norms = normalize_batch(t.get("title") for t in tracks)
+    for t, expected_norm in zip(tracks, expected_norms):
         current_norm = (t.get("title_normalized") or "").strip()
         if expected_norm and expected_norm != current_norm:
             if not dry_run:
@@ -416,8 +885,15 @@ def fix_normalization(supabase: Client, dry_run: bool = False) -> dict:
     if stats["tracks_fixed"]:
         log.info(f"  Fixed {stats['tracks_fixed']} tracks with missing/incorrect title_normalized")
 
-    # Fix artists missing slugs
-    artists = fetch_all(supabase, "artists", "id, name, slug")
+    return stats
+
+
+def fix_artist_slugs(supabase: Client, dry_run: bool = False, since: str = None) -> dict:
+    """Fill in slugs for artists that don't have one."""
+    stats = {"artists_fixed": 0}
+
+    log.info("--- Artist Slugs ---")
+    artists = fetch_all(supabase, "artists", "id, name, slug", since=since)
     for a in artists:
         expected_slug = generate_slug(a.get("name", ""))
         if expected_slug and not a.get("slug"):
@@ -430,38 +906,105 @@ def fix_normalization(supabase: Client, dry_run: bool = False) -> dict:
     if stats["artists_fixed"]:
         log.info(f"  Fixed {stats['artists_fixed']} artists with missing slugs")
 
-    # Clean up orphaned set_tracks (pointing to deleted tracks or sets)
-    set_tracks = fetch_all(supabase, "set_tracks", "id, set_id, track_id")
-    set_ids = {s["id"] for s in fetch_all(supabase, "sets", "id")}
-    track_ids = {t["id"] for t in tracks}
-
-    orphaned = []
-    for st in set_tracks:
-        if st["set_id"] not in set_ids:
-            orphaned.append(st["id"])
-        elif st.get("track_id") and st["track_id"] not in track_ids:
-            # Track was deleted - null out the reference rather than deleting
+    return stats
+
+
+def _row_bytes(row) -> int:
+    return sys.getsizeof(row) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in row.items())
+
+
+def clean_orphaned_set_tracks(supabase: Client, dry_run: bool = False, since: str = None,
+                              page_size: int = 1000) -> dict:
+    """
+    Clean up set_tracks pointing to deleted tracks or sets.
+    set_tracks are streamed in set_id / track_id order and anti-joined against
+    the sets / tracks id streams, so memory stays at a page plus one batch of
+    fixes however large set_tracks gets. Fixes go out in chunked in_() calls.
+    `since` is ignored: orphans come from deleting the parent set or track,
+    which leaves no changed row behind, and the orphaned set_tracks are
+    usually old, so every run scans the whole table.
+    The reported peak is what the scan itself held (the open pages of both
+    streams plus pending fixes), counted rather than traced, so concurrent
+    phases don't show up in it.
+    """
+    stats = {"orphans_cleaned": 0, "orphan_scan_peak_rows": 0, "orphan_scan_peak_mb": 0.0}
+
+    log.info("--- Orphaned set_tracks ---")
+    deletes = []
+    nulls = []
+    streamed = {}
+    largest_row = [0]
+
+    def counted(name, rows):
+        """Count streamed rows; iter_keyset holds at most one page of them."""
+        streamed[name] = 0
+        for row in rows:
+            if not streamed[name]:
+                largest_row[0] = max(largest_row[0], _row_bytes(row))
+            streamed[name] += 1
+            yield row
+
+    def flush(force: bool = False):
+        pages = sum(min(n, page_size) for n in streamed.values())
+        stats["orphan_scan_peak_rows"] = max(stats["orphan_scan_peak_rows"], pages + len(deletes) + len(nulls))
+        if len(deletes) >= IN_CHUNK_SIZE or (force and deletes):
+            if not dry_run:
+                delete_in_batches(supabase, "set_tracks", "id", deletes)
+            deletes.clear()
+        if len(nulls) >= IN_CHUNK_SIZE or (force and nulls):
             if not dry_run:
-                supabase.table("set_tracks").update({"track_id": None}).eq("id", st["id"]).execute()
-            stats["orphans_cleaned"] += 1
+                for i in range(0, len(nulls), IN_CHUNK_SIZE):
+                    supabase.table("set_tracks").update({"track_id": None}).in_(
+                        "id", nulls[i:i + IN_CHUNK_SIZE]).execute()
+            nulls.clear()
+
+    set_orphans = anti_join(
+        counted("set_tracks", iter_keyset(supabase, "set_tracks", "id, set_id", "set_id", page_size)), "set_id",
+        (s["id"] for s in counted("ids", iter_keyset(supabase, "sets", "id", page_size=page_size))))
+    # Evaluated after the set pass, so rows deleted there aren't seen again
+    track_orphans = anti_join(
+        counted("set_tracks", iter_keyset(supabase, "set_tracks", "id, track_id", "track_id", page_size,
+                                          skip_null=True)), "track_id",
+        (t["id"] for t in counted("ids", iter_keyset(supabase, "tracks", "id", page_size=page_size))))
 
     # Delete set_tracks pointing to deleted sets
-    for orphan_id in orphaned:
-        if not dry_run:
-            supabase.table("set_tracks").delete().eq("id", orphan_id).execute()
+    for st in set_orphans:
+        deletes.append(st["id"])
         stats["orphans_cleaned"] += 1
+        flush()
+    flush(force=True)
+
+    # Track was deleted - null out the reference rather than deleting
+    for st in track_orphans:
+        nulls.append(st["id"])
+        stats["orphans_cleaned"] += 1
+        flush()
+    flush(force=True)
+
+    stats["orphan_scan_peak_mb"] = round(stats["orphan_scan_peak_rows"] * largest_row[0] / 1024 / 1024, 2)
 
     if stats["orphans_cleaned"]:
         log.info(f"  Cleaned {stats['orphans_cleaned']} orphaned set_track references")
+    log.info(f"  Orphan scan peak: {stats['orphan_scan_peak_rows']} rows held "
+             f"(~{stats['orphan_scan_peak_mb']} MB)")
 
     return stats
 
 
+def fix_normalization(supabase: Client, dry_run: bool = False, since: str = None) -> dict:
+    """Fix missing normalized fields, slugs, and broken references."""
+    stats = {}
+    stats.update(fix_title_normalization(supabase, dry_run, since))
+    stats.update(fix_artist_slugs(supabase, dry_run, since))
+    stats.update(clean_orphaned_set_tracks(supabase, dry_run, since))
+    return stats
+
+
 # ---------------------------------------------------------------------------
 # 5. Artist Name Normalization
 # ---------------------------------------------------------------------------
 
-def normalize_artist_names(supabase: Client, dry_run: bool = False) -> dict:
+def normalize_artist_names(supabase: Client, dry_run: bool = False, since: str = None) -> dict:
     """
     Fix common artist name issues:
     - Extra whitespace
@@ -471,7 +1014,7 @@ def normalize_artist_names(supabase: Client, dry_run: bool = False) -> dict:
     stats = {"names_fixed": 0}
 
     log.info("--- Artist Name Normalization ---")
-    artists = fetch_all(supabase, "artists", "id, name, slug")
+    artists = fetch_all(supabase, "artists", "id, name, slug", since=since)
 
     for a in artists:
         name = a.get("name", "")
@@ -516,16 +1059,67 @@ def normalize_artist_names(supabase: Client, dry_run: bool = False) -> dict:
 # 6. Update Denormalized Counts
 # ---------------------------------------------------------------------------
 
-def update_counts(supabase: Client, dry_run: bool = False) -> dict:
-    """Recalculate denormalized counts (tracks_count, sets_count on artists)."""
-    stats = {"counts_updated": 0}
+def apply_count_deltas(supabase: Client, dry_run: bool = False) -> dict:
+    """
+    Apply the journaled count deltas (import path, earlier runs) plus this
+    run's merge deltas in one batched write (apply_artist_count_deltas,
+    migration 030). Only the affected artists are touched.
+    """
+    stats = {"counts_updated": 0, "deltas_applied": 0}
+
+    log.info("--- Applying Count Deltas ---")
+    pending = COUNT_DELTAS.rows()
+    result = supabase.rpc("apply_artist_count_deltas", {"extra": pending, "dry_run": dry_run}).execute().data or {}
+    if not dry_run:
+        COUNT_DELTAS.clear()
+    stats["counts_updated"] = result.get("counts_updated", 0)
+    stats["deltas_applied"] = result.get("deltas_applied", 0)
+
+    log.info(f"  Applied {stats['deltas_applied']} deltas ({len(pending)} from this run) "
+             f"to {stats['counts_updated']} artists")
+    return stats
+
 
-    log.info("--- Updating Denormalized Counts ---")
+def _read_journal(supabase: Client) -> dict:
+    """The journaled count deltas, by id."""
+    return {d["id"]: d for d in iter_keyset(supabase, DELTA_TABLE, "id, artist_id, tracks_delta, sets_delta")}
+
+
+def reconcile_counts(supabase: Client, dry_run: bool = False) -> dict:
+    """
+    Recount tracks_count and sets_count for every artist. The recount
+    supersedes the pending deltas; artists whose recount differs from their
+    count plus pending deltas are reported as drift (a writer that doesn't
+    journal, or a lost delta).
+
+    The tables are read over many requests, not in one snapshot, so the
+    journal is read before and after them. A delta read before was written
+    after its rows, which the recount therefore counts; only those deltas are
+    deleted, by id (ids come from a sequence, not in commit order). An artist
+    with a delta journaled while the tables were read may or may not have
+    those rows counted: its count and deltas are left for the next run. (A
+    writer between its rows and its delta at the last journal read still gets
+    its delta applied on top of the recount; the next recount corrects it.)
+    """
+    stats = {"counts_updated": 0, "drift": 0}
+
+    log.info("--- Reconciling Denormalized Counts ---")
+
+    journal = _read_journal(supabase)
+    merged = COUNT_DELTAS.rows()
 
     artists = fetch_all(supabase, "artists", "id, tracks_count, sets_count")
     tracks = fetch_all(supabase, "tracks", "id, artist_id")
     sets_data = fetch_all(supabase, "sets", "id, artist_id")
 
+    late = {d["artist_id"] for i, d in _read_journal(supabase).items() if i not in journal}
+    pending = defaultdict(lambda: [0, 0])
+    for d in chain(journal.values(), merged):
+        pending[d["artist_id"]][0] += d.get("tracks_delta") or 0
+        pending[d["artist_id"]][1] += d.get("sets_delta") or 0
+    if late:
+        log.info(f"  {len(late)} artists had deltas journaled during the recount; left for the next run")
+
     # Count tracks per artist
     artist_track_counts = defaultdict(int)
     for t in tracks:
@@ -540,11 +1134,19 @@ def update_counts(supabase: Client, dry_run: bool = False) -> dict:
 
     for a in artists:
         aid = a["id"]
+        if aid in late:
+            continue
         expected_tracks = artist_track_counts.get(aid, 0)
         expected_sets = artist_set_counts.get(aid, 0)
         current_tracks = a.get("tracks_count") or 0
         current_sets = a.get("sets_count") or 0
 
+        # Drift: applying the deltas would not have produced the recount
+        tracks_delta, sets_delta = pending.get(aid, (0, 0))
+        predicted = (max(0, current_tracks + tracks_delta), max(0, current_sets + sets_delta))
+        if predicted != (expected_tracks, expected_sets):
+            stats["drift"] += 1
+
         if expected_tracks != current_tracks or expected_sets != current_sets:
             if not dry_run:
                 supabase.table("artists").update({
@@ -553,32 +1155,1012 @@ def update_counts(supabase: Client, dry_run: bool = False) -> dict:
                 }).eq("id", aid).execute()
             stats["counts_updated"] += 1
 
+    if not dry_run:
+        # This run's merge deltas for deferred artists join theirs in the journal
+        COUNT_DELTAS.clear()
+        for d in merged:
+            if d["artist_id"] in late:
+                COUNT_DELTAS.add(d["artist_id"], tracks=d["tracks_delta"], sets=d["sets_delta"])
+        COUNT_DELTAS.flush(supabase)
+        consumed = [i for i, d in journal.items() if d["artist_id"] not in late]
+        for i in range(0, len(consumed), IN_CHUNK_SIZE):
+            supabase.table(DELTA_TABLE).delete().in_("id", consumed[i:i + IN_CHUNK_SIZE]).execute()
+
     if stats["counts_updated"]:
         log.info(f"  Updated counts for {stats['counts_updated']} artists")
+    if stats["drift"]:
+        log.info(f"  Drift: {stats['drift']} artists' counts differ from what their deltas maintain")
+
+    return stats
+
+
+def update_counts(supabase: Client, dry_run: bool = False, since: str = None,
+                  reconcile: bool = None) -> dict:
+    """
+    Keep denormalized counts (tracks_count, sets_count on artists) current.
+    Incremental runs apply the per-artist deltas; full rescans (or
+    `reconcile`) recount every artist to catch drift.
+    """
+    if reconcile is None:
+        reconcile = since is None
+    if reconcile:
+        return reconcile_counts(supabase, dry_run)
+    return apply_count_deltas(supabase, dry_run)
+
+
+# ---------------------------------------------------------------------------
+# 7. Fuzzy Near-Duplicate Candidates
+# ---------------------------------------------------------------------------
+
+def max_edits(length: int, threshold: float) -> int:
+    """
+    Largest edit distance a string of `length` can have from any string it is
+    at least `threshold` similar to (similarity = 1 - distance / longer length).
+    """
+    return int((1 - threshold) * length / threshold + 1e-9)  # epsilon: (1 - 0.9) * 10 < 1.0
+
+
+class NgramBlockIndex:
+    """
+    Candidate generator for edit-distance matching using q-gram prefix filtering.
+
+    An edit destroys at most q grams, so two strings within k edits share at
+    least one of their first q*k+1 grams when every string's grams are ordered
+    the same way. Grams are ordered rarest-first and only those prefixes are
+    indexed, which keeps posting lists short and avoids comparing all pairs.
+    Candidates must also share enough grams overall (count filter) before the
+    edit distance is computed. Strings too short to have q*k+1 grams can't be
+    blocked this way and are paired with everything.
+    """
+
+    def __init__(self, texts: list, threshold: float = FUZZY_THRESHOLD, q: int = FUZZY_QGRAM):
+        self.texts = texts
+        self.threshold = threshold
+        self.q = q
+        grams = [self._grams(t, q) for t in texts]
+        self.gram_sets = [frozenset(gs) for gs in grams]
+        freq = Counter(g for gs in grams for g in gs)
+
+        self.prefixes = []
+        self.postings = defaultdict(list)
+        self.unblocked = []
+        for i, (text, gs) in enumerate(zip(texts, grams)):
+            prefix_len = q * max_edits(len(text), threshold) + 1
+            if len(gs) < prefix_len:
+                self.prefixes.append([])
+                self.unblocked.append(i)
+                continue
+            prefix = sorted(gs, key=lambda g: (freq[g], g))[:prefix_len]
+            self.prefixes.append(prefix)
+            for g in prefix:
+                self.postings[g].append(i)
+
+    @staticmethod
+    def _grams(text: str, q: int) -> list:
+        """q-grams tagged with their occurrence number, so repeats stay distinct."""
+        seen = Counter()
+        grams = []
+        for i in range(len(text) - q + 1):
+            g = text[i:i + q]
+            seen[g] += 1
+            grams.append((g, seen[g]))
+        return grams
+
+    def _passes_filters(self, i: int, j: int) -> bool:
+        li, lj = len(self.texts[i]), len(self.texts[j])
+        k = int((1 - self.threshold) * max(li, lj) + 1e-9)
+        if abs(li - lj) > k:
+            return False
+        gi, gj = self.gram_sets[i], self.gram_sets[j]
+        return len(gi & gj) >= max(len(gi), len(gj)) - self.q * k
+
+    def candidates(self, probe=None):
+        """
+        Yield (i, [j, ...]) for each probed index: the indexes that share a
+        prefix gram with it and pass the length and count filters. Each pair is
+        reported once. With `probe`, only those indexes are probed.
+        """
+        probe = range(len(self.texts)) if probe is None else probe
+        unblocked = set(self.unblocked)
+        emitted = set()
+        for i in probe:
+            if i in unblocked:
+                others = range(len(self.texts))
+            else:
+                others = chain.from_iterable(
+                    [self.postings[g] for g in self.prefixes[i]] + [self.unblocked])
+            matches = []
+            for j in others:
+                if j == i:
+                    continue
+                pair = (i, j) if i < j else (j, i)
+                if pair not in emitted and self._passes_filters(i, j):
+                    emitted.add(pair)
+                    matches.append(j)
+            if matches:
+                yield i, matches
+
+    def similar_pairs(self, probe=None):
+        """Yield (i, j, similarity), i < j, for candidate pairs at or above the threshold."""
+        for i, matches in self.candidates(probe):
+            scores = similarities(self.texts[i], [self.texts[j] for j in matches], self.threshold)
+            for j, sim in zip(matches, scores):
+                if sim >= self.threshold:
+                    yield min(i, j), max(i, j), sim
+
+
+def _fuzzy_candidates(kind: str, rows: list, key_fn, changed_ids: set = None,
+                      threshold: float = FUZZY_THRESHOLD) -> list:
+    """
+    Group rows by their exact key, then pair up keys that are near-duplicates.
+    Exact-key duplicates are left to the dedup phases.
+    """
+    by_key = defaultdict(list)
+    for row in rows:
+        key = key_fn(row)
+        if len(key) >= FUZZY_QGRAM:
+            by_key[key].append(row)
+
+    keys = list(by_key)
+    probe = None
+    if changed_ids is not None:
+        probe = [i for i, k in enumerate(keys) if any(r["id"] in changed_ids for r in by_key[k])]
+
+    index = NgramBlockIndex(keys, threshold)
+    candidates = []
+    for i, j, sim in index.similar_pairs(probe):
+        candidates.append({
+            "kind": kind,
+            "similarity": round(sim, 3),
+            "a": {"key": keys[i], "rows": [dict(r) for r in by_key[keys[i]]]},
+            "b": {"key": keys[j], "rows": [dict(r) for r in by_key[keys[j]]]},
+        })
+    candidates.sort(key=lambda c: c["similarity"], reverse=True)
+    return candidates
+
+
+def block_grams(key: str, spare: int = 0, threshold: float = FUZZY_THRESHOLD, q: int = FUZZY_QGRAM):
+    """
+    q-grams of `key` that every string at least `threshold` similar to it
+    contains at least one of (spare + 1 of them, with `spare`): k edits
+    destroy at most q*k of its grams, so any q*k+1 keep one. Grams without
+    spaces come first, since those are rarer. None when `key` is too short to
+    have enough grams.
+    """
+    needed = q * max_edits(len(key), threshold) + 1 + spare
+    grams = NgramBlockIndex._grams(key, q)
+    if len(grams) < needed:
+        return None
+    chosen = sorted(range(len(grams)), key=lambda i: (" " in grams[i][0], i))[:needed]
+    return {grams[i][0] for i in chosen}
+
+
+def _like_literal(text: str) -> str:
+    """
+    `text` as a literal inside a quoted PostgREST like pattern: LIKE's own
+    metacharacters (\\, %, _) are escaped, then the quoted value's (\\, ").
+    """
+    return re.sub(r'([\\"])', r"\\\1", re.sub(r"([\\%_])", r"\\\1", text))
+
+
+def fetch_like(supabase: Client, table: str, columns: str, like_columns: tuple, grams,
+               chunk_size: int = FUZZY_LIKE_CHUNK, page_size: int = 1000) -> CompactTable:
+    """Fetch rows where any of `like_columns` contains one of `grams`."""
+    grams = sorted(grams)
+    all_rows = CompactTable(columns)
+    for i in range(0, len(grams), chunk_size):
+        chunk = grams[i:i + chunk_size]
+        expr = ",".join(f'{column}.like."*{_like_literal(g)}*"' for column in like_columns for g in chunk)
+        offset = 0
+        while True:
+            result = supabase.table(table).select(columns).or_(expr).range(offset, offset + page_size - 1).execute()
+            rows = result.data or []
+            all_rows.extend(rows)
+            if len(rows) < page_size:
+                break
+            offset += page_size
+    return all_rows
+
+
+def _artist_fuzzy_key(a) -> str:
+    return normalize_text(a.get("name", ""))
+
+
+def _track_fuzzy_key(t) -> str:
+    return (f"{normalize_text(t.get('artist_name') or '')} "
+            f"{(t.get('title_normalized') or normalize_text(t.get('title', ''))).strip()}").strip()
+
+
+def fetch_fuzzy_neighbours(supabase: Client, table: str, columns: str, changed, key_fn: Callable,
+                           like_columns: tuple, spare: int = 0) -> list:
+    """
+    The changed rows plus every row that could be a near-duplicate of one:
+    rows whose normalized `like_columns` contain one of the changed keys'
+    block_grams(). Falls back to the whole table when a changed key is too
+    short to block.
+    """
+    grams = set()
+    for row in changed:
+        key = key_fn(row)
+        if len(key) < FUZZY_QGRAM:
+            continue
+        block = block_grams(key, spare)
+        if block is None:
+            log.info(f"  {table}: '{key}' is too short to block, comparing against every row")
+            return union_rows(changed, fetch_all(supabase, table, columns))
+        grams |= block
+    return union_rows(changed, fetch_like(supabase, table, columns, like_columns, grams))
+
+
+def find_fuzzy_duplicates(supabase: Client, dry_run: bool = False, since: str = None) -> dict:
+    """
+    Find artists and tracks whose normalized names are near-duplicates
+    (typos, stray characters) and write them to a JSONL file for review.
+    Nothing is merged. With `since`, only pairs involving a changed row are
+    reported, and only the changed rows and the rows sharing a block gram
+    with them are fetched.
+    """
+    stats = {"artist_candidates": 0, "track_candidates": 0, "candidates_file": None}
+
+    log.info("--- Fuzzy Near-Duplicate Candidates ---")
+    artist_columns = "id, name, sets_count, tracks_count, updated_at"
+    track_columns = "id, title, title_normalized, artist_name, times_played, updated_at"
+    changed_artists = changed_tracks = None
+    if since:
+        changed = fetch_all(supabase, "artists", artist_columns, since=since)
+        changed_artists = {a["id"] for a in changed}
+        artists = fetch_fuzzy_neighbours(supabase, "artists", artist_columns, changed,
+                                         _artist_fuzzy_key, ("name_normalized",))
+        changed = fetch_all(supabase, "tracks", track_columns, since=since)
+        changed_tracks = {t["id"] for t in changed}
+        # A track key is "artist title": one more surviving gram than the
+        # q grams spanning the joining space always lies within one column
+        tracks = fetch_fuzzy_neighbours(supabase, "tracks", track_columns, changed, _track_fuzzy_key,
+                                        ("title_normalized", "artist_name_normalized"), spare=FUZZY_QGRAM)
+        log.info(f"  Incremental: {len(changed_artists)} changed artists ({len(artists)} rows to compare), "
+                 f"{len(changed_tracks)} changed tracks ({len(tracks)} rows to compare)")
+    else:
+        artists = fetch_all(supabase, "artists", artist_columns)
+        tracks = fetch_all(supabase, "tracks", track_columns)
+
+    candidates = _fuzzy_candidates("artist", artists, _artist_fuzzy_key, changed_artists)
+    stats["artist_candidates"] = len(candidates)
+
+    track_candidates = _fuzzy_candidates("track", tracks, _track_fuzzy_key, changed_tracks)
+    stats["track_candidates"] = len(track_candidates)
+    candidates.extend(track_candidates)
+
+    if candidates:
+        FUZZY_REPORT_DIR.mkdir(exist_ok=True)
+        path = FUZZY_REPORT_DIR / f"fuzzy_candidates_{datetime.now().strftime('%Y-%m-%d')}.jsonl"
+        with open(path, "w") as f:
+            for c in candidates:
+                f.write(json.dumps(c) + "\n")
+        stats["candidates_file"] = str(path)
+        log.info(f"  {stats['artist_candidates']} artist and {stats['track_candidates']} track "
+                 f"candidate pairs written to {path}")
+
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# 8. Content Duplicate Sets
+# ---------------------------------------------------------------------------
+
+MINHASH_PRIME = 4294967291  # largest prime below 2**32, keeps a*x+b inside uint64
+
+
+class MinHasher:
+    """MinHash signatures over string elements using (a*x + b) mod p permutations."""
+
+    def __init__(self, num_perm: int = CONTENT_NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.a = [rng.randrange(1, MINHASH_PRIME) for _ in range(num_perm)]
+        self.b = [rng.randrange(0, MINHASH_PRIME) for _ in range(num_perm)]
+        if np is not None:
+            self._a = np.array(self.a, dtype=np.uint64)[:, None]
+            self._b = np.array(self.b, dtype=np.uint64)[:, None]
+
+    def signature(self, elements) -> tuple:
+        xs = [zlib.crc32(e.encode()) for e in set(elements)]
+        if np is not None:
+            x = np.array(xs, dtype=np.uint64)[None, :]
+            return tuple(((self._a * x + self._b) % np.uint64(MINHASH_PRIME)).min(axis=1).tolist())
+        return tuple(min((a * x + b) % MINHASH_PRIME for x in xs) for a, b in zip(self.a, self.b))
+
+
+def pack_signature(signature) -> bytes:
+    """A MinHash signature as 4 bytes per value (every value is below 2**32)."""
+    return array("I", signature).tobytes()
+
+
+def _bands(signature, bands: int) -> list:
+    rows = len(signature) // bands
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(bands)]
+
+
+def lsh_candidate_pairs(signatures: dict, bands: int = CONTENT_BANDS, probe: set = None) -> set:
+    """
+    Bucket signatures band by band; ids sharing any band bucket become candidate
+    pairs. With `probe`, only pairs involving one of those ids are returned.
+    """
+    buckets = defaultdict(list)
+    for key, sig in signatures.items():
+        for band_key in _bands(sig, bands):
+            buckets[band_key].append(key)
+
+    pairs = set()
+    for ids in buckets.values():
+        if len(ids) < 2:
+            continue
+        for a, b in combinations(sorted(ids), 2):
+            if probe is None or a in probe or b in probe:
+                pairs.add((a, b))
+    return pairs
+
+
+def lsh_probe_pairs(probe_signatures: dict, signatures, bands: int = CONTENT_BANDS) -> set:
+    """
+    Candidate pairs between the probe signatures and a stream of (id, signature):
+    only the probes' band buckets are held, not the streamed signatures.
+    """
+    buckets = defaultdict(list)
+    for key, sig in probe_signatures.items():
+        for band_key in _bands(sig, bands):
+            buckets[band_key].append(key)
+
+    pairs = set()
+    for key, sig in signatures:
+        for band_key in _bands(sig, bands):
+            for other in buckets.get(band_key, ()):
+                if other != key:
+                    pairs.add((min(key, other), max(key, other)))
+    return pairs
+
+
+def _track_sequence(rows) -> list:
+    """A set's identified track ids in position order, or None if too few to compare."""
+    rows = sorted((r.get("position") or 0, sys.intern(r["track_id"])) for r in rows if r.get("track_id"))
+    if len({track_id for _, track_id in rows}) < CONTENT_MIN_TRACKS:
+        return None
+    return [track_id for _, track_id in rows]
+
+
+def fetch_track_sequences(supabase: Client, set_ids) -> dict:
+    """Track sequences (see _track_sequence) of just these sets."""
+    by_set = defaultdict(list)
+    for st in fetch_in(supabase, "set_tracks", "set_id, track_id, position", "set_id", set_ids):
+        by_set[st["set_id"]].append(st)
+    sequences = {set_id: _track_sequence(rows) for set_id, rows in by_set.items()}
+    return {set_id: seq for set_id, seq in sequences.items() if seq}
+
+
+def stream_set_signatures(supabase: Client, hasher: "MinHasher"):
+    """
+    Yield (set_id, packed signature) for every set with enough tracks,
+    streaming set_tracks in set_id order so only one set is held at a time.
+    """
+    current, rows = None, []
+    for st in chain(iter_keyset(supabase, "set_tracks", "id, set_id, track_id, position", "set_id"),
+                    [{"set_id": None}]):
+        if st["set_id"] != current:
+            sequence = _track_sequence(rows) if rows else None
+            if sequence:
+                yield current, pack_signature(hasher.signature(sequence))
+            current, rows = st["set_id"], []
+        rows.append(st)
+
+
+def find_content_duplicate_sets(supabase: Client, dry_run: bool = False, since: str = None) -> dict:
+    """
+    Find sets whose tracklists mostly match (same recording uploaded under
+    different titles) and write them to a JSONL file for review.
+    Candidates come from MinHash/LSH over each set's track_ids and are confirmed
+    by exact Jaccard or ordered-sequence overlap. Nothing is merged.
+    set_tracks is streamed once and only a signature per set is kept; the
+    full sequences are fetched for candidate pairs only. With `since`, only
+    sets changed since then are probed, and only their signatures are kept.
+    """
+    stats = {"sets_compared": 0, "candidate_pairs": 0, "flagged_pairs": 0, "candidates_file": None}
+
+    log.info("--- Content Duplicate Sets ---")
+    hasher = MinHasher()
+    if since:
+        probe = {s["id"] for s in fetch_all(supabase, "sets", "id", since=since)}
+        probe |= {st["set_id"] for st in fetch_all(supabase, "set_tracks", "set_id",
+                                                   since=since, since_column="created_at")}
+        probe_signatures = {set_id: pack_signature(hasher.signature(seq))
+                            for set_id, seq in fetch_track_sequences(supabase, probe).items()}
+        signatures = stream_set_signatures(supabase, hasher)
+        pairs = lsh_probe_pairs(probe_signatures, signatures) if probe_signatures else set()
+        stats["sets_compared"] = len(probe_signatures)
+    else:
+        signatures = dict(stream_set_signatures(supabase, hasher))
+        pairs = lsh_candidate_pairs(signatures)
+        stats["sets_compared"] = len(signatures)
+    stats["candidate_pairs"] = len(pairs)
+
+    sequences = fetch_track_sequences(supabase, {set_id for pair in pairs for set_id in pair})
+    flagged = []
+    for a, b in pairs:
+        seq_a, seq_b = sequences[a], sequences[b]
+        set_a, set_b = set(seq_a), set(seq_b)
+        jaccard = len(set_a & set_b) / len(set_a | set_b)
+        overlap = SequenceMatcher(None, seq_a, seq_b, autojunk=False).ratio()
+        if max(jaccard, overlap) >= CONTENT_THRESHOLD:
+            flagged.append({"a": a, "b": b, "jaccard": round(jaccard, 3), "sequence_overlap": round(overlap, 3)})
+    stats["flagged_pairs"] = len(flagged)
+
+    if flagged:
+        sets_by_id = {
+            s["id"]: dict(s) for s in fetch_in(supabase, "sets", "id, name, artist_name, external_id, tracks_count",
+                                         "id", {p[k] for p in flagged for k in ("a", "b")})
+        }
+        flagged.sort(key=lambda p: max(p["jaccard"], p["sequence_overlap"]), reverse=True)
+        FUZZY_REPORT_DIR.mkdir(exist_ok=True)
+        path = FUZZY_REPORT_DIR / f"content_duplicate_sets_{datetime.now().strftime('%Y-%m-%d')}.jsonl"
+        with open(path, "w") as f:
+            for pair in flagged:
+                pair["a"] = sets_by_id.get(pair["a"], {"id": pair["a"]})
+                pair["b"] = sets_by_id.get(pair["b"], {"id": pair["b"]})
+                f.write(json.dumps(pair) + "\n")
+        stats["candidates_file"] = str(path)
+        log.info(f"  {stats['flagged_pairs']} likely duplicate set pairs "
+                 f"({stats['candidate_pairs']} LSH candidates) written to {path}")
 
     return stats
 
 
+# ---------------------------------------------------------------------------
+# Set-based SQL engine (--engine sql)
+# ---------------------------------------------------------------------------
+
+# Phases with a set-based equivalent in supabase/migrations/029_cleanup_set_based_dedup.sql
+SQL_ENGINE_FUNCTIONS = {
+    "artist_dedup": "cleanup_dedup_artists",
+    "track_dedup": "cleanup_dedup_tracks",
+    "set_dedup": "cleanup_dedup_sets",
+    "counts": "cleanup_update_counts",
+}
+
+
+def run_sql_phase(supabase: Client, function: str, dry_run: bool = False) -> dict:
+    """
+    Run one phase server-side. The function ranks, re-points and deletes
+    with a few set-based statements in one transaction and returns the same
+    stats as the Python phase. It always covers the whole table: a full pass
+    costs about what an incremental Python pass does.
+    """
+    log.info(f"--- {function} (set-based SQL) ---")
+    stats = supabase.rpc(function, {"dry_run": dry_run}).execute().data or {}
+    log.info(f"  {function}: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+    return stats
+
+
+def _sql_phase(function: str) -> Callable:
+    def run(supabase: Client, dry_run: bool = False, since: str = None) -> dict:
+        return run_sql_phase(supabase, function, dry_run)
+    run.__name__ = function
+    return run
+
+
+def phases_for_engine(engine: str) -> list:
+    """CLEANUP_PHASES, with the SQL engine's phases swapped in for engine == "sql"."""
+    if engine == "python":
+        return CLEANUP_PHASES
+    return [replace(phase, func=_sql_phase(SQL_ENGINE_FUNCTIONS[phase.name]))
+            if phase.name in SQL_ENGINE_FUNCTIONS else phase
+            for phase in CLEANUP_PHASES]
+
+
+# ---------------------------------------------------------------------------
+# Profiling
+# ---------------------------------------------------------------------------
+
+WRITE_METHODS = ("insert", "update", "upsert", "delete")
+
+
+def _json_size(value) -> int:
+    """Size of `value` as a JSON body, standing in for bytes on the wire."""
+    if value is None:
+        return 0
+    return len(json.dumps(value, default=str))
+
+
+class PhaseProfile:
+    """PostgREST traffic counters for one phase."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.rows_read = 0
+        self.rows_written = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.api_seconds = 0.0
+        self.slowest_call_seconds = 0.0
+
+    def record(self, kind: str, rows: int, bytes_sent: int, bytes_received: int, seconds: float):
+        self.calls[kind] += 1
+        if kind in WRITE_METHODS:
+            self.rows_written += rows
+        else:
+            self.rows_read += rows
+        self.bytes_sent += bytes_sent
+        self.bytes_received += bytes_received
+        self.api_seconds += seconds
+        self.slowest_call_seconds = max(self.slowest_call_seconds, seconds)
+
+    def summary(self, wall_seconds: float, cpu_seconds: float) -> dict:
+        rows = self.rows_read + self.rows_written
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "api_seconds": round(self.api_seconds, 3),
+            "cpu_seconds": round(cpu_seconds, 3),
+            "slowest_call_seconds": round(self.slowest_call_seconds, 3),
+            "calls": sum(self.calls.values()),
+            "calls_by_kind": dict(self.calls),
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "rows_per_second": round(rows / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+        }
+
+
+class ProfilingClient:
+    """
+    Wraps a supabase Client and records every request made through it
+    into a PhaseProfile. Anything other than table()/rpc() passes through.
+    """
+
+    def __init__(self, client, profile: PhaseProfile):
+        self._client = client
+        self._profile = profile
+
+    def table(self, name: str):
+        return _ProfiledQuery(self._client.table(name), self._profile)
+
+    def rpc(self, fn: str, params: dict = None, **kwargs):
+        return _ProfiledQuery(self._client.rpc(fn, params or {}, **kwargs), self._profile, "rpc", params)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class _ProfiledQuery:
+    """Query builder proxy: follows the call chain, times execute()."""
+
+    __slots__ = ("_query", "_profile", "_kind", "_payload")
+
+    def __init__(self, query, profile: PhaseProfile, kind: str = None, payload=None):
+        self._query = query
+        self._profile = profile
+        self._kind = kind
+        self._payload = payload
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if name == "execute":
+            return self._execute
+        if not callable(attr):
+            # e.g. `.not_`, which returns a builder rather than being called
+            return _ProfiledQuery(attr, self._profile, self._kind, self._payload)
+
+        def call(*args, **kwargs):
+            kind, payload = self._kind, self._payload
+            if kind is None and name in ("select",) + WRITE_METHODS:
+                kind = name
+                if name != "select" and args:
+                    payload = args[0]
+            return _ProfiledQuery(attr(*args, **kwargs), self._profile, kind, payload)
+        return call
+
+    def _execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        response = self._query.execute(*args, **kwargs)
+        seconds = time.perf_counter() - started
+        data = getattr(response, "data", None)
+        rows = len(data) if isinstance(data, list) else int(bool(data))
+        self._profile.record(self._kind or "select", rows, _json_size(self._payload),
+                             _json_size(data), seconds)
+        return response
+
+
+def log_profile(profiles: dict):
+    """Log the per-phase profile as a table."""
+    log.info(f"  {'Phase':<20} {'wall':>7} {'api':>7} {'cpu':>7} {'calls':>6} "
+             f"{'rows in':>9} {'rows out':>9} {'KB in':>9} {'KB out':>8} {'rows/s':>9}")
+    for name, p in profiles.items():
+        log.info(f"  {name:<20} {p['wall_seconds']:>7.2f} {p['api_seconds']:>7.2f} {p['cpu_seconds']:>7.2f} "
+                 f"{p['calls']:>6} {p['rows_read']:>9} {p['rows_written']:>9} "
+                 f"{p['bytes_received'] / 1024:>9.1f} {p['bytes_sent'] / 1024:>8.1f} {p['rows_per_second']:>9.1f}")
+
+
+# ---------------------------------------------------------------------------
+# Phase Scheduler
+# ---------------------------------------------------------------------------
+
+@dataclass
+class CleanupPhase:
+    """
+    A cleanup phase plus the data it reads and writes.
+
+    Resources are "table" or "table.column" strings. A bare table name covers
+    every column of that table, so phases that insert or delete rows must
+    declare the bare table name in `writes`.
+    """
+    name: str
+    func: Callable[[Client, bool, str], dict]
+    reads: frozenset
+    writes: frozenset
+    stats_key: str = ""
+
+    def __post_init__(self):
+        self.stats_key = self.stats_key or self.name
+
+
+def _resources_overlap(a: str, b: str) -> bool:
+    return a == b or a.startswith(b + ".") or b.startswith(a + ".")
+
+
+def _phases_conflict(earlier: CleanupPhase, later: CleanupPhase) -> bool:
+    """True if the two phases touch the same data and one of them writes it."""
+    pairs = [
+        (earlier.writes, later.reads),
+        (earlier.writes, later.writes),
+        (earlier.reads, later.writes),
+    ]
+    return any(_resources_overlap(a, b) for left, right in pairs for a in left for b in right)
+
+
+# Declaration order is the sequential order; a phase only waits for the
+# earlier phases it conflicts with.
+CLEANUP_PHASES = [
+    CleanupPhase(
+        "artist_dedup", dedup_artists,
+        reads=frozenset({"artists"}),
+        writes=frozenset({"artists", "artist_aliases", "tracks.artist_id", "tracks.artist_name",
+                          "sets.artist_id", "sets.artist_name", "set_tracks.raw_artist"}),
+    ),
+    CleanupPhase(
+        "track_dedup", dedup_tracks,
+        reads=frozenset({"tracks"}),
+        writes=frozenset({"tracks", "track_aliases", "set_tracks.track_id"}),
+    ),
+    CleanupPhase(
+        "set_dedup", dedup_sets,
+        reads=frozenset({"sets"}),
+        writes=frozenset({"sets", "set_tracks"}),
+    ),
+    CleanupPhase(
+        "title_normalization", fix_title_normalization,
+        reads=frozenset({"tracks.id", "tracks.title", "tracks.title_normalized"}),
+        writes=frozenset({"tracks.title_normalized"}),
+        stats_key="normalization",
+    ),
+    CleanupPhase(
+        "artist_slugs", fix_artist_slugs,
+        reads=frozenset({"artists.id", "artists.name", "artists.slug"}),
+        writes=frozenset({"artists.slug"}),
+        stats_key="normalization",
+    ),
+    CleanupPhase(
+        "orphan_cleanup", clean_orphaned_set_tracks,
+        reads=frozenset({"set_tracks", "sets.id", "tracks.id"}),
+        writes=frozenset({"set_tracks"}),
+        stats_key="normalization",
+    ),
+    CleanupPhase(
+        "name_fixes", normalize_artist_names,
+        reads=frozenset({"artists.id", "artists.name", "artists.slug"}),
+        writes=frozenset({"artists.name", "artists.slug"}),
+    ),
+    CleanupPhase(
+        "counts", update_counts,
+        reads=frozenset({"artists.id", "artists.tracks_count", "artists.sets_count",
+                         "tracks.id", "tracks.artist_id", "sets.id", "sets.artist_id", DELTA_TABLE}),
+        writes=frozenset({"artists.tracks_count", "artists.sets_count", DELTA_TABLE}),
+    ),
+    CleanupPhase(
+        "fuzzy_candidates", find_fuzzy_duplicates,
+        reads=frozenset({"artists.id", "artists.name", "artists.name_normalized", "artists.sets_count",
+                         "artists.tracks_count", "artists.updated_at", "tracks.id", "tracks.title",
+                         "tracks.title_normalized", "tracks.artist_name", "tracks.artist_name_normalized",
+                         "tracks.times_played", "tracks.updated_at"}),
+        writes=frozenset(),
+    ),
+    CleanupPhase(
+        "content_duplicates", find_content_duplicate_sets,
+        reads=frozenset({"set_tracks.id", "set_tracks.set_id", "set_tracks.track_id", "set_tracks.position",
+                         "set_tracks.created_at", "sets.id", "sets.name", "sets.artist_name",
+                         "sets.external_id", "sets.tracks_count", "sets.updated_at"}),
+        writes=frozenset(),
+    ),
+]
+
+
+def build_phase_dag(phases: list) -> dict:
+    """Map each phase name to the names of the earlier phases it must wait for."""
+    deps = {}
+    for i, phase in enumerate(phases):
+        deps[phase.name] = {
+            earlier.name for earlier in phases[:i] if _phases_conflict(earlier, phase)
+        }
+    return deps
+
+
+def critical_path(phases: list, deps: dict, durations: dict) -> tuple:
+    """Longest dependency chain by measured duration. Returns (phase names, seconds)."""
+    finish = {}
+    prev = {}
+    for phase in phases:  # declaration order is a topological order
+        before = max(deps[phase.name], key=lambda d: finish[d], default=None)
+        prev[phase.name] = before
+        finish[phase.name] = (finish[before] if before else 0.0) + durations.get(phase.name, 0.0)
+
+    if not finish:
+        return [], 0.0
+    node = max(finish, key=finish.get)
+    total = finish[node]
+    path = []
+    while node:
+        path.append(node)
+        node = prev[node]
+    return list(reversed(path)), total
+
+
+def run_phases(supabase: Client, phases: list, dry_run: bool = False,
+               workers: int = DEFAULT_WORKERS, since: str = None,
+               profile: bool = False, profile_dir: Path = None) -> tuple:
+    """
+    Run phases as soon as their dependencies finish, up to `workers` at a time.
+    `since` is passed to every phase (None = full rescan).
+    With `profile`, each phase gets a ProfilingClient; with `profile_dir`, a
+    cProfile dump per phase is written there as <phase>.pstats.
+    Returns (results by phase name, durations by phase name, dependency map,
+    profile summaries by phase name).
+    """
+    deps = build_phase_dag(phases)
+    by_name = {p.name: p for p in phases}
+    results = {}
+    durations = {}
+    profiles = {}
+    pending = [p.name for p in phases]
+    running = {}
+
+    def timed(phase):
+        client, counters, profiler = supabase, None, None
+        if hasattr(supabase, "for_phase"):
+            # Snapshot runs label each planned write with the phase that made it
+            client = supabase.for_phase(phase.name)
+        if profile or profile_dir:
+            counters = PhaseProfile()
+            client = ProfilingClient(client, counters)
+        if profile_dir:
+            profiler = cProfile.Profile()
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            if profiler:
+                profiler.enable()
+            with MEMORY.phase(phase.name):
+                return phase.func(client, dry_run, since)
+        finally:
+            if profiler:
+                profiler.disable()
+            durations[phase.name] = time.perf_counter() - start
+            if counters:
+                profiles[phase.name] = counters.summary(durations[phase.name], time.thread_time() - cpu_start)
+            if profiler:
+                pstats_path = profile_dir / f"{phase.name}.pstats"
+                profiler.dump_stats(str(pstats_path))
+                profiles[phase.name]["pstats"] = str(pstats_path)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="cleanup") as pool:
+        failure = None
+        while pending or running:
+            if failure is None:
+                for name in [n for n in pending if deps[n] <= results.keys()]:
+                    if len(running) >= max(1, workers):
+                        break
+                    pending.remove(name)
+                    running[pool.submit(timed, by_name[name])] = name
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    log.error(f"  Phase {name} failed: {e}")
+                    failure = failure or e
+
+        if failure is not None:
+            raise failure
+
+    return results, durations, deps, profiles
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
-def run_cleanup(dry_run: bool = False):
-    """Run all cleanup tasks."""
+def load_state() -> dict:
+    """Load the incremental cleanup state (watermark, last full rescan)."""
+    if not STATE_PATH.exists():
+        return {}
+    try:
+        return json.loads(STATE_PATH.read_text())
+    except (OSError, ValueError) as e:
+        log.warning(f"Ignoring unreadable cleanup state {STATE_PATH}: {e}")
+        return {}
+
+
+def save_state(state: dict):
+    """Write the cleanup state atomically."""
+    STATE_PATH.parent.mkdir(exist_ok=True)
+    tmp_path = STATE_PATH.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2))
+    os.replace(tmp_path, STATE_PATH)
+
+
+def resolve_since(state: dict, now: datetime, full: bool = False):
+    """Pick the incremental lower bound, or None when a full rescan is needed."""
+    if full or not state.get("watermark"):
+        return None
+    last_full = state.get("last_full_at")
+    if not last_full or now - datetime.fromisoformat(last_full) >= timedelta(days=FULL_RESCAN_DAYS):
+        return None
+    return (datetime.fromisoformat(state["watermark"]) - WATERMARK_OVERLAP).isoformat()
+
+
+def dump_snapshot(supabase: Client, path: Path) -> dict:
+    """Copy every table the phases read into a SQLite snapshot at `path`."""
+    log.info(f"Writing snapshot to {path}...")
+    counts = write_snapshot(path, {table: iter_keyset(supabase, table, "*") for table in SNAPSHOT_TABLES})
+    for table, n in counts.items():
+        log.info(f"  {table}: {n} rows")
+    return counts
+
+
+@contextmanager
+def cleanup_client(snapshot: Path = None, plan_path: Path = None, refresh_snapshot: bool = False):
+    """
+    The client the phases run against: the live database, or with `snapshot`
+    a SnapshotClient over that file (dumped first if missing or if
+    `refresh_snapshot`) that records writes to `plan_path`.
+    """
+    if snapshot is None:
+        yield create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+        return
+    if refresh_snapshot or not snapshot.exists():
+        snapshot.parent.mkdir(parents=True, exist_ok=True)
+        dump_snapshot(create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY), snapshot)
+    with open_snapshot(snapshot, plan_path) as client:
+        yield client
+
+
+def run_cleanup(dry_run: bool = False, workers: int = DEFAULT_WORKERS, full: bool = False,
+                profile: bool = False, profile_dir: str = None, max_memory_mb: int = None,
+                processes: int = 1, snapshot: str = None, plan_path: str = None,
+                refresh_snapshot: bool = False, engine: str = "python", reconcile_counts: bool = False):
+    """
+    Run all cleanup tasks.
+    Incremental by default: only rows changed since the last successful run
+    are checked. A full rescan runs with `full`, on the first run, and at
+    least every FULL_RESCAN_DAYS.
+    With `profile`, per-phase timings and PostgREST traffic are logged and
+    returned under "profile"; `profile_dir` also writes cProfile dumps.
+    With `max_memory_mb`, artist and track dedup fall back to hash-partitioned
+    passes near the budget, and per-phase peak memory is returned under "memory".
+    With `processes` > 1, artist and track dedup plan their merges in a
+    process pool, sharded by merge key.
+    With `snapshot`, nothing is written to the database: the phases run
+    against a local snapshot (a full rescan) and their writes are saved to
+    `plan_path` for apply_cleanup_plan(). The watermark is left as is.
+    With engine="sql", artist/track/set dedup and the count recalculation run
+    server-side as set-based SQL (migration 029) instead of in Python.
+    Counts are kept current by applying per-artist deltas (migration 030);
+    full rescans and `reconcile_counts` recount every artist instead and
+    report drift under counts.drift.
+    """
+    if engine == "sql" and snapshot:
+        raise ValueError("the SQL engine runs server-side and can't be used with a snapshot")
+    phases = phases_for_engine(engine)
+    if reconcile_counts and engine == "python":
+        phases = [replace(phase, func=partial(update_counts, reconcile=True)) if phase.name == "counts" else phase
+                  for phase in phases]
+    if profile_dir:
+        profile_dir = Path(profile_dir)
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        if workers > 1:
+            # Only one profiler can be active at a time, and concurrent phases
+            # would also skew each other's wall time
+            log.info("Profiling to a directory: running phases one at a time")
+            workers = 1
+
+    if snapshot:
+        snapshot = Path(snapshot)
+        plan_path = Path(plan_path) if plan_path else PLAN_DIR / f"cleanup_plan_{datetime.now():%Y-%m-%d}.jsonl"
+        # The snapshot is a scratch copy: phases write to it so later phases
+        # see earlier merges, and the plan is the preview
+        dry_run = False
+        full = True
+
+    state = load_state()
+    run_started_at = datetime.now(timezone.utc)
+    since = resolve_since(state, run_started_at, full)
+
     log.info("=" * 60)
     log.info(f"Starting database cleanup at {datetime.now().isoformat()}")
-    log.info(f"Dry run: {dry_run}")
+    log.info(f"Dry run: {dry_run}, Workers: {workers}, Dedup processes: {processes}, Engine: {engine}")
+    if max_memory_mb:
+        log.info(f"Memory budget: {max_memory_mb} MB")
+    log.info(f"Mode: {'incremental since ' + since if since else 'full rescan'}")
+    if snapshot:
+        log.info(f"Snapshot: {snapshot}, plan: {plan_path}")
     log.info("=" * 60)
 
-    supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    if max_memory_mb:
+        MEMORY.start(max_memory_mb * 1024 * 1024)
+    start_shard_pool(processes)
+    COUNT_DELTAS.clear()
+    started = time.perf_counter()
+    try:
+        with cleanup_client(snapshot, plan_path, refresh_snapshot) as supabase:
+            try:
+                results, durations, deps, profiles = run_phases(supabase, phases, dry_run, workers, since,
+                                                                profile, profile_dir)
+            finally:
+                # Merges done before a failed phase: journal their deltas for the next run
+                if COUNT_DELTAS.rows() and not dry_run and not snapshot:
+                    log.info(f"Journaling {COUNT_DELTAS.flush(supabase)} unapplied count deltas")
+                COUNT_DELTAS.clear()
+            planned_ops = supabase.planned_ops if snapshot else None
+    finally:
+        stop_shard_pool()
+        memory = MEMORY.report() if max_memory_mb else None
+        MEMORY.stop()
+    wall_seconds = time.perf_counter() - started
+
+    # Only advance the watermark after every phase succeeded
+    if not dry_run and not snapshot:
+        state["watermark"] = run_started_at.isoformat()
+        if since is None:
+            state["last_full_at"] = run_started_at.isoformat()
+        save_state(state)
 
     all_stats = {}
-    all_stats["artist_dedup"] = dedup_artists(supabase, dry_run)
-    all_stats["track_dedup"] = dedup_tracks(supabase, dry_run)
-    all_stats["set_dedup"] = dedup_sets(supabase, dry_run)
-    all_stats["normalization"] = fix_normalization(supabase, dry_run)
-    all_stats["name_fixes"] = normalize_artist_names(supabase, dry_run)
-    all_stats["counts"] = update_counts(supabase, dry_run)
+    for phase in phases:
+        all_stats.setdefault(phase.stats_key, {}).update(results[phase.name])
+
+    path, path_seconds = critical_path(phases, deps, durations)
+    all_stats["mode"] = {"incremental": since is not None, "since": since}
+    if snapshot:
+        all_stats["plan"] = {"path": str(plan_path), "ops": planned_ops, "snapshot": snapshot_info(snapshot)}
+    all_stats["schedule"] = {
+        "wall_seconds": round(wall_seconds, 2),
+        "critical_path": path,
+        "critical_path_seconds": round(path_seconds, 2),
+        "phase_seconds": {name: round(secs, 2) for name, secs in durations.items()},
+    }
+    if memory:
+        memory["phases"] = {p.name: memory["phases"][p.name]
+                            for p in phases if p.name in memory["phases"]}
+        all_stats["memory"] = memory
+    if profiles:
+        ordered = {p.name: profiles[p.name] for p in phases if p.name in profiles}
+        all_stats["profile"] = {
+            "phases": ordered,
+            "totals": {
+                key: sum(p[key] for p in ordered.values())
+                for key in ("calls", "rows_read", "rows_written", "bytes_sent", "bytes_received")
+            },
+        }
+        if profile_dir:
+            (profile_dir / "summary.json").write_text(json.dumps(all_stats["profile"], indent=2))
 
     log.info("\n" + "=" * 60)
     log.info("CLEANUP COMPLETE")
@@ -588,14 +2170,101 @@ def run_cleanup(dry_run: bool = False):
     log.info(f"  Normalization fixes: {all_stats['normalization']['tracks_fixed'] + all_stats['normalization']['artists_fixed']}")
     log.info(f"  Name fixes: {all_stats['name_fixes']['names_fixed']}")
     log.info(f"  Count updates: {all_stats['counts']['counts_updated']}")
+    log.info(f"  Fuzzy candidates: {all_stats['fuzzy_candidates']['artist_candidates']} artists, "
+             f"{all_stats['fuzzy_candidates']['track_candidates']} tracks")
+    log.info(f"  Content duplicate sets: {all_stats['content_duplicates']['flagged_pairs']}")
+    if snapshot:
+        log.info(f"  Planned writes: {planned_ops} -> {plan_path} "
+                 f"(snapshot taken {all_stats['plan']['snapshot']['taken_at']})")
+    log.info(f"  Wall time: {wall_seconds:.1f}s")
+    log.info(f"  Critical path: {' -> '.join(path)} ({path_seconds:.1f}s)")
+    if memory:
+        log.info(f"  Peak memory: {memory['peak_mb']} MB of {memory['max_mb']} MB budget")
+        for name, m in memory["phases"].items():
+            if m["overlapped"]:
+                log.info(f"    {name:<20} peak {m['peak_mb']:>8.1f} MB  "
+                         f"(process-wide, alongside {', '.join(m['overlapped'])})")
+            else:
+                log.info(f"    {name:<20} peak {m['peak_mb']:>8.1f} MB  (+{m['growth_mb']:.1f} MB)")
+        for table, passes in memory["partitioned_passes"].items():
+            if passes > 1:
+                log.info(f"    {table} grouped in {passes} passes")
+    if profiles:
+        log_profile(all_stats["profile"]["phases"])
     log.info("=" * 60)
 
     return all_stats
 
 
+def apply_cleanup_plan(plan_path: str, dry_run: bool = False) -> dict:
+    """Apply a plan written by a --snapshot run to the live database."""
+    log.info("=" * 60)
+    log.info(f"Applying cleanup plan {plan_path} (dry run: {dry_run})")
+    log.info("=" * 60)
+    supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    started = time.perf_counter()
+    stats = apply_plan(supabase, plan_path, dry_run=dry_run, log=log)
+    stats["wall_seconds"] = round(time.perf_counter() - started, 2)
+
+    log.info(f"  Ops applied: {stats['ops_applied']} in {stats['requests']} requests")
+    log.info(f"  Merges applied: {stats['units_applied']}, skipped (changed since snapshot): "
+             f"{stats['units_skipped']}, failed: {stats['units_failed']}")
+    log.info(f"  Rows skipped (changed since snapshot): {stats['ids_skipped']}")
+    log.info(f"  Wall time: {stats['wall_seconds']:.1f}s")
+    if stats["conflicts"]:
+        conflicts_path = Path(plan_path).with_suffix(".conflicts.json")
+        conflicts_path.write_text(json.dumps(stats["conflicts"], indent=2))
+        log.info(f"  Conflicts written to {conflicts_path}; re-run --snapshot --refresh-snapshot to re-plan them")
+    return stats
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Daily database cleanup & deduplication")
     parser.add_argument("--dry-run", action="store_true", help="Preview changes without writing")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Max phases to run concurrently (default: {DEFAULT_WORKERS}, 1 = sequential)")
+    parser.add_argument("--full", action="store_true",
+                        help=f"Rescan every row instead of only changes since the last run "
+                             f"(automatic every {FULL_RESCAN_DAYS} days)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Report per-phase wall/API/CPU time, PostgREST calls, rows and bytes")
+    parser.add_argument("--profile-dir", metavar="DIR",
+                        help="With --profile, also write a cProfile dump per phase (<phase>.pstats) "
+                             "and summary.json to DIR; phases then run one at a time")
+    parser.add_argument("--max-memory", type=int, metavar="MB",
+                        help="Memory budget; artist/track dedup switch to hash-partitioned "
+                             "passes near it, and peak memory per phase is reported")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Processes for artist/track dedup planning, sharded by merge key "
+                             f"(default: 1; used for tables of {SHARD_MIN_ROWS}+ rows)")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="Run offline against a SQLite snapshot at PATH (dumped from the database "
+                             "if missing) and write the changes to a plan instead of the database")
+    parser.add_argument("--refresh-snapshot", action="store_true",
+                        help="With --snapshot, re-dump the snapshot even if PATH exists")
+    parser.add_argument("--plan", metavar="PATH",
+                        help="With --snapshot, where to write the plan "
+                             "(default: logs/cleanup_plan_<date>.jsonl)")
+    parser.add_argument("--apply", metavar="PLAN",
+                        help="Apply a plan written by --snapshot; rows changed since the snapshot "
+                             "are skipped (with --dry-run, only report what would be applied)")
+    parser.add_argument("--reconcile-counts", action="store_true",
+                        help="Recount every artist's tracks/sets counts and report drift instead of "
+                             "applying the count deltas (automatic on full rescans)")
+    parser.add_argument("--engine", choices=("python", "sql"), default="python",
+                        help="sql: run artist/track/set dedup and count updates server-side as "
+                             "set-based SQL (needs migration 029; always a full pass)")
     args = parser.parse_args()
-
-    run_cleanup(dry_run=args.dry_run)
+    if args.apply and args.snapshot:
+        parser.error("--apply and --snapshot can't be combined")
+    if args.engine == "sql" and args.snapshot:
+        parser.error("--engine sql runs server-side and can't be combined with --snapshot")
+
+    if args.apply:
+        apply_cleanup_plan(args.apply, dry_run=args.dry_run)
+    else:
+        run_cleanup(dry_run=args.dry_run, workers=args.workers, full=args.full,
+                    profile=args.profile or bool(args.profile_dir), profile_dir=args.profile_dir,
+                    max_memory_mb=args.max_memory, processes=max(1, args.processes),
+                    snapshot=args.snapshot, plan_path=args.plan, refresh_snapshot=args.refresh_snapshot,
+                    engine=args.engine, reconcile_counts=args.reconcile_counts)
@@ -6,6 +6,8 @@ and syncs them into the Rork app's Supabase database.
 
 Usage:
     python scripts/daily_house_sync.py [--dry-run] [--limit N]
+    python scripts/daily_house_sync.py --archive DIR         # keep the fetched pages
+    python scripts/daily_house_sync.py --from-archive DIR    # re-run offline from them
 """
 
 import os
@@ -18,15 +20,15 @@ from datetime import datetime
 from pathlib import Path
 from uuid import uuid4
 
-import requests
-from bs4 import BeautifulSoup
-from fake_headers import Headers
-
 # Add the project root and 1001-tracklists-api to path
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT / "1001-tracklists-api"))
 
 from tracklists import Tracklist
+from text_normalization import normalize_text, generate_slug
+from artist_count_deltas import CountDeltas
+from tracklist_cache import load_tracklist
+from tracklist_http import get_soup, use_archive, use_pooled_session
 
 # Try to load .env file
 env_path = PROJECT_ROOT / ".env"
@@ -64,42 +66,6 @@ log = logging.getLogger("house_sync")
 # Helpers
 # ---------------------------------------------------------------------------
 
-def get_soup(url: str) -> BeautifulSoup:
-    """Fetch a page and return BeautifulSoup, with retry."""
-    for attempt in range(3):
-        try:
-            response = requests.get(url, headers=Headers().generate(), timeout=30)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            if soup.title and "Error 403" in soup.title.text:
-                raise Exception("403 - possibly rate limited or captcha")
-            return soup
-        except Exception as e:
-            log.warning(f"Attempt {attempt + 1} failed for {url}: {e}")
-            if attempt == 2:
-                raise
-    raise Exception(f"Failed to fetch {url}")
-
-
-def normalize_text(text: str) -> str:
-    """Normalize text for matching (lowercase, strip special chars)."""
-    if not text:
-        return ""
-    text = text.lower().strip()
-    text = re.sub(r"[^\w\s]", "", text)
-    text = re.sub(r"\s+", " ", text)
-    return text
-
-
-def generate_slug(name: str) -> str:
-    """Generate a URL-friendly slug from a name."""
-    slug = name.lower().strip()
-    slug = re.sub(r"[^\w\s-]", "", slug)
-    slug = re.sub(r"[\s_]+", "-", slug)
-    slug = re.sub(r"-+", "-", slug)
-    return slug.strip("-")
-
-
 def parse_cue_to_seconds(cue: str) -> int | None:
     """Convert a cue string like '1:23:45' or '47:30' to seconds."""
     if not cue or not cue.strip():
@@ -267,8 +233,10 @@ def find_or_create_artist(supabase: Client, artist_name: str, artist_1001tl_url:
 
 
 def find_or_create_track(supabase: Client, title: str, artist_name: str, artist_id: str = None,
-                         genre: str = None, label_name: str = None, duration: str = None) -> str:
-    """Find an existing track or create a new one. Returns track ID."""
+                         genre: str = None, label_name: str = None, duration: str = None,
+                         count_deltas: CountDeltas = None) -> str:
+    """Find an existing track or create a new one. Returns track ID.
+    A created track is recorded in `count_deltas` against its artist."""
     if not title:
         return None
 
@@ -300,6 +268,8 @@ def find_or_create_track(supabase: Client, title: str, artist_name: str, artist_
         new_track["label"] = label_name
 
     supabase.table("tracks").insert(new_track).execute()
+    if count_deltas is not None:
+        count_deltas.add(artist_id, tracks=1)
     log.info(f"  Created new track: {artist_name} - {title} ({track_id})")
     return track_id
 
@@ -307,6 +277,8 @@ def find_or_create_track(supabase: Client, title: str, artist_name: str, artist_
 def import_set_to_db(supabase: Client, tracklist: Tracklist, tracklist_url: str, dry_run: bool = False) -> dict:
     """
     Import a scraped Tracklist into the database.
+    The new set and tracks are journaled as artist count deltas, which the
+    cleanup's counts phase applies.
     Returns a summary dict of what was created.
     """
     summary = {"set": None, "tracks_created": 0, "tracks_existing": 0, "artists_created": 0}
@@ -360,6 +332,8 @@ def import_set_to_db(supabase: Client, tracklist: Tracklist, tracklist_url: str,
     supabase.table("sets").insert(new_set).execute()
     summary["set"] = set_id
     log.info(f"  Created set: {new_set['name']} ({set_id})")
+    count_deltas = CountDeltas("house_sync")
+    count_deltas.add(main_artist_id, sets=1)
 
     # Import each track
     cues = tracklist.cues if hasattr(tracklist, "cues") else []
@@ -381,6 +355,7 @@ def import_set_to_db(supabase: Client, tracklist: Tracklist, tracklist_url: str,
                 artist_id=track_artist_id,
                 genre=track.genre,
                 label_name=label_name,
+                count_deltas=count_deltas,
             )
 
             # Get timestamp from cues
@@ -410,6 +385,7 @@ def import_set_to_db(supabase: Client, tracklist: Tracklist, tracklist_url: str,
 
     # Update the set's tracks_count with actual imported count
     supabase.table("sets").update({"tracks_count": summary["tracks_created"]}).eq("id", set_id).execute()
+    count_deltas.flush(supabase)
 
     log.info(f"  Imported {summary['tracks_created']} tracks for set {new_set['name']}")
     return summary
@@ -419,13 +395,24 @@ def import_set_to_db(supabase: Client, tracklist: Tracklist, tracklist_url: str,
 # Main Sync Flow
 # ---------------------------------------------------------------------------
 
-def sync_house_sets(limit: int = DEFAULT_LIMIT, dry_run: bool = False):
-    """Main sync: scrape top house sets, check DB, import missing ones."""
+def sync_house_sets(limit: int = DEFAULT_LIMIT, dry_run: bool = False,
+                    archive_dir: str = None, from_archive: bool = False):
+    """
+    Main sync: scrape top house sets, check DB, import missing ones.
+    With `archive_dir`, fetched pages are archived there; with `from_archive`
+    too, every page is read from the archive instead of 1001tracklists.
+    """
     log.info("=" * 60)
     log.info(f"Starting daily house set sync at {datetime.now().isoformat()}")
     log.info(f"Limit: {limit}, Dry run: {dry_run}")
     log.info("=" * 60)
 
+    # Tracklist() fetches share the host-wide request budget with other scrapers
+    use_pooled_session()
+    if archive_dir:
+        use_archive(archive_dir, replay=from_archive)
+        log.info(f"{'Replaying from' if from_archive else 'Archiving pages to'} {archive_dir}")
+
     # Step 1: Scrape the most-viewed house sets
     top_sets = scrape_most_viewed_house_sets(limit=limit)
 
@@ -459,7 +446,7 @@ def sync_house_sets(limit: int = DEFAULT_LIMIT, dry_run: bool = False):
 
             # Not in DB -> scrape the full tracklist
             log.info(f"  NEW - Scraping full tracklist...")
-            tracklist = Tracklist(url)
+            tracklist = load_tracklist(url, Tracklist)
 
             log.info(f"  Found {len(tracklist.tracks)} tracks, "
                      f"DJs: {', '.join(tracklist.DJs) if hasattr(tracklist, 'DJs') and tracklist.DJs else 'Unknown'}")
@@ -492,9 +479,14 @@ if __name__ == "__main__":
     parser.add_argument("--dry-run", action="store_true", help="Preview without writing to database")
     parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"Max sets to check (default: {DEFAULT_LIMIT})")
     parser.add_argument("--no-report", action="store_true", help="Skip the post-sync report")
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument("--archive", metavar="DIR", help="Keep every fetched page in the HTML archive at DIR")
+    archive.add_argument("--from-archive", metavar="DIR",
+                         help="Read every page from the HTML archive at DIR instead of 1001tracklists")
     args = parser.parse_args()
 
-    sync_house_sets(limit=args.limit, dry_run=args.dry_run)
+    sync_house_sets(limit=args.limit, dry_run=args.dry_run,
+                    archive_dir=args.archive or args.from_archive, from_archive=bool(args.from_archive))
 
     # Run database cleanup after sync
     if not args.dry_run:
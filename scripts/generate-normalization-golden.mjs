@@ -0,0 +1,39 @@
+#!/usr/bin/env node
+// Run: node scripts/generate-normalization-golden.mjs
+//
+// Regenerates __tests__/fixtures/normalization-golden.json: every input is run
+// through normalizeText() and generateSlug() from lib/supabase/artistService.ts.
+// The two functions are evaluated from the module's own source (type
+// annotations stripped), so no TypeScript toolchain or Supabase client is
+// needed. __tests__/normalization.test.ts checks the result against the real
+// module under bun; scripts/tests/test_text_normalization.py against Python.
+//
+// To add cases, append inputs to the JSON's "cases" and re-run.
+
+import { readFileSync, writeFileSync } from 'fs';
+import { resolve, dirname } from 'path';
+import { fileURLToPath } from 'url';
+
+const __dirname = dirname(fileURLToPath(import.meta.url));
+const SERVICE = resolve(__dirname, '../lib/supabase/artistService.ts');
+const GOLDEN = resolve(__dirname, '../__tests__/fixtures/normalization-golden.json');
+
+function loadFunction(source, name) {
+  const match = source.match(new RegExp(`export function ${name}\\(([^)]*)\\)[^{]*\\{([\\s\\S]*?)\\n\\}`));
+  if (!match) throw new Error(`${name}() not found in ${SERVICE}`);
+  const params = match[1].split(',').map((p) => p.split(':')[0].trim()).filter(Boolean);
+  return new Function(...params, match[2]);
+}
+
+const source = readFileSync(SERVICE, 'utf8');
+const normalizeText = loadFunction(source, 'normalizeText');
+const generateSlug = loadFunction(source, 'generateSlug');
+
+const golden = JSON.parse(readFileSync(GOLDEN, 'utf8'));
+golden.cases = golden.cases.map(({ input }) => ({
+  input,
+  normalized: normalizeText(input),
+  slug: generateSlug(input),
+}));
+writeFileSync(GOLDEN, JSON.stringify(golden, null, 2) + '\n');
+console.log(`Wrote ${golden.cases.length} cases to ${GOLDEN}`);
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Host-wide request budget for 1001tracklists, shared by every Python caller.
+
+The sync cron, resident scrape_1001_python.py workers and manual
+imports each fetched at their own pace, and together tripped the site's
+403 page. All of them now draw from one token bucket per host, kept in a
+small SQLite file that every process on the machine opens:
+
+- a request reserves a token in one IMMEDIATE transaction; when the bucket
+  is empty the token is borrowed, the bucket goes negative and the caller
+  sleeps until its turn, so waiting callers are served in arrival order
+  across processes
+- the bucket refills at `rate` tokens/s up to `burst`, so the host sees at
+  most `burst` back-to-back requests, then a steady `rate` per second
+
+Rates are per host (www. stripped) and default to DEFAULT_RATES; hosts not
+listed are not limited. Override with
+    SCRAPE_RATE_LIMITS="1001tracklists.com=0.5/2,1001.tl=1"     (rate[/burst])
+and move the shared file with SCRAPE_RATE_LIMIT_DB.
+
+Every reservation also records the queue wait it was given, per host:
+    python scripts/host_rate_limit.py            # requests, waits, current rates
+    python scripts/host_rate_limit.py --reset    # clear the counters
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_RATES = {
+    "1001tracklists.com": (1.0, 3),     # tokens per second, burst
+}
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "scrape_host_rate_limit.sqlite")
+BUSY_TIMEOUT = 30                       # seconds to wait for another process's transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    host TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queue_waits (
+    host TEXT PRIMARY KEY,
+    requests INTEGER NOT NULL DEFAULT 0,
+    delayed INTEGER NOT NULL DEFAULT 0,
+    total_wait REAL NOT NULL DEFAULT 0,
+    max_wait REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def host_of(url):
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def parse_rates(value):
+    """'host=rate[/burst],...' -> {host: (rate, burst)}; burst defaults to 1."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        host, _, spec = item.partition('=')
+        rate, _, burst = spec.partition('/')
+        rates[host.strip().lower().removeprefix('www.')] = (float(rate), float(burst or 1))
+    return rates
+
+
+class HostRateLimiter:
+    """Token buckets per host in a SQLite file shared between processes."""
+
+    def __init__(self, path=None, rates=None, clock=time.time, sleep=time.sleep):
+        self.path = path or os.environ.get('SCRAPE_RATE_LIMIT_DB') or DEFAULT_DB_PATH
+        if rates is None:
+            rates = {**DEFAULT_RATES, **parse_rates(os.environ.get('SCRAPE_RATE_LIMITS'))}
+        self.rates = rates
+        self._clock = clock
+        self._sleep = sleep
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, url):
+        """Take a token for `url`'s host. Returns the seconds to wait before sending."""
+        host = host_of(url)
+        if host not in self.rates:
+            return 0.0
+        rate, burst = self.rates[host]
+        if rate <= 0:
+            return 0.0
+
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = self._clock()
+            row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE host = ?', (host,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+            tokens -= 1
+            wait = max(0.0, -tokens / rate)
+            conn.execute('INSERT OR REPLACE INTO buckets (host, tokens, updated_at) VALUES (?, ?, ?)',
+                         (host, tokens, now))
+            conn.execute(
+                'INSERT INTO queue_waits (host, requests, delayed, total_wait, max_wait) VALUES (?, 1, ?, ?, ?) '
+                'ON CONFLICT (host) DO UPDATE SET requests = requests + 1, delayed = delayed + excluded.delayed, '
+                'total_wait = total_wait + excluded.total_wait, max_wait = MAX(max_wait, excluded.max_wait)',
+                (host, int(wait > 0), wait, wait))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+    def acquire(self, url):
+        """Wait for `url`'s host to have budget. Returns the seconds waited."""
+        wait = self.reserve(url)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def stats(self):
+        """Queue-wait counters per host, with the rates this process is using."""
+        rows = self._conn().execute(
+            'SELECT host, requests, delayed, total_wait, max_wait FROM queue_waits ORDER BY host').fetchall()
+        stats = {}
+        for host, requests, delayed, total_wait, max_wait in rows:
+            rate, burst = self.rates.get(host, (None, None))
+            stats[host] = {
+                "requests": requests, "delayed": delayed,
+                "total_wait_seconds": round(total_wait, 3), "max_wait_seconds": round(max_wait, 3),
+                "avg_wait_seconds": round(total_wait / requests, 3) if requests else 0.0,
+                "rate": rate, "burst": burst,
+            }
+        return stats
+
+    def reset(self):
+        self._conn().execute('DELETE FROM queue_waits')
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """The process's limiter, configured from the environment on first use."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = HostRateLimiter()
+        return _limiter
+
+
+def acquire(url):
+    return get_limiter().acquire(url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the shared 1001tracklists request budget')
+    parser.add_argument('--reset', action='store_true', help='Clear the queue-wait counters')
+    args = parser.parse_args()
+
+    limiter = get_limiter()
+    if args.reset:
+        limiter.reset()
+    print(json.dumps({"db": limiter.path, "hosts": limiter.stats()}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
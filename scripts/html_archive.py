@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Archive of raw 1001tracklists pages, for re-parsing without re-scraping.
+
+Parsed pages used to be thrown away, so a parser fix meant fetching the
+site again. With an archive enabled (tracklist_http.use_archive, or
+SCRAPE_ARCHIVE_DIR for every entry point) each fetched page is kept:
+
+- content-addressed: the HTML is stored once per sha256, however many
+  times or under however many URLs it was fetched
+- zlib-compressed and appended to pack files (pack-00000.pack, ...),
+  rolled over at PACK_MAX_BYTES; a blob is a byte range of one pack, read
+  back through mmap with no scanning
+- indexed in index.sqlite: blobs (sha256 -> pack, offset, length) and
+  fetches (url, tracklist_id, fetched_at -> sha256)
+
+Writers append and index inside one IMMEDIATE SQLite transaction, so
+several processes can record into the same archive. A crash after an
+append leaves unindexed bytes at the end of a pack, which are never read.
+
+Replay (tracklist_http.use_archive(..., replay=True), --from-archive on the
+scrapers) serves pages from the archive instead of the network: the latest
+fetch of the URL, else of the same tracklist id under another slug.
+
+    python scripts/html_archive.py DIR            # summary
+    python scripts/html_archive.py DIR --list     # latest fetch per tracklist
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from tracklist_cache import tracklist_key
+
+PACK_MAX_BYTES = 256 * 1024 * 1024
+COMPRESS_LEVEL = 6
+BUSY_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    pack INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    raw_length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fetches (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    tracklist_id TEXT,
+    fetched_at REAL NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES blobs (sha256)
+);
+CREATE INDEX IF NOT EXISTS fetches_url ON fetches (url, fetched_at);
+CREATE INDEX IF NOT EXISTS fetches_tracklist ON fetches (tracklist_id, fetched_at);
+CREATE INDEX IF NOT EXISTS fetches_time ON fetches (fetched_at);
+"""
+
+
+def _tracklist_id(url):
+    key = tracklist_key(url)
+    return None if key == url else key
+
+
+class HtmlArchive:
+    """Packed, compressed, content-addressed page store with a SQLite index."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._maps = {}                 # pack number -> mmap
+        self._maps_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'),
+                                   timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _pack_path(self, pack):
+        return os.path.join(self.directory, f'pack-{pack:05d}.pack')
+
+    # ------------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------------
+
+    def put(self, url, html, fetched_at=None):
+        """Record a fetch of `url`. Returns the page's sha256."""
+        raw = html.encode('utf-8')
+        sha = hashlib.sha256(raw).hexdigest()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT 1 FROM blobs WHERE sha256 = ?', (sha,)).fetchone() is None:
+                data = zlib.compress(raw, COMPRESS_LEVEL)
+                pack = conn.execute('SELECT COALESCE(MAX(pack), 0) FROM blobs').fetchone()[0]
+                path = self._pack_path(pack)
+                if os.path.exists(path) and os.path.getsize(path) + len(data) > PACK_MAX_BYTES:
+                    pack += 1
+                    path = self._pack_path(pack)
+                with open(path, 'ab') as f:
+                    offset = f.tell()
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                conn.execute('INSERT INTO blobs (sha256, pack, offset, length, raw_length) VALUES (?, ?, ?, ?, ?)',
+                             (sha, pack, offset, len(data), len(raw)))
+            conn.execute('INSERT INTO fetches (url, tracklist_id, fetched_at, sha256) VALUES (?, ?, ?, ?)',
+                         (url, _tracklist_id(url), fetched_at or time.time(), sha))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return sha
+
+    # ------------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------------
+
+    def _map(self, pack, end):
+        with self._maps_lock:
+            mapped = self._maps.get(pack)
+            if mapped is None or len(mapped) < end:     # the pack grew since it was mapped
+                if mapped is not None:
+                    mapped.close()
+                with open(self._pack_path(pack), 'rb') as f:
+                    mapped = self._maps[pack] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return mapped
+
+    def blob(self, sha):
+        """The page stored under `sha`, or None."""
+        row = self._conn().execute('SELECT pack, offset, length FROM blobs WHERE sha256 = ?', (sha,)).fetchone()
+        if row is None:
+            return None
+        pack, offset, length = row
+        return zlib.decompress(self._map(pack, offset + length)[offset:offset + length]).decode('utf-8')
+
+    def latest(self, url):
+        """The most recent fetch of `url`, else of the same tracklist under any URL; None if neither."""
+        conn = self._conn()
+        row = conn.execute('SELECT sha256 FROM fetches WHERE url = ? ORDER BY fetched_at DESC LIMIT 1',
+                           (url,)).fetchone()
+        tracklist_id = _tracklist_id(url)
+        if row is None and tracklist_id:
+            row = conn.execute('SELECT sha256 FROM fetches WHERE tracklist_id = ? ORDER BY fetched_at DESC LIMIT 1',
+                               (tracklist_id,)).fetchone()
+        return self.blob(row[0]) if row else None
+
+    def fetches(self, url=None, tracklist_id=None, since=None):
+        """Fetch records, oldest first, optionally for one URL / tracklist or since a time."""
+        clauses, params = [], []
+        for column, op, value in (('url', '=', url), ('tracklist_id', '=', tracklist_id),
+                                  ('fetched_at', '>=', since)):
+            if value is not None:
+                clauses.append(f'{column} {op} ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._conn().execute(
+            f'SELECT url, tracklist_id, fetched_at, sha256 FROM fetches {where} ORDER BY fetched_at, id', params)
+        return [{"url": u, "tracklist_id": t, "fetched_at": f, "sha256": s} for u, t, f, s in rows]
+
+    def tracklist_urls(self):
+        """The latest URL fetched for each archived tracklist, in first-fetch order."""
+        rows = self._conn().execute(
+            'SELECT (SELECT url FROM fetches WHERE tracklist_id = f.tracklist_id '
+            'ORDER BY fetched_at DESC, id DESC LIMIT 1) '
+            'FROM fetches f WHERE tracklist_id IS NOT NULL GROUP BY tracklist_id ORDER BY MIN(id)')
+        return [row[0] for row in rows]
+
+    def summary(self):
+        conn = self._conn()
+        fetches, tracklists = conn.execute('SELECT COUNT(*), COUNT(DISTINCT tracklist_id) FROM fetches').fetchone()
+        blobs, stored, raw = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(raw_length), 0) FROM blobs').fetchone()
+        return {"fetches": fetches, "tracklists": tracklists, "pages": blobs,
+                "stored_bytes": stored, "raw_bytes": raw}
+
+    def close(self):
+        with self._maps_lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect a raw-HTML archive')
+    parser.add_argument('directory')
+    parser.add_argument('--list', action='store_true', help='Latest fetched URL per tracklist')
+    args = parser.parse_args()
+
+    archive = HtmlArchive(args.directory)
+    if args.list:
+        for url in archive.tracklist_urls():
+            print(url)
+    else:
+        print(json.dumps(archive.summary(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Incremental writer for the app's mock set library.
+
+Scraped sets used to be spliced into mocks/tracks.ts itself: every run read
+the whole file, found the end of mockSetLists with a bracket counter (which
+miscounted brackets inside strings and stopped at the first nested array)
+and rewrote it. They now go to generated modules under mocks/scraped/:
+
+    mocks/scraped/sets-0000.ts ... one JSON set per line, SHARD_SETS per shard
+    mocks/scraped/index.ts         imports the shards, newest set first
+    mocks/scraped/revive.ts        (hand-written) JSON dates -> Date
+
+and mocks/tracks.ts spreads `scrapedSetLists` into mockSetLists. Appending
+rewrites only the last shard (at most SHARD_SETS lines) and, when a shard is
+started, the index, so a run costs O(new sets) however large the library
+gets. Every file is written to a temporary name and renamed into place.
+
+ensure_wired() adds the import and spread to tracks.ts if they are missing,
+locating mockSetLists with a scanner that skips strings, template literals
+and comments.
+"""
+
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+TRACKS_PATH = PROJECT_ROOT / 'mocks' / 'tracks.ts'
+SCRAPED_DIR = PROJECT_ROOT / 'mocks' / 'scraped'
+SHARD_SETS = 50
+DEFAULT_COVER = 'https://images.unsplash.com/photo-1493225457124-a3eb161ffa5f?w=300&h=300&fit=crop'
+
+GENERATED_HEADER = '// Generated by scripts/mocks_writer.py. Do not edit; re-run the importer instead.\n'
+SHARD_PATTERN = re.compile(r'^sets-(\d{4})\.ts$')
+
+
+def parse_timestamp(timestamp_str):
+    """'1:23:45' / '23:45' -> seconds; 0 when missing or unreadable."""
+    try:
+        seconds = 0
+        for part in (timestamp_str or '0').split(':'):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return 0
+
+
+def set_records(sets_data, id_prefix):
+    """
+    Scraped sets ({title, artist, venue, date, url, thumbnail, tracks}) as
+    SetList records, with dates as ISO strings. Sets without tracks are skipped.
+    """
+    now = datetime.now()
+    base_time = int(now.timestamp() * 1000)
+    records = []
+    for i, set_data in enumerate(sets_data):
+        if not set_data or not set_data.get('tracks'):
+            continue
+        cover = set_data.get('thumbnail') or DEFAULT_COVER
+        record = {
+            "id": f"{id_prefix}-{base_time}-{i}",
+            "name": set_data['title'],
+            "artist": set_data['artist'],
+            "venue": set_data.get('venue') or None,
+            "date": set_data.get('date') or now.isoformat(),
+            "tracks": [{
+                "id": f"{id_prefix}-{base_time}-{i}-{j}",
+                "title": track['title'],
+                "artist": track['artist'],
+                "timestamp": parse_timestamp(track['timestamp']),
+                "duration": 0,
+                "coverUrl": cover,
+                "addedAt": now.isoformat(),
+                "source": "link",
+                "verified": False,
+            } for j, track in enumerate(set_data['tracks'])],
+            "coverUrl": set_data.get('thumbnail') or None,
+            "sourceLinks": [{"platform": "1001tracklists", "url": set_data['url']}],
+            "totalDuration": 0,
+            "aiProcessed": False,
+            "commentsScraped": 0,
+            "tracksIdentified": len(set_data['tracks']),
+            "plays": 0,
+        }
+        records.append({k: v for k, v in record.items() if v is not None})
+    return records
+
+
+# ----------------------------------------------------------------------------
+# Shards
+# ----------------------------------------------------------------------------
+
+def write_atomic(path, text):
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.chmod(tmp, path.stat().st_mode & 0o777 if path.exists() else 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def render_shard(records):
+    lines = ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + ',\n' for record in records)
+    return (GENERATED_HEADER
+            + "import type { ScrapedSetRecord } from './revive';\n\n"
+            + 'const sets: ScrapedSetRecord[] = [\n' + lines + '];\n\nexport default sets;\n')
+
+
+def read_shard(path):
+    """The records of a shard written by render_shard."""
+    return [json.loads(line.rstrip().rstrip(','))
+            for line in Path(path).read_text(encoding='utf-8').splitlines() if line.startswith('{')]
+
+
+def render_index(shard_numbers):
+    names = [f'shard{n:04d}' for n in shard_numbers]
+    imports = ''.join(f"import {name} from './sets-{n:04d}';\n" for name, n in zip(names, shard_numbers))
+    spread = ', '.join(f'...{name}' for name in names)
+    return (GENERATED_HEADER
+            + "import { SetList } from '@/types';\n"
+            + "import { reviveSet, ScrapedSetRecord } from './revive';\n"
+            + imports + '\n'
+            + '// Shards hold sets oldest first; the library lists the newest first\n'
+            + f'const records: ScrapedSetRecord[] = [{spread}];\n\n'
+            + 'export const scrapedSetLists: SetList[] = records.reverse().map(reviveSet);\n')
+
+
+def shard_numbers(scraped_dir=SCRAPED_DIR):
+    return sorted(int(m.group(1)) for name in os.listdir(scraped_dir) if (m := SHARD_PATTERN.match(name)))
+
+
+def append_sets(records, scraped_dir=SCRAPED_DIR, shard_sets=SHARD_SETS):
+    """Append records to the shards, filling the last one first. Returns the shard files written."""
+    scraped_dir = Path(scraped_dir)
+    scraped_dir.mkdir(parents=True, exist_ok=True)
+    numbers = shard_numbers(scraped_dir)
+    written = []
+
+    pending = list(records)
+    if numbers:
+        current = numbers[-1]
+        shard = read_shard(scraped_dir / f'sets-{current:04d}.ts')
+    else:
+        current, shard = 0, []
+    new_shards = not numbers
+
+    while pending:
+        if len(shard) >= shard_sets:
+            current, shard, new_shards = current + 1, [], True
+        room = shard_sets - len(shard)
+        shard, pending = shard + pending[:room], pending[room:]
+        path = scraped_dir / f'sets-{current:04d}.ts'
+        write_atomic(path, render_shard(shard))
+        written.append(path)
+
+    if new_shards and written:
+        write_atomic(scraped_dir / 'index.ts', render_index(shard_numbers(scraped_dir)))
+    return written
+
+
+# ----------------------------------------------------------------------------
+# tracks.ts
+# ----------------------------------------------------------------------------
+
+def find_array_span(source, name):
+    """
+    (start, end) offsets of the `[` and matching `]` of `export const <name> ... = [`,
+    skipping brackets inside strings, template literals and comments; None if absent.
+    """
+    match = re.search(rf'export const {re.escape(name)}\b[^=]*=\s*\[', source)
+    if not match:
+        return None
+    start = match.end() - 1
+    depth, i, n = 0, start, len(source)
+    while i < n:
+        c = source[i]
+        if c in '\'"`':
+            i += 1
+            while i < n and source[i] != c:
+                i += 2 if source[i] == '\\' else 1
+        elif source.startswith('//', i):
+            i = source.find('\n', i)
+            if i < 0:
+                return None
+        elif source.startswith('/*', i):
+            i = source.find('*/', i) + 1
+            if i <= 0:
+                return None
+        elif c == '[':
+            depth += 1
+        elif c == ']':
+            depth -= 1
+            if depth == 0:
+                return start, i
+        i += 1
+    return None
+
+
+def ensure_wired(tracks_path=TRACKS_PATH):
+    """Make tracks.ts import scrapedSetLists and spread it into mockSetLists. Returns True if changed."""
+    source = Path(tracks_path).read_text(encoding='utf-8')
+    if '...scrapedSetLists' in source:
+        return False
+    span = find_array_span(source, 'mockSetLists')
+    if span is None:
+        raise ValueError(f"No `export const mockSetLists = [...]` in {tracks_path}")
+    start = span[0] + 1
+    source = source[:start] + '\n  ...scrapedSetLists,' + source[start:]
+    if "from './scraped'" not in source:
+        header_end = source.index('\n', source.index('import ')) + 1
+        source = source[:header_end] + "import { scrapedSetLists } from './scraped';\n" + source[header_end:]
+    write_atomic(tracks_path, source)
+    return True
+
+
+def add_sets(sets_data, id_prefix, scraped_dir=SCRAPED_DIR, tracks_path=TRACKS_PATH):
+    """Convert scraped sets and append them to the library. Returns the number added."""
+    records = set_records(sets_data, id_prefix)
+    append_sets(records, scraped_dir)
+    ensure_wired(tracks_path)
+    return len(records)
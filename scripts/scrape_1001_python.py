@@ -6,29 +6,93 @@ Can be called from Node.js/Bun to scrape sets
 Usage:
     python scripts/scrape_1001_python.py <url>
     python scripts/scrape_1001_python.py --artist "Max Dean" --max-sets 5
+    python scripts/scrape_1001_python.py --serve [--workers 4]
+    python scripts/scrape_1001_python.py --http [8765]
+    python scripts/scrape_1001_python.py <url> <url> ... [--workers 4]
+    python scripts/scrape_1001_python.py --input urls.txt      (or --input - for stdin)
+
+--serve keeps one process resident for a long-lived caller that owns its
+stdin/stdout (a worker process, a batch driver): it reads one JSON request
+per line on stdin,
+    {"id": "r1", "url": "https://www.1001tracklists.com/tracklist/..."}
+and writes one JSON result per line on stdout, tagged with the request's id,
+in completion order:
+    {"id": "r1", "success": true, "title": ..., "tracks": [...]}
+Requests run concurrently on a worker pool sharing one keep-alive connection
+pool (tracklist_http.py). It exits when stdin closes.
+
+--http [PORT] serves the same scrapes over local HTTP for any caller:
+    curl 'http://127.0.0.1:8765/scrape?url=https://www.1001tracklists.com/tracklist/...'
+Both resident modes answer repeats of a tracklist (by id) from a TTL/LRU
+cache of parsed results and fold concurrent requests for the same one into
+a single upstream fetch (tracklist_cache.py; --cache-ttl, --cache-size).
+
+--archive DIR keeps every fetched page in an HTML archive (html_archive.py);
+--from-archive DIR re-parses from it offline, with no network. Given no
+URLs, it replays every archived tracklist as a batch:
+    python scripts/scrape_1001_python.py --from-archive pages/ --format csv --output sets.csv
+
+Batch mode (several URLs, or --input) scrapes with at most --workers in
+flight and streams one compact NDJSON result per line as each completes,
+then a final {"stats": {...}} line. URL files take one URL per line; blank
+lines and # comments are skipped, repeated URLs are scraped once.
+
+--artist resolves the DJ page (DJ search, else /dj/<name>/), follows every
+page of its tracklist listing and streams the tracklists like batch mode;
+requests start at most one per --delay seconds.
+
+--format csv|parquet|arrow exports one row per set track instead of JSON
+(see tracklist_export.py); --output picks the file or dataset directory and
+--append adds to it across runs:
+    python scripts/scrape_1001_python.py --input urls.txt --format csv --output sets.csv --append
+    python scripts/scrape_1001_python.py --artist "Max Dean" --format parquet --output sets/ --append
 """
 
+# Imports are kept to what argument parsing needs: the tracklists library
+# (bs4 + requests), the thread pool and pyarrow load on first use, so --help
+# and usage errors return without paying for them. tests/test_scrape_cold_start.py
+# holds the import budget.
 import sys
 import json
 import argparse
-from pathlib import Path
+import os
+import re
+import threading
+import time
+
+from tracklist_export import FORMATS
+
+# The 1001-tracklists-api checkout lives next to scripts/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-try:
-    # Try to import the library
-    sys.path.insert(0, str(Path(__file__).parent.parent))
-    from tracklists import Tracklist
-except ImportError:
-    print(json.dumps({
-        "error": "1001-tracklists-api library not found. Install with: pip install -e /path/to/1001-tracklists-api",
-        "success": False
-    }), file=sys.stderr)
-    sys.exit(1)
+
+BASE_URL = 'https://www.1001tracklists.com'
+DJ_SEARCH_URL = BASE_URL + '/search/result.php?search_selection=6&search_value={query}'
+MAX_LISTING_PAGES = 200
+DEFAULT_DELAY = 1.0     # seconds between request starts when crawling an artist
+DEFAULT_HTTP_PORT = 8765
+
+
+def load_tracklists():
+    """The library's Tracklist class, imported on first use; exits if it isn't installed."""
+    try:
+        from tracklists import Tracklist
+    except ImportError:
+        print(json.dumps({
+            "error": "1001-tracklists-api library not found. Install with: pip install -e /path/to/1001-tracklists-api",
+            "success": False
+        }), file=sys.stderr)
+        sys.exit(1)
+    return Tracklist
 
 
 def scrape_url(url):
     """Scrape a single tracklist URL"""
+    from tracklist_cache import load_tracklist
+
+    Tracklist = load_tracklists()
     try:
-        tl = Tracklist(url)
+        tl = load_tracklist(url, Tracklist)
         
         tracks = []
         for track in tl.tracks:
@@ -36,6 +100,7 @@ def scrape_url(url):
                 "title": track.title if hasattr(track, 'title') else '',
                 "artist": track.artist if hasattr(track, 'artist') else '',
                 "timestamp": track.time if hasattr(track, 'time') else '0:00',
+                "label": str(track.labels[0]) if getattr(track, 'labels', None) else None,
             })
         
         result = {
@@ -57,31 +122,325 @@ def scrape_url(url):
         }
 
 
-def scrape_artist(artist_name, max_sets=10):
-    """Scrape all sets for an artist"""
-    # This would need to be implemented based on the library's capabilities
-    # For now, return error
-    return {
-        "success": False,
-        "error": "Artist scraping not yet implemented. Use individual URLs.",
-    }
+def _compact(name):
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+def _listing_page_number(url):
+    match = re.search(r'/index(\d+)\.html', url)
+    return int(match.group(1)) if match else 1
+
+
+def resolve_dj_page(artist_name, get_soup):
+    """The artist's DJ page: from the site's DJ search, else the usual /dj/<name>/ slug."""
+    from urllib.parse import quote_plus
+
+    if artist_name.startswith(('http://', 'https://')):
+        return artist_name
+    wanted = _compact(artist_name)
+    try:
+        soup = get_soup(DJ_SEARCH_URL.format(query=quote_plus(artist_name)))
+        slugs = [m.group(1) for link in soup.find_all('a', href=True)
+                 if (m := re.search(r'/dj/([^/]+)/', link['href']))]
+    except Exception as e:
+        print(f"DJ search failed for {artist_name!r}: {e}", file=sys.stderr)
+        slugs = []
+    slug = next((s for s in slugs if _compact(s) == wanted), slugs[0] if slugs else wanted)
+    return f"{BASE_URL}/dj/{slug}/index.html"
+
+
+def iter_artist_set_urls(artist_name, max_sets=None, get_soup=None):
+    """
+    Tracklist URLs from the artist's DJ page, following the listing's
+    pagination (index2.html, index3.html, ...) until a page adds nothing new
+    or `max_sets` is reached. Pages are fetched lazily, as URLs are consumed.
+    """
+    from urllib.parse import urljoin
+
+    if get_soup is None:
+        from tracklist_http import get_soup
+    page_url = resolve_dj_page(artist_name, get_soup)
+    slug = re.search(r'/dj/([^/]+)/', page_url).group(1)
+    pagination = re.compile(rf'/dj/{re.escape(slug)}/index(\d+)\.html')
+    seen = set()
+
+    for _ in range(MAX_LISTING_PAGES):
+        try:
+            soup = get_soup(page_url)
+        except Exception as e:
+            print(f"Listing page failed: {page_url}: {e}", file=sys.stderr)
+            return
+        new_sets = 0
+        pages = set()
+        for link in soup.find_all('a', href=True):
+            href = urljoin(BASE_URL, link['href']).split('#')[0].split('?')[0]
+            match = re.search(r'/tracklist/([^/]+)/', href)
+            if match and match.group(1) not in seen:
+                seen.add(match.group(1))
+                new_sets += 1
+                yield href
+                if max_sets and len(seen) >= max_sets:
+                    return
+            page = pagination.search(href)
+            if page:
+                pages.add(int(page.group(1)))
+        following = sorted(n for n in pages if n > _listing_page_number(page_url))
+        if not new_sets or not following:
+            return
+        page_url = f"{BASE_URL}/dj/{slug}/index{following[0]}.html"
+
+
+def scrape_artist(artist_name, max_sets=10, workers=4, out=sys.stdout, get_soup=None, export=None):
+    """Crawl the artist's DJ page and stream their tracklists (see run_batch)."""
+    return run_batch(iter_artist_set_urls(artist_name, max_sets or None, get_soup), workers, out,
+                     export=export)
+
+
+def read_url_lines(stream):
+    """URLs from a file or stdin, one per line; blank lines and # comments are skipped."""
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def scrape_many(urls, workers=4, scrape=scrape_url):
+    """
+    Scrape `urls` with at most `workers` in flight, yielding each result as
+    it completes. `urls` is consumed lazily, so a long list on stdin starts
+    producing results before it has been read to the end.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = set()
+        for url in urls:
+            if len(running) >= workers:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            running.add(pool.submit(scrape, url))
+        for future in as_completed(running):
+            yield future.result()
+
+
+def run_batch(urls, workers=4, out=sys.stdout, scrape=scrape_url, export=None):
+    """
+    Scrape `urls`, streaming NDJSON results and a final stats line to `out`.
+    With an `export` writer (tracklist_export.open_export), results become
+    set_track rows there instead; failures and the stats line go to stderr.
+    """
+    stats = {"total": 0, "succeeded": 0, "failed": 0, "duplicates": 0, "tracks": 0}
+    if export is not None:
+        stats["rows"] = 0
+        out = sys.stderr
+    seen = set()
+
+    def unique():
+        for url in urls:
+            if url in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(url)
+            yield url
+
+    started = time.perf_counter()
+    for result in scrape_many(unique(), workers, scrape):
+        stats["total"] += 1
+        if result.get("success"):
+            stats["succeeded"] += 1
+            stats["tracks"] += len(result.get("tracks") or [])
+        else:
+            stats["failed"] += 1
+        if export is not None:
+            stats["rows"] += export.write(result)
+            if not result.get("success"):
+                print(f"Failed: {result.get('url')}: {result.get('error')}", file=sys.stderr)
+            continue
+        out.write(json.dumps(result, separators=(',', ':'), default=str) + "\n")
+        out.flush()
+    stats["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    out.write(json.dumps({"stats": stats}, separators=(',', ':')) + "\n")
+    out.flush()
+    return stats
+
+
+def handle_request(line, scrape=None):
+    """Answer one --serve request line."""
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+    except ValueError as e:
+        return {"id": None, "success": False, "error": f"Invalid request: {e}"}
+
+    request_id = request.get("id")
+    url = request.get("url")
+    if not url:
+        return {"id": request_id, "success": False, "error": "Request needs a url"}
+    return {"id": request_id, **(scrape or scrape_url)(url)}
+
+
+def serve(stdin=sys.stdin, stdout=sys.stdout, workers=4, handler=handle_request):
+    """
+    Answer JSON-lines requests from stdin until it closes. Results are
+    written as they complete, one line each, so a slow tracklist doesn't
+    hold up the ones behind it.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    write_lock = threading.Lock()
+
+    def respond(line):
+        try:
+            result = handler(line)
+        except Exception as e:
+            result = {"id": None, "success": False, "error": str(e)}
+        with write_lock:
+            stdout.write(json.dumps(result, default=str) + "\n")
+            stdout.flush()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for line in stdin:
+            if line.strip():
+                pool.submit(respond, line)
+
+
+def make_http_server(service, host='127.0.0.1', port=DEFAULT_HTTP_PORT):
+    """
+    A threaded HTTP server answering from `service` (tracklist_cache.ScrapeService):
+        GET /scrape?url=<tracklist url>   the scrape result; X-Cache says hit/miss/coalesced
+        GET /stats                        cache and coalescing counters
+    Failed scrapes answer 502 with the result's error.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlsplit
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body, cache=None):
+            data = json.dumps(body, default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            if cache:
+                self.send_header('X-Cache', cache)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = urlsplit(self.path)
+            if path.path == '/stats':
+                return self._send(200, service.stats())
+            if path.path != '/scrape':
+                return self._send(404, {"success": False, "error": "Not found"})
+            url = parse_qs(path.query).get('url', [''])[0]
+            if '/tracklist/' not in url:
+                return self._send(400, {"success": False, "error": "Request needs a tracklist url"})
+            result, source = service.fetch(url)
+            self._send(200 if result.get('success') else 502, result, source)
+
+        def log_message(self, format, *args):
+            print(f"[http] {self.address_string()} {format % args}", file=sys.stderr)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
 
 
 def main():
     parser = argparse.ArgumentParser(description='Scrape 1001tracklists')
-    parser.add_argument('url', nargs='?', help='Tracklist URL to scrape')
+    parser.add_argument('urls', nargs='*', metavar='url',
+                        help='Tracklist URL(s) to scrape; several URLs stream NDJSON')
+    parser.add_argument('--input', metavar='FILE',
+                        help='Scrape the URLs listed in FILE (- for stdin), streaming NDJSON')
     parser.add_argument('--artist', help='Artist name to search for')
-    parser.add_argument('--max-sets', type=int, default=10, help='Max sets to scrape')
-    parser.add_argument('--format', choices=['json', 'csv'], default='json', help='Output format')
+    parser.add_argument('--max-sets', type=int, default=10, help='Max sets to scrape (0 = all)')
+    parser.add_argument('--delay', type=float, default=DEFAULT_DELAY,
+                        help=f'With --artist, min seconds between requests (default: {DEFAULT_DELAY})')
+    parser.add_argument('--format', choices=FORMATS, default='json',
+                        help='json (default), or one row per set track: csv, parquet, arrow')
+    parser.add_argument('--output', metavar='PATH',
+                        help='CSV file (default: stdout), or dataset directory for parquet/arrow')
+    parser.add_argument('--append', action='store_true',
+                        help='Add to an existing --output instead of replacing/refusing it')
+    parser.add_argument('--serve', action='store_true',
+                        help='Stay resident: read JSON requests from stdin, write JSON results to stdout')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Concurrent scrapes in --serve and batch mode (default: 4)')
+    parser.add_argument('--http', type=int, nargs='?', const=DEFAULT_HTTP_PORT, metavar='PORT',
+                        help=f'Serve GET /scrape?url=... on localhost (default port: {DEFAULT_HTTP_PORT})')
+    parser.add_argument('--host', default='127.0.0.1', help='Address for --http (default: 127.0.0.1)')
+    parser.add_argument('--cache-ttl', type=float, default=3600,
+                        help='Seconds --serve/--http reuse a parsed tracklist (default: 3600)')
+    parser.add_argument('--cache-size', type=int, default=1000,
+                        help='Parsed tracklists --serve/--http keep in memory (default: 1000)')
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument('--archive', metavar='DIR', help='Keep every fetched page in the HTML archive at DIR')
+    archive.add_argument('--from-archive', metavar='DIR',
+                         help='Parse pages from the HTML archive at DIR instead of fetching (all of it without URLs)')
     
     args = parser.parse_args()
-    
-    if args.url:
-        result = scrape_url(args.url)
+    args.replay_all = bool(args.from_archive) and not (
+        args.serve or args.http or args.urls or args.input or args.artist)
+    if args.replay_all:
+        from html_archive import HtmlArchive
+        args.urls = HtmlArchive(args.from_archive).tracklist_urls()
+        if not args.urls:
+            parser.error(f"no tracklists archived in {args.from_archive}")
+    if args.serve or args.http or args.urls or args.input or args.artist:
+        load_tracklists()
+        # Library fetches share one connection pool and the host-wide request budget
+        from tracklist_http import use_archive, use_pooled_session
+        use_pooled_session(pool_size=max(1, args.workers))
+        if args.archive or args.from_archive:
+            use_archive(args.archive or args.from_archive, replay=bool(args.from_archive))
+
+    export = None
+    if args.format != 'json' and not (args.serve or args.http):
+        from tracklist_export import open_export
+        try:
+            export = open_export(args.format, args.output, args.append)
+        except (ValueError, RuntimeError, OSError) as e:
+            parser.error(str(e))
+    try:
+        run(args, parser, export)
+    finally:
+        if export is not None:
+            export.close()
+
+
+def run(args, parser, export):
+    if args.serve or args.http:
+        from functools import partial
+        from tracklist_cache import ScrapeService
+        service = ScrapeService(scrape_url, ttl=args.cache_ttl, max_entries=args.cache_size)
+        if args.serve:
+            serve(workers=max(1, args.workers), handler=partial(handle_request, scrape=service.scrape))
+            return
+        server = make_http_server(service, args.host, args.http)
+        print(f"Serving on http://{args.host}:{server.server_address[1]}/scrape?url=...", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    elif args.input or len(args.urls) > 1 or args.replay_all:
+        urls = args.urls
+        if args.input:
+            from itertools import chain
+            stream = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+            urls = chain(urls, read_url_lines(stream))
+        run_batch(urls, workers=max(1, args.workers), export=export)
+    elif args.urls and export is not None:
+        run_batch(args.urls, workers=1, export=export)
+    elif args.urls:
+        result = scrape_url(args.urls[0])
         print(json.dumps(result, indent=2))
     elif args.artist:
-        result = scrape_artist(args.artist, args.max_sets)
-        print(json.dumps(result, indent=2))
+        from tracklist_http import set_min_interval
+        set_min_interval(args.delay)
+        scrape_artist(args.artist, args.max_sets, workers=max(1, args.workers), export=export)
     else:
         parser.print_help()
         sys.exit(1)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+String similarity kernel for artist/track matching.
+
+Edit distance uses Myers' bit-parallel algorithm (one pass over the longer
+string, a few integer ops per character) and can stop early once a distance
+limit is exceeded. `similarities()` scores one string against many; with NumPy
+installed it runs the same algorithm across all candidates at once.
+
+Inputs are expected to be normalized already (see normalize_text); nothing
+here lowercases or strips.
+
+Benchmark against the old full-matrix implementation:
+    python scripts/bench_string_similarity.py
+"""
+
+try:
+    import numpy as np
+except ImportError:  # optional: the batch path falls back to pure Python
+    np = None
+
+# uint64 lanes hold one bit per pattern character
+NUMPY_MAX_PATTERN = 64
+NUMPY_CHUNK_SIZE = 4096
+NUMPY_MIN_BATCH = 32   # below this, per-call array setup costs more than it saves
+
+
+def edit_distance(a: str, b: str, max_distance: int = None) -> int:
+    """
+    Levenshtein distance between `a` and `b`.
+    With `max_distance`, returns max_distance + 1 as soon as the distance is
+    known to be larger.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    m, n = len(a), len(b)
+    if max_distance is not None and n - m > max_distance:
+        return max_distance + 1
+    if m == 0:
+        return n
+
+    peq = {}
+    for i, ch in enumerate(a):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for j, ch in enumerate(b):
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        # The last row changes by at most 1 per remaining column
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+    return score
+
+
+def max_distance_for(longer_length: int, threshold: float) -> int:
+    """Largest distance that still gives `threshold` similarity at this length."""
+    return int((1 - threshold) * longer_length + 1e-9)
+
+
+def similarity(a: str, b: str, threshold: float = None) -> float:
+    """
+    Similarity between two normalized strings (0-1): 1 - distance / longer length.
+    With `threshold`, pairs that can't reach it return 0.0 without a full
+    distance computation.
+    """
+    if a == b:
+        return 1.0
+    longer = max(len(a), len(b))
+    if min(len(a), len(b)) == 0:
+        return 0.0
+    limit = max_distance_for(longer, threshold) if threshold is not None else None
+    distance = edit_distance(a, b, limit)
+    if limit is not None and distance > limit:
+        return 0.0
+    return 1 - distance / longer
+
+
+def similarities(query: str, candidates: list, threshold: float = None) -> list:
+    """
+    Score one normalized string against many. Returns a list of similarities
+    in candidate order; with `threshold`, scores below it may be reported as 0.0.
+    """
+    if not candidates:
+        return []
+    if (np is None or len(candidates) < NUMPY_MIN_BATCH or not query
+            or len(query) > NUMPY_MAX_PATTERN or "\0" in query):
+        return [similarity(query, c, threshold) for c in candidates]
+
+    scores = []
+    for start in range(0, len(candidates), NUMPY_CHUNK_SIZE):
+        scores.extend(_similarities_numpy(query, candidates[start:start + NUMPY_CHUNK_SIZE], threshold))
+    return scores
+
+
+def _similarities_numpy(query: str, candidates: list, threshold: float = None) -> list:
+    """
+    Myers' algorithm with the query as pattern, vectorized across candidates.
+    Candidates drop out of the working set once they end or, with `threshold`,
+    once they can no longer reach it; the loop stops when none are left.
+    """
+    m = len(query)
+    lengths = np.fromiter((len(c) for c in candidates), dtype=np.int64, count=len(candidates))
+    width = max(int(lengths.max()), 1)
+    longer = np.maximum(lengths, m)
+
+    # Candidates as an (N, width) code point matrix, padded with NUL
+    padded = "".join(c.ljust(width, "\0") for c in candidates)
+    codes = np.frombuffer(padded.encode("utf-32-le"), dtype=np.uint32).reshape(len(candidates), width)
+
+    # Peq lookup: bitmask of query positions holding each code point
+    peq = {}
+    for i, ch in enumerate(query):
+        peq[ord(ch)] = peq.get(ord(ch), 0) | (1 << i)
+    keys = np.array(sorted(peq), dtype=np.uint32)
+    masks = np.array([peq[k] for k in sorted(peq)], dtype=np.uint64)
+    pos = np.minimum(np.searchsorted(keys, codes), len(keys) - 1)
+    eq_matrix = np.where(keys[pos] == codes, masks[pos], np.uint64(0))
+
+    # Same cutoffs as edit_distance(): the length gap up front, then the
+    # last row's best case after every column
+    distance = longer.copy()
+    live = np.flatnonzero(lengths > 0)
+    limit = None
+    if threshold is not None:
+        limit = ((1 - threshold) * longer + 1e-9).astype(np.int64)
+        live = live[np.abs(lengths[live] - m) <= limit[live]]
+        distance = limit + 1
+
+    mask = np.uint64((1 << m) - 1)
+    high = np.uint64(1 << (m - 1))
+    one = np.uint64(1)
+    zero = np.uint64(0)
+    pv = np.full(len(live), mask, dtype=np.uint64)
+    mv = np.zeros(len(live), dtype=np.uint64)
+    score = np.full(len(live), m, dtype=np.int64)
+
+    for j in range(width):
+        if not len(live):
+            break
+        eq = eq_matrix[live, j]
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        up = (ph & high) != zero
+        down = ~up & ((mh & high) != zero)
+        score += up.astype(np.int64) - down.astype(np.int64)
+        ph = ((ph << one) | one) & mask
+        mh = (mh << one) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+
+        remaining = lengths[live] - j - 1
+        done = remaining == 0
+        keep = ~done
+        if limit is not None:
+            # The last row changes by at most 1 per remaining column
+            keep &= score - remaining <= limit[live]
+        distance[live[done]] = score[done]
+        if not keep.all():
+            live, pv, mv, score = live[keep], pv[keep], mv[keep], score[keep]
+
+    result = 1.0 - distance / longer
+    if limit is not None:
+        result[distance > limit] = 0.0
+    result[lengths == 0] = 0.0
+    return result.tolist()
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+PROJECT_ROOT = SCRIPTS_DIR.parent
+
+# The scripts import each other as top-level modules
+sys.path.insert(0, str(SCRIPTS_DIR))
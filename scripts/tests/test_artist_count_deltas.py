@@ -0,0 +1,153 @@
+"""Per-artist count deltas: journaling, and the cleanup's merges and recount."""
+
+import pytest
+
+from artist_count_deltas import DELTA_TABLE, CountDeltas
+from cleanup_snapshot import open_snapshot, write_snapshot
+
+TS = "2026-10-01T00:00:00+00:00"
+
+
+@pytest.fixture
+def cleanup():
+    try:
+        # The repo's supabase/ directory would satisfy a plain `import supabase`
+        from supabase import create_client  # noqa: F401
+    except ImportError:
+        pytest.skip("supabase-py not installed")
+    import daily_db_cleanup
+    daily_db_cleanup.COUNT_DELTAS.clear()
+    yield daily_db_cleanup
+    daily_db_cleanup.COUNT_DELTAS.clear()
+
+
+def _tables():
+    """Counts start out correct; a1/a2 and t1/t2 are duplicates."""
+    def artist(i, name, tracks, sets):
+        return {"id": f"a{i}", "name": name, "slug": f"s{i}", "tracks_count": tracks, "sets_count": sets,
+                "verified": False, "spotify_url": None, "updated_at": TS}
+
+    def track(i, title, artist_i, artist_name):
+        return {"id": f"t{i}", "title": title, "title_normalized": title.lower(), "artist_id": f"a{artist_i}",
+                "artist_name": artist_name, "times_played": 0, "verified": False, "updated_at": TS}
+
+    def dj_set(i, name, artist_i, artist_name, external_id):
+        return {"id": f"s{i}", "name": name, "artist_id": f"a{artist_i}", "artist_name": artist_name,
+                "external_id": external_id, "tracks_count": 0, "created_at": TS, "updated_at": TS}
+
+    return {
+        "artists": [artist(1, "Chris Stussy", 2, 1), artist(2, "chris stussy", 2, 2), artist(3, "Prunk", 1, 1)],
+        "artist_aliases": [],
+        "tracks": [track(1, "Desire", 1, "Chris Stussy"), track(2, "Desire", 2, "chris stussy"),
+                   track(3, "Rise", 1, "Chris Stussy"), track(4, "Over", 2, "chris stussy"),
+                   track(5, "Lone", 3, "Prunk")],
+        "track_aliases": [],
+        "sets": [dj_set(1, "Live", 1, "Chris Stussy", "x1"), dj_set(2, "Boiler Room", 2, "chris stussy", "x2"),
+                 dj_set(3, "Boiler Room", 2, "chris stussy", "x2"), dj_set(4, "Lot Radio", 3, "Prunk", "x4")],
+        "set_tracks": [],
+    }
+
+
+def _counts(client) -> dict:
+    rows = client.table("artists").select("id, tracks_count, sets_count").execute().data
+    return {r["id"]: (r["tracks_count"], r["sets_count"]) for r in rows}
+
+
+def test_deltas_are_summed_per_artist_and_flushed_once(tmp_path):
+    deltas = CountDeltas("house_sync")
+    deltas.add("a1", sets=1)
+    deltas.add("a1", tracks=1)
+    deltas.add("a2", tracks=1)
+    deltas.add("a2", tracks=-1)
+    deltas.add(None, tracks=1)
+    assert deltas.rows() == [{"artist_id": "a1", "tracks_delta": 1, "sets_delta": 1}]
+
+    write_snapshot(tmp_path / "snap.sqlite", {"artists": []})
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        assert deltas.flush(client) == 1
+        assert deltas.rows() == []
+        rows = client.table(DELTA_TABLE).select("artist_id, tracks_delta, sets_delta, source").execute().data
+    assert rows == [{"artist_id": "a1", "tracks_delta": 1, "sets_delta": 1, "source": "house_sync"}]
+
+
+def test_merge_deltas_match_the_recount(cleanup, tmp_path):
+    write_snapshot(tmp_path / "snap.sqlite", _tables())
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        cleanup.dedup_artists(client)
+        cleanup.dedup_tracks(client)
+        cleanup.dedup_sets(client)
+        # a1's 2 tracks and 1 set moved to a2, then one track and one set deleted as duplicates
+        assert {r["artist_id"]: (r["tracks_delta"], r["sets_delta"])
+                for r in cleanup.COUNT_DELTAS.rows()} == {"a2": (1, 0)}
+
+        stats = cleanup.update_counts(client, since=None)
+        assert stats == {"counts_updated": 1, "drift": 0}
+        assert _counts(client) == {"a2": (3, 2), "a3": (1, 1)}
+        assert cleanup.COUNT_DELTAS.rows() == []
+
+
+def test_recount_reports_drift_and_clears_the_journal(cleanup, tmp_path):
+    tables = _tables()
+    tables["tracks"].append({"id": "t6", "title": "New", "artist_id": "a3", "artist_name": "Prunk",
+                             "updated_at": TS})
+    tables["sets"].append({"id": "s5", "name": "Unjournaled", "artist_id": "a3", "artist_name": "Prunk",
+                           "updated_at": TS})
+    tables[DELTA_TABLE] = [{"id": 1, "artist_id": "a3", "tracks_delta": 1, "sets_delta": 0,
+                            "source": "house_sync"}]
+    write_snapshot(tmp_path / "snap.sqlite", tables)
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        assert cleanup.update_counts(client, dry_run=True, since=None) == {"counts_updated": 1, "drift": 1}
+        assert client.table(DELTA_TABLE).select("id").execute().data == [{"id": 1}]
+
+        # The new track is journaled; the new set isn't, so a3 drifted
+        stats = cleanup.update_counts(client, since="2026-10-01T00:00:00+00:00", reconcile=True)
+        assert stats == {"counts_updated": 1, "drift": 1}
+        assert _counts(client)["a3"] == (2, 2)
+        assert client.table(DELTA_TABLE).select("id").execute().data == []
+
+
+class _WritesDuringRead:
+    """Runs `write` on the client the first time `table` is read."""
+
+    def __init__(self, client, table, write):
+        self._client, self._table, self._write = client, table, write
+
+    def table(self, name):
+        if name == self._table and self._write:
+            write, self._write = self._write, None
+            write(self._client)
+        return self._client.table(name)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def test_recount_leaves_deltas_journaled_while_it_reads(cleanup, tmp_path):
+    tables = _tables()
+    tables["artists"][1]["sets_count"] = 3
+    tables[DELTA_TABLE] = [{"id": "d5", "artist_id": "a3", "tracks_delta": 0, "sets_delta": 1, "source": "house_sync"},
+                           {"id": "d7", "artist_id": "a1", "tracks_delta": 0, "sets_delta": 0, "source": "house_sync"}]
+    write_snapshot(tmp_path / "snap.sqlite", tables)
+
+    def house_sync(client):
+        # Rows first, then the delta, whose id is lower than ones already read
+        client.table("tracks").insert({"id": "t9", "title": "Late", "artist_id": "a3", "artist_name": "Prunk",
+                                       "updated_at": TS}).execute()
+        client.table(DELTA_TABLE).insert({"id": "d6", "artist_id": "a3", "tracks_delta": 1, "sets_delta": 0,
+                                          "source": "house_sync"}).execute()
+
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        cleanup.COUNT_DELTAS.add("a3", tracks=-1)
+        stats = cleanup.reconcile_counts(_WritesDuringRead(client, "tracks", house_sync))
+        # a2's counts were fixed; a3's were left, with all its deltas
+        assert stats == {"counts_updated": 1, "drift": 1}
+        assert _counts(client) == {"a1": (2, 1), "a2": (2, 2), "a3": (1, 1)}
+        journal = client.table(DELTA_TABLE).select("artist_id, tracks_delta, sets_delta").execute().data
+        assert sorted((d["artist_id"], d["tracks_delta"], d["sets_delta"]) for d in journal) == [
+            ("a3", -1, 0), ("a3", 0, 1), ("a3", 1, 0)]
+        assert cleanup.COUNT_DELTAS.rows() == []
+
+        # The next recount sees nothing new and settles a3
+        assert cleanup.reconcile_counts(client)["counts_updated"] == 1
+        assert _counts(client)["a3"] == (2, 1)
+        assert client.table(DELTA_TABLE).select("id").execute().data == []
@@ -0,0 +1,107 @@
+"""Per-phase profiling: PostgREST traffic counters, pstats dumps and the report."""
+
+import json
+import logging
+import pstats
+from types import SimpleNamespace
+
+import pytest
+
+try:
+    # The repo's supabase/ directory would satisfy a plain `import supabase`
+    from supabase import create_client  # noqa: F401
+except ImportError:
+    pytest.skip("supabase-py not installed", allow_module_level=True)
+
+from daily_db_cleanup import CleanupPhase, log_profile, run_phases  # noqa: E402
+
+ARTISTS = [{"id": "a1", "name": "Prunk"}, {"id": "a2", "name": "Chris Stussy"}, {"id": "a3", "name": "Rossi."}]
+
+
+class _FakeQuery:
+    """Chainable builder: filters are no-ops, execute() returns `data`."""
+
+    def __init__(self, data):
+        self._data = data
+        self.not_ = self
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def is_(self, *args):
+        return self
+
+    def insert(self, rows):
+        return _FakeQuery(rows)
+
+    def update(self, values):
+        return _FakeQuery([values])
+
+    def execute(self):
+        return SimpleNamespace(data=self._data)
+
+
+class _FakeClient:
+    def table(self, name):
+        return _FakeQuery(ARTISTS)
+
+    def rpc(self, fn, params):
+        return _FakeQuery({"fn": fn})
+
+
+def _reader(client, dry_run, since):
+    client.table("artists").select("id, name").execute()
+    client.table("artists").select("id").not_.is_("name", "null").execute()
+    return {}
+
+
+def _writer(client, dry_run, since):
+    client.table("artists").insert([{"name": "Obskür"}, {"name": "Dennis Cruz"}]).execute()
+    client.table("artists").update({"name": "Rossi"}).eq("id", "a3").execute()
+    client.rpc("cleanup_update_counts", {"dry_run": False}).execute()
+    return {}
+
+
+def _phases() -> list:
+    return [CleanupPhase("reader", _reader, reads=frozenset({"artists"}), writes=frozenset()),
+            CleanupPhase("writer", _writer, reads=frozenset({"artists"}), writes=frozenset({"artists"}))]
+
+
+def _size(value) -> int:
+    return len(json.dumps(value))
+
+
+def test_requests_and_bytes_are_counted_per_phase():
+    _, _, _, profiles = run_phases(_FakeClient(), _phases(), workers=2, profile=True)
+
+    reader, writer = profiles["reader"], profiles["writer"]
+    assert reader["calls"] == 2 and reader["calls_by_kind"] == {"select": 2}
+    assert reader["rows_read"] == 6 and reader["rows_written"] == 0
+    assert reader["bytes_sent"] == 0 and reader["bytes_received"] == 2 * _size(ARTISTS)
+
+    assert writer["calls"] == 3 and writer["calls_by_kind"] == {"insert": 1, "update": 1, "rpc": 1}
+    assert writer["rows_written"] == 3 and writer["rows_read"] == 1    # the rpc's single-object response
+    assert writer["bytes_sent"] == (_size([{"name": "Obskür"}, {"name": "Dennis Cruz"}])
+                                    + _size({"name": "Rossi"}) + _size({"dry_run": False}))
+    assert writer["bytes_received"] == (_size([{"name": "Obskür"}, {"name": "Dennis Cruz"}])
+                                        + _size([{"name": "Rossi"}]) + _size({"fn": "cleanup_update_counts"}))
+    assert "pstats" not in reader
+
+
+def test_profile_dir_writes_a_pstats_dump_per_phase(tmp_path, caplog):
+    _, _, _, profiles = run_phases(_FakeClient(), _phases(), workers=1, profile_dir=tmp_path)
+
+    for name, func in (("reader", _reader), ("writer", _writer)):
+        assert profiles[name]["pstats"] == str(tmp_path / f"{name}.pstats")
+        functions = {fn for _, _, fn in pstats.Stats(profiles[name]["pstats"]).stats}
+        assert func.__name__ in functions
+
+    with caplog.at_level(logging.INFO, logger="db_cleanup"):
+        log_profile(profiles)
+    header, *rows = [r.getMessage().split() for r in caplog.records]
+    assert header[0] == "Phase" and len(rows) == 2
+    assert [row[0] for row in rows] == ["reader", "writer"]
+    assert rows[1][4:6] == ["3", "1"]     # calls, rows in
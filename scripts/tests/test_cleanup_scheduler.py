@@ -0,0 +1,102 @@
+"""The cleanup phase scheduler: dependency DAG, concurrency and critical path."""
+
+import threading
+import time
+
+import pytest
+
+try:
+    # The repo's supabase/ directory would satisfy a plain `import supabase`
+    from supabase import create_client  # noqa: F401
+except ImportError:
+    pytest.skip("supabase-py not installed", allow_module_level=True)
+
+from daily_db_cleanup import CleanupPhase, build_phase_dag, critical_path, run_phases  # noqa: E402
+
+
+def _phases(spans: dict, lock: threading.Lock) -> list:
+    """Stub phases that record when they ran and sleep long enough to overlap."""
+    def phase(name, reads, writes):
+        def run(client, dry_run, since):
+            started = time.perf_counter()
+            time.sleep(0.05)
+            with lock:
+                spans[name] = (started, time.perf_counter())
+            return {"ran": name}
+        return CleanupPhase(name, run, reads=frozenset(reads), writes=frozenset(writes))
+
+    return [
+        phase("artists", {"artists"}, {"artists", "tracks.artist_id"}),
+        phase("tracks", {"tracks"}, {"tracks"}),                          # waits for artists
+        phase("slugs", {"artists.slug"}, {"artists.slug"}),               # waits for artists
+        phase("sets", {"sets"}, {"sets"}),                                # independent
+        phase("report", {"tracks.id", "sets.id"}, set()),                 # waits for tracks and sets
+    ]
+
+
+def test_dag_follows_read_write_conflicts():
+    deps = build_phase_dag(_phases({}, threading.Lock()))
+    assert deps == {
+        "artists": set(),
+        "tracks": {"artists"},
+        "slugs": {"artists"},
+        "sets": set(),
+        "report": {"tracks", "sets"},
+    }
+
+
+def test_conflicting_phases_never_overlap():
+    spans = {}
+    phases = _phases(spans, threading.Lock())
+    results, durations, deps, _ = run_phases(object(), phases, workers=4)
+
+    assert results == {p.name: {"ran": p.name} for p in phases}
+    assert durations.keys() == spans.keys()
+    for name, waits_for in deps.items():
+        for dep in waits_for:
+            assert spans[dep][1] <= spans[name][0], f"{name} started before {dep} finished"
+
+    # Independent phases did run side by side
+    assert spans["sets"][0] < spans["artists"][1]
+    assert spans["slugs"][0] < spans["tracks"][1] and spans["tracks"][0] < spans["slugs"][1]
+
+
+def test_one_worker_runs_in_declaration_order():
+    spans = {}
+    phases = _phases(spans, threading.Lock())
+    run_phases(object(), phases, workers=1)
+    order = sorted(spans, key=lambda name: spans[name][0])
+    assert order == [p.name for p in phases]
+
+
+def test_a_failed_phase_stops_its_dependents():
+    ran = []
+
+    def ok(name):
+        def run(client, dry_run, since):
+            ran.append(name)
+            return {}
+        return run
+
+    def fail(client, dry_run, since):
+        raise RuntimeError("boom")
+
+    phases = [
+        CleanupPhase("artists", fail, reads=frozenset({"artists"}), writes=frozenset({"artists"})),
+        CleanupPhase("slugs", ok("slugs"), reads=frozenset({"artists.slug"}), writes=frozenset({"artists.slug"})),
+    ]
+    with pytest.raises(RuntimeError, match="boom"):
+        run_phases(object(), phases, workers=2)
+    assert ran == []
+
+
+def test_critical_path_is_the_longest_chain():
+    phases = _phases({}, threading.Lock())
+    deps = build_phase_dag(phases)
+    durations = {"artists": 1.0, "tracks": 2.0, "slugs": 5.0, "sets": 4.0, "report": 0.5}
+    assert critical_path(phases, deps, durations) == (["artists", "slugs"], 6.0)
+
+    durations["sets"] = 3.5
+    durations["report"] = 3.0
+    assert critical_path(phases, deps, durations) == (["sets", "report"], 6.5)
+    assert critical_path([], {}, {}) == ([], 0.0)
@@ -0,0 +1,112 @@
+"""Snapshot queries, plan recording and optimistic plan application."""
+
+import json
+import sqlite3
+
+import pytest
+
+from cleanup_snapshot import apply_plan, open_snapshot, plan_unit, read_plan, write_snapshot
+
+TS = "2026-10-01T00:00:00+00:00"
+
+
+def _tables():
+    return {
+        "artists": [
+            {"id": "a1", "name": "Chris Stussy", "sets_count": 3, "verified": True, "updated_at": TS},
+            {"id": "a2", "name": "chris stussy", "sets_count": 0, "verified": False, "updated_at": TS},
+            {"id": "a3", "name": "Sonny Fodera", "sets_count": None, "verified": False, "updated_at": TS},
+        ],
+        "tracks": [
+            {"id": "t1", "title": "Foo", "artist_id": "a1", "genres": ["house"], "updated_at": TS},
+            {"id": "t2", "title": "Bar", "artist_id": "a2", "genres": None, "updated_at": TS},
+        ],
+    }
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / "snap.sqlite"
+    write_snapshot(path, _tables())
+    return path
+
+
+def _merge(client):
+    """A small merge the way the cleanup phases write it."""
+    group = client.table("artists").select("id, name").eq("name", "chris stussy").execute().data
+    with plan_unit(client, "merge artist 'chris stussy'", "artists", group):
+        client.table("tracks").update({"artist_id": "a1"}).eq("artist_id", "a2").execute()
+        client.table("artists").delete().eq("id", "a2").execute()
+    client.table("artists").update({"sets_count": 4}).eq("id", "a1").execute()
+
+
+def test_queries_match_postgrest_semantics(snapshot, tmp_path):
+    with open_snapshot(snapshot, tmp_path / "plan.jsonl") as client:
+        rows = client.table("artists").select("id, sets_count, verified").order("sets_count").execute().data
+        assert [r["id"] for r in rows] == ["a2", "a1", "a3"]    # NULLs sort last
+        assert rows[0]["verified"] is False
+
+        page = (client.table("artists").select("id", count="exact")
+                .or_("name.gt.Chris Stussy,and(name.eq.Chris Stussy,id.gt.a0)")
+                .order("name").order("id").range(0, 0).execute())
+        assert page.count == 3 and [r["id"] for r in page.data] == ["a1"]
+
+        assert client.table("artists").select("id").not_.is_("sets_count", "null").in_(
+            "id", ["a1", "a3"]).execute().data == [{"id": "a1"}]
+        assert client.table("tracks").select("genres").eq("id", "t1").execute().data == [{"genres": ["house"]}]
+
+
+def test_writes_go_to_scratch_and_plan(snapshot, tmp_path):
+    plan = tmp_path / "plan.jsonl"
+    with open_snapshot(snapshot, plan) as client:
+        _merge(client.for_phase("artist_dedup"))
+        assert client.table("tracks").select("id").eq("artist_id", "a2").execute().data == []
+
+    original = sqlite3.connect(snapshot).execute("SELECT COUNT(*) FROM artists").fetchone()[0]
+    assert original == 3
+
+    steps = read_plan(plan)
+    assert [s[0] for s in steps] == ["unit", "op"]
+    unit, ops = steps[0][1], steps[0][2]
+    assert unit["expect"] == {"artists": {"a2": TS}} and unit["phase"] == "artist_dedup"
+    assert [(op["table"], op["op"]) for op in ops] == [("tracks", "update"), ("artists", "delete")]
+    assert steps[1][1]["expect"] == {"a1": TS}
+
+
+def test_apply_reproduces_writes(snapshot, tmp_path):
+    plan = tmp_path / "plan.jsonl"
+    with open_snapshot(snapshot, plan) as client:
+        _merge(client)
+
+    with open_snapshot(snapshot, tmp_path / "unused.jsonl") as live:
+        stats = apply_plan(live, plan)
+        assert stats["units_applied"] == 1 and stats["conflicts"] == []
+        assert [r["id"] for r in live.table("artists").select("id").order("id").execute().data] == ["a1", "a3"]
+        assert live.table("artists").select("sets_count").eq("id", "a1").execute().data == [{"sets_count": 4}]
+        assert live.table("tracks").select("artist_id").eq("id", "t2").execute().data == [{"artist_id": "a1"}]
+
+
+def test_apply_skips_rows_changed_since_snapshot(snapshot, tmp_path):
+    plan = tmp_path / "plan.jsonl"
+    with open_snapshot(snapshot, plan) as client:
+        _merge(client)
+
+    with open_snapshot(snapshot, tmp_path / "unused.jsonl") as live:
+        later = "2026-10-02T00:00:00+00:00"
+        live.table("artists").update({"updated_at": later}).in_("id", ["a1", "a2"]).execute()
+        stats = apply_plan(live, plan)
+        assert stats["units_skipped"] == 1 and stats["ids_skipped"] == 1
+        assert len(live.table("artists").select("id").execute().data) == 3
+        assert live.table("tracks").select("artist_id").eq("id", "t2").execute().data == [{"artist_id": "a2"}]
+
+
+def test_plan_is_not_written_when_the_run_fails(snapshot, tmp_path):
+    plan = tmp_path / "plan.jsonl"
+    with pytest.raises(RuntimeError):
+        with open_snapshot(snapshot, plan) as client:
+            _merge(client)
+            raise RuntimeError("phase failed")
+    assert not plan.exists()
+    assert list(tmp_path.glob("*.scratch")) == [] and list(tmp_path.glob("*.tmp")) == []
+    assert json.loads(sqlite3.connect(snapshot).execute(
+        "SELECT value FROM _meta WHERE key = 'row_counts'").fetchone()[0]) == {"artists": 3, "tracks": 2}
@@ -0,0 +1,90 @@
+"""CompactTable: column-oriented rows round-trip exactly, odd values included."""
+
+import uuid
+
+import pytest
+
+from compact_rows import CompactTable
+
+COLUMNS = "id, name, artist_id, tracks_count, bpm, verified, label"
+
+
+def _rows() -> list:
+    return [
+        {"id": str(uuid.UUID(int=1)), "name": "Chris Stussy", "artist_id": str(uuid.UUID(int=2 ** 128 - 1)),
+         "tracks_count": 12, "bpm": 124, "verified": True, "label": "Up The Stuss"},
+        {"id": "6f9619ff-8b86-d011-b42d-00c04fc964ff", "name": "Âme", "artist_id": None,
+         "tracks_count": 0, "bpm": None, "verified": False, "label": None},
+        # Ids that aren't canonical UUIDs, and values of the wrong kind
+        {"id": "a1", "name": None, "artist_id": "6F9619FF-8B86-D011-B42D-00C04FC964FF",
+         "tracks_count": "7", "bpm": -(2 ** 63), "verified": "yes", "label": ""},
+        {"id": "{12345678-1234-5678-1234-567812345678}", "name": "", "artist_id": 42,
+         "tracks_count": 2 ** 62, "bpm": True, "verified": None, "label": "Label"},
+        {"id": str(uuid.UUID(int=0)), "name": "x", "artist_id": str(uuid.UUID(int=0)),
+         "tracks_count": -1, "bpm": 0, "verified": 1, "label": "x"},
+    ]
+
+
+def test_rows_round_trip():
+    table = CompactTable(COLUMNS)
+    table.extend(_rows())
+    assert len(table) == 5
+    assert [dict(row) for row in table] == _rows()
+    assert dict(table[-1]) == _rows()[-1]
+    with pytest.raises(IndexError):
+        table[5]
+
+
+def test_canonical_uuids_are_packed_in_16_bytes():
+    ids = [str(uuid.uuid4()) for _ in range(100)]
+    table = CompactTable("id, artist_id")
+    table.extend({"id": i, "artist_id": None} for i in ids)
+    assert len(table._data[0]) == 16 * 100 and len(table._data[1]) == 16 * 100
+    assert table._overflow == {}
+    assert [row["id"] for row in table] == ids
+    assert [row["artist_id"] for row in table] == [None] * 100
+
+
+def test_values_that_dont_fit_go_to_the_overflow():
+    table = CompactTable(COLUMNS)
+    table.extend(_rows())
+    id_col, artist_col, count_col, bpm_col, verified_col = (
+        table._index[c] for c in ("id", "artist_id", "tracks_count", "bpm", "verified"))
+    # Upper-case, braced and non-UUID ids would not come back unchanged from
+    # 16 bytes, and the nil UUID would come back as NULL
+    assert set(table._overflow) == {
+        (id_col, 2), (artist_col, 2), (count_col, 2), (bpm_col, 2), (verified_col, 2),
+        (id_col, 3), (artist_col, 3), (bpm_col, 3),
+        (id_col, 4), (artist_col, 4), (verified_col, 4),
+    }
+    assert table[2]["id"] == "a1" and table[3]["artist_id"] == 42
+
+
+def test_column_slices_match_row_values():
+    rows = _rows() * 3
+    table = CompactTable(COLUMNS)
+    table.extend(rows)
+    for column in table.columns:
+        assert table.column(column) == [r[column] for r in rows]
+        assert table.column(column, 4, 11) == [r[column] for r in rows[4:11]]
+    assert table.column("missing", 0, 3) == [None] * 3
+    assert table.column("name", 20) == []
+
+
+def test_rows_behave_like_read_only_dicts():
+    table = CompactTable(COLUMNS)
+    table.extend(_rows())
+    row = table[0]
+    assert row.get("missing", "default") == "default"
+    with pytest.raises(KeyError):
+        row["missing"]
+    assert list(row) == table.columns and len(row) == len(table.columns)
+    assert row == _rows()[0] and row == table[0] and row != table[1]
+    assert len({table[0], table[0], table[1]}) == 2
+
+
+def test_repeated_strings_are_stored_once():
+    table = CompactTable("id, label")
+    table.extend({"id": str(uuid.uuid4()), "label": "".join(["Up The ", "Stuss"])} for _ in range(50))
+    labels = table._data[1]
+    assert all(label is labels[0] for label in labels)
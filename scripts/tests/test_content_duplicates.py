@@ -0,0 +1,89 @@
+"""Content duplicate sets: streamed MinHash signatures, LSH, and exact confirmation."""
+
+import json
+import random
+
+import pytest
+
+from cleanup_snapshot import open_snapshot, write_snapshot
+
+OLD = "2025-01-01T00:00:00+00:00"
+NEW = "2026-10-10T00:00:00+00:00"
+SINCE = "2026-10-01T00:00:00+00:00"
+
+
+@pytest.fixture
+def cleanup(tmp_path, monkeypatch):
+    try:
+        # The repo's supabase/ directory would satisfy a plain `import supabase`
+        from supabase import create_client  # noqa: F401
+    except ImportError:
+        pytest.skip("supabase-py not installed")
+    import daily_db_cleanup
+    monkeypatch.setattr(daily_db_cleanup, "FUZZY_REPORT_DIR", tmp_path / "reports")
+    return daily_db_cleanup
+
+
+def _tables():
+    """
+    40 random tracklists. s01 re-uploads s00 with one track swapped, s11 is s10
+    with two extra tracks, s21 is s20 with the second half dropped; s31 has too
+    few tracks to compare. s01 and s21 changed recently.
+    """
+    rng = random.Random(11)
+    pool = [f"t{i:04d}" for i in range(400)]
+    lists = {f"s{i:02d}": rng.sample(pool, 12) for i in range(40)}
+    lists["s01"] = lists["s00"][:5] + ["t9999"] + lists["s00"][6:]
+    lists["s11"] = lists["s10"] + ["t9998", "t9997"]
+    lists["s21"] = lists["s20"][:6]
+    lists["s31"] = lists["s30"][:3]
+
+    sets, set_tracks = [], []
+    for set_id, tracks in lists.items():
+        changed = set_id in ("s01", "s21")
+        sets.append({"id": set_id, "name": f"Set {set_id}", "artist_name": "Prunk", "external_id": set_id,
+                     "tracks_count": len(tracks), "updated_at": NEW if changed else OLD})
+        for position, track_id in enumerate(tracks):
+            set_tracks.append({"id": f"{set_id}-{position:02d}", "set_id": set_id, "track_id": track_id,
+                               "position": position, "created_at": OLD})
+        set_tracks.append({"id": f"{set_id}-unknown", "set_id": set_id, "track_id": None, "position": 99,
+                           "created_at": OLD})
+    return {"sets": sets, "set_tracks": set_tracks}
+
+
+def _run(cleanup, tmp_path, since):
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        stats = cleanup.find_content_duplicate_sets(client, since=since)
+    pairs = set()
+    if stats["candidates_file"]:
+        with open(stats["candidates_file"]) as f:
+            pairs = {frozenset((p["a"]["id"], p["b"]["id"])) for p in map(json.loads, f)}
+    return stats, pairs
+
+
+def test_full_run_flags_reuploads(cleanup, tmp_path):
+    write_snapshot(tmp_path / "snap.sqlite", _tables())
+    stats, pairs = _run(cleanup, tmp_path, None)
+    assert stats["sets_compared"] == 39
+    assert pairs == {frozenset(("s00", "s01")), frozenset(("s10", "s11")), frozenset(("s20", "s21"))}
+
+
+def test_incremental_only_probes_changed_sets(cleanup, tmp_path):
+    write_snapshot(tmp_path / "snap.sqlite", _tables())
+    stats, pairs = _run(cleanup, tmp_path, SINCE)
+    assert stats["sets_compared"] == 2
+    assert pairs == {frozenset(("s00", "s01")), frozenset(("s20", "s21"))}
+
+
+def test_signatures_stream_across_pages(cleanup, tmp_path, monkeypatch):
+    write_snapshot(tmp_path / "snap.sqlite", _tables())
+    iter_keyset = cleanup.iter_keyset
+    monkeypatch.setattr(cleanup, "iter_keyset",
+                        lambda *args, **kwargs: iter_keyset(*args, **{**kwargs, "page_size": 7}))
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        streamed = dict(cleanup.stream_set_signatures(client, cleanup.MinHasher()))
+        sequences = cleanup.fetch_track_sequences(client, [s["id"] for s in _tables()["sets"]])
+
+    hasher = cleanup.MinHasher()
+    assert streamed == {set_id: cleanup.pack_signature(hasher.signature(seq)) for set_id, seq in sequences.items()}
+    assert len(streamed) == 39 and "s31" not in streamed
@@ -0,0 +1,110 @@
+"""Fuzzy near-duplicate candidates: incremental runs fetch only the changed rows' blocks."""
+
+import json
+import random
+import string
+
+import pytest
+
+from cleanup_snapshot import open_snapshot, write_snapshot
+
+OLD = "2025-01-01T00:00:00+00:00"
+NEW = "2026-10-10T00:00:00+00:00"
+SINCE = "2026-10-01T00:00:00+00:00"
+
+
+@pytest.fixture
+def cleanup(tmp_path, monkeypatch):
+    try:
+        # The repo's supabase/ directory would satisfy a plain `import supabase`
+        from supabase import create_client  # noqa: F401
+    except ImportError:
+        pytest.skip("supabase-py not installed")
+    import daily_db_cleanup
+    monkeypatch.setattr(daily_db_cleanup, "FUZZY_REPORT_DIR", tmp_path / "reports")
+    return daily_db_cleanup
+
+
+def _typo(rng, text: str) -> str:
+    i = rng.randrange(len(text))
+    return text[:i] + rng.choice(string.ascii_lowercase) + text[i + 1:]
+
+
+def _tables(cleanup, rng) -> dict:
+    """Random names, some with a one-letter typo twin; every fortieth row changed recently."""
+    def word():
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+
+    names = []
+    for _ in range(400):
+        name = f"{word()} {word()}".title()
+        names.append(name)
+        if rng.random() < 0.3:
+            names.append(_typo(rng, name))
+
+    artists, tracks = [], []
+    for i, name in enumerate(names):
+        updated = NEW if i % 40 == 0 else OLD
+        artists.append({"id": f"a{i:04d}", "name": name, "name_normalized": cleanup.normalize_text(name),
+                        "sets_count": 0, "tracks_count": 1, "updated_at": updated})
+        title = f"{word()} {word()}"
+        for j, (artist, t) in enumerate([(name, title), (_typo(rng, name), _typo(rng, title))]):
+            tracks.append({"id": f"t{i:04d}{j}", "title": t, "title_normalized": cleanup.normalize_text(t),
+                           "artist_name": artist, "artist_name_normalized": cleanup.normalize_text(artist),
+                           "times_played": 0, "updated_at": updated if j else OLD})
+    return {"artists": artists, "tracks": tracks}
+
+
+def _run(cleanup, snapshot, tmp_path, since):
+    profile = cleanup.PhaseProfile()
+    with open_snapshot(snapshot, tmp_path / "plan.jsonl") as client:
+        stats = cleanup.find_fuzzy_duplicates(cleanup.ProfilingClient(client, profile), since=since)
+    pairs = set()
+    if stats["candidates_file"]:
+        with open(stats["candidates_file"]) as f:
+            for line in f:
+                c = json.loads(line)
+                pairs.add((c["kind"], frozenset(r["id"] for side in ("a", "b") for r in c[side]["rows"])))
+    return pairs, profile.rows_read
+
+
+def test_incremental_finds_every_pair_with_a_changed_row(cleanup, tmp_path):
+    tables = _tables(cleanup, random.Random(7))
+    write_snapshot(tmp_path / "snap.sqlite", tables)
+    changed = {r["id"] for name in ("artists", "tracks") for r in tables[name] if r["updated_at"] == NEW}
+
+    full, full_rows = _run(cleanup, tmp_path / "snap.sqlite", tmp_path, None)
+    incremental, incremental_rows = _run(cleanup, tmp_path / "snap.sqlite", tmp_path, SINCE)
+
+    expected = {pair for pair in full if pair[1] & changed}
+    assert expected and {kind for kind, _ in expected} == {"artist", "track"}
+    assert incremental == expected
+    assert incremental_rows < full_rows / 2
+
+
+def test_block_grams_survive_any_allowed_edit(cleanup):
+    rng = random.Random(3)
+    for _ in range(300):
+        key = "".join(rng.choice("abcde ") for _ in range(rng.randint(3, 40))).strip()
+        grams = cleanup.block_grams(key)
+        if grams is None or len(key) < 3:
+            continue
+        other = key
+        for _ in range(cleanup.max_edits(len(key), cleanup.FUZZY_THRESHOLD)):
+            other = _typo(rng, other)
+        assert any(g in other for g in grams), (key, other)
+
+
+def test_like_grams_match_literally(cleanup, tmp_path):
+    names = ["dj_mk", "djxmk", "100%", "1000", 'a\\b"c', "ab"]
+    write_snapshot(tmp_path / "snap.sqlite",
+                   {"artists": [{"id": f"a{i}", "name": name} for i, name in enumerate(names)]})
+    # LIKE escapes first, then the quoted value's own
+    assert cleanup._like_literal(r'5%_\"') == r'5\\%\\_\\\\\"'
+
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        def found(*grams):
+            return sorted(r["name"] for r in cleanup.fetch_like(client, "artists", "id, name", ("name",), grams))
+        assert found("j_m") == ["dj_mk"]
+        assert found("0%") == ["100%"]
+        assert found('\\b"') == ['a\\b"c']
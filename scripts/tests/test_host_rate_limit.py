@@ -0,0 +1,61 @@
+"""host_rate_limit.py: token buckets shared between processes through SQLite."""
+
+import subprocess
+import sys
+import time
+
+from conftest import SCRIPTS_DIR
+from host_rate_limit import HostRateLimiter, host_of, parse_rates
+
+URL = "https://www.1001tracklists.com/tracklist/2abc9/set.html"
+
+
+def _limiter(path, now, rates=None):
+    return HostRateLimiter(str(path), rates or {"1001tracklists.com": (2.0, 2)},
+                           clock=lambda: now[0], sleep=lambda s: None)
+
+
+def test_rates_come_from_host_specs():
+    assert parse_rates("1001tracklists.com=0.5/2, www.1001.tl=1") == {
+        "1001tracklists.com": (0.5, 2.0), "1001.tl": (1.0, 1.0)}
+    assert host_of(URL) == host_of("https://1001tracklists.com/") == "1001tracklists.com"
+
+
+def test_burst_then_callers_queue_in_order(tmp_path):
+    now = [100.0]
+    limiter = _limiter(tmp_path / "rate.sqlite", now)
+    assert [limiter.reserve(URL) for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+
+    now[0] += 2.0                       # the queue has drained, refilled to -2 + 4 = 2 tokens
+    assert [limiter.reserve(URL) for _ in range(3)] == [0.0, 0.0, 0.5]
+    assert limiter.reserve("https://example.com/") == 0.0
+
+
+def test_limiters_sharing_a_file_share_the_bucket_and_metrics(tmp_path):
+    now = [100.0]
+    cron = _limiter(tmp_path / "rate.sqlite", now)
+    backend = _limiter(tmp_path / "rate.sqlite", now)
+    waits = [cron.reserve(URL), backend.reserve(URL), backend.reserve(URL), cron.reserve(URL)]
+    assert waits == [0.0, 0.0, 0.5, 1.0]
+
+    stats = cron.stats()["1001tracklists.com"]
+    assert stats == {"requests": 4, "delayed": 2, "total_wait_seconds": 1.5, "max_wait_seconds": 1.0,
+                     "avg_wait_seconds": 0.375, "rate": 2.0, "burst": 2}
+    backend.reset()
+    assert cron.stats() == {}
+
+
+def test_processes_are_paced_together(tmp_path):
+    db = tmp_path / "rate.sqlite"
+    code = (f"import sys; sys.path.insert(0, {str(SCRIPTS_DIR)!r})\n"
+            "from host_rate_limit import acquire\n"
+            f"for _ in range(3): acquire({URL!r})\n")
+    env = {"SCRAPE_RATE_LIMIT_DB": str(db), "SCRAPE_RATE_LIMITS": "1001tracklists.com=20/1"}
+    started = time.monotonic()
+    procs = [subprocess.Popen([sys.executable, "-c", code], env=env) for _ in range(2)]
+    assert [p.wait(timeout=30) for p in procs] == [0, 0]
+
+    # 6 requests at 20/s with a burst of 1: the last may start no sooner than 5/20 s after the first
+    assert time.monotonic() - started >= 0.25
+    stats = HostRateLimiter(str(db), {}).stats()["1001tracklists.com"]
+    assert stats["requests"] == 6 and stats["delayed"] >= 2
@@ -0,0 +1,83 @@
+"""html_archive.py: packed, content-addressed page store and its index."""
+
+from types import SimpleNamespace
+
+import pytest
+
+import html_archive
+from html_archive import HtmlArchive
+
+BASE = "https://www.1001tracklists.com/tracklist"
+
+
+def _page(title, tracks=20):
+    return f"<html><title>{title}</title>" + "".join(f"<li>Track {i}</li>" for i in range(tracks)) + "</html>"
+
+
+def test_pages_are_stored_once_and_indexed_per_fetch(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    first = archive.put(f"{BASE}/2abc9/set.html", _page("One"), fetched_at=1.0)
+    again = archive.put(f"{BASE}/2abc9/set.html", _page("One"), fetched_at=2.0)
+    archive.put(f"{BASE}/2abc9/set.html", _page("One, edited"), fetched_at=3.0)
+    archive.put(f"{BASE}/77xy1/other.html", _page("Two"), fetched_at=4.0)
+
+    assert first == again
+    assert archive.summary()["fetches"] == 4 and archive.summary()["pages"] == 3
+    assert archive.summary()["stored_bytes"] < archive.summary()["raw_bytes"]
+    assert [f["fetched_at"] for f in archive.fetches(tracklist_id="2abc9")] == [1.0, 2.0, 3.0]
+    assert [f["url"] for f in archive.fetches(since=3.5)] == [f"{BASE}/77xy1/other.html"]
+    assert archive.tracklist_urls() == [f"{BASE}/2abc9/set.html", f"{BASE}/77xy1/other.html"]
+    # A later fetch under a renamed slug replaces the URL but keeps the tracklist's place
+    archive.put(f"{BASE}/2abc9/renamed.html", _page("One, edited"), fetched_at=5.0)
+    assert archive.tracklist_urls() == [f"{BASE}/2abc9/renamed.html", f"{BASE}/77xy1/other.html"]
+
+
+def test_latest_page_by_url_then_tracklist_id(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    archive.put(f"{BASE}/2abc9/set.html", _page("Old"), fetched_at=1.0)
+    archive.put(f"{BASE}/2abc9/set.html", _page("New"), fetched_at=2.0)
+
+    assert archive.latest(f"{BASE}/2abc9/set.html") == _page("New")
+    assert archive.latest(f"{BASE}/2abc9/renamed-slug.html") == _page("New")
+    assert archive.latest(f"{BASE}/missing/set.html") is None
+    # Another process (a second instance) reads the same archive
+    assert HtmlArchive(str(tmp_path)).latest(f"{BASE}/2abc9/set.html") == _page("New")
+
+
+def test_packs_roll_over_and_stay_readable(tmp_path, monkeypatch):
+    monkeypatch.setattr(html_archive, "PACK_MAX_BYTES", 200)
+    archive = HtmlArchive(str(tmp_path))
+    pages = {f"{BASE}/{i}/set.html": _page(f"Set {i}", tracks=i * 7) for i in range(1, 8)}
+    for url, page in pages.items():
+        archive.put(url, page)
+        assert archive.latest(url) == page      # readable while its pack is still growing
+
+    assert len(list(tmp_path.glob("pack-*.pack"))) > 1
+    assert all(archive.latest(url) == page for url, page in pages.items())
+    archive.close()
+
+
+def test_archive_errors_dont_refetch_or_fail_the_page(monkeypatch, caplog):
+    for module in ("requests", "bs4", "fake_headers"):
+        pytest.importorskip(module)
+    import tracklist_http
+
+    class BrokenArchive:
+        def put(self, url, html):
+            raise OSError("No space left on device")
+
+    class Session:
+        calls = 0
+
+        def get(self, url, **kwargs):
+            Session.calls += 1
+            return SimpleNamespace(text=_page("Set"), raise_for_status=lambda: None)
+
+    monkeypatch.setattr(tracklist_http, "_get_archive", BrokenArchive)
+    monkeypatch.setattr(tracklist_http, "get_session", Session)
+    monkeypatch.setattr(tracklist_http, "acquire", lambda url: 0)
+
+    soup = tracklist_http.get_soup(f"{BASE}/2abc9/set.html")
+    assert soup.title.text == "Set"
+    assert Session.calls == 1
+    assert "Could not archive" in caplog.text
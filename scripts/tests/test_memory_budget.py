@@ -0,0 +1,109 @@
+"""Memory budget: over_budget, per-phase peaks, and hash-partitioned passes."""
+
+import itertools
+import threading
+
+import pytest
+
+from cleanup_snapshot import open_snapshot, write_snapshot
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def cleanup():
+    try:
+        # The repo's supabase/ directory would satisfy a plain `import supabase`
+        from supabase import create_client  # noqa: F401
+    except ImportError:
+        pytest.skip("supabase-py not installed")
+    import daily_db_cleanup
+    yield daily_db_cleanup
+    daily_db_cleanup.MEMORY.max_bytes = None
+    daily_db_cleanup.MEMORY.passes.clear()
+
+
+def _artists(n: int = 300) -> list:
+    # 100 names x 3 spellings; names 0 and 50 are "!!!", which normalizes to ""
+    return [{"id": f"a{i:04d}", "name": ("!!!" if i % 50 == 0 else
+                                        [f"Artist {i % 100}", f"ARTIST {i % 100}!", f"artist  {i % 100}"][i % 3])}
+            for i in range(n)]
+
+
+def test_over_budget_needs_headroom_and_growth(cleanup, monkeypatch):
+    monitor = cleanup.MemoryMonitor()
+    assert not monitor.over_budget(0)
+    monitor.max_bytes = 100 * MB
+    monkeypatch.setattr(cleanup, "current_rss", lambda: 80 * MB)
+    assert monitor.over_budget(60 * MB)
+    assert not monitor.over_budget(78 * MB)      # high but flat: this pass barely grew
+    monkeypatch.setattr(cleanup, "current_rss", lambda: 50 * MB)
+    assert not monitor.over_budget(0)
+
+
+def test_peaks_are_only_attributed_to_phases_that_ran_alone(cleanup, monkeypatch):
+    rss = itertools.count(10 * MB, MB)
+    monkeypatch.setattr(cleanup, "current_rss", lambda: next(rss))
+    monitor = cleanup.MemoryMonitor()
+    monitor.max_bytes = 100 * MB
+
+    with monitor.phase("alone"):
+        pass
+    inside, release = threading.Event(), threading.Event()
+
+    def neighbour():
+        with monitor.phase("neighbour"):
+            inside.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=neighbour)
+    thread.start()
+    inside.wait(5)
+    with monitor.phase("concurrent"):
+        release.set()
+    thread.join()
+
+    phases = monitor.report()["phases"]
+    assert phases["alone"]["overlapped"] == [] and phases["alone"]["growth_mb"] > 0
+    assert phases["concurrent"]["overlapped"] == ["neighbour"] and phases["concurrent"]["growth_mb"] is None
+    assert phases["neighbour"]["overlapped"] == ["concurrent"] and phases["neighbour"]["growth_mb"] is None
+
+
+def test_partitions_cover_every_grouped_row_once(cleanup, tmp_path, monkeypatch):
+    write_snapshot(tmp_path / "snap.sqlite", {"artists": _artists()})
+    # Memory climbs with every sample, so passes keep splitting up to the cap
+    rss = itertools.count(0, MB // 4)
+    monkeypatch.setattr(cleanup, "current_rss", lambda: next(rss))
+    monkeypatch.setattr(cleanup, "MAX_PARTITIONS", 8)
+    cleanup.MEMORY.max_bytes = 10 * MB
+
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        partitions = [[dict(r) for r in rows] for rows in
+                      cleanup.fetch_partitions(client, "artists", "id, name", cleanup._artist_key, page_size=10)]
+
+    assert len(partitions) > 1
+    assert cleanup.MEMORY.passes["artists"] > len(partitions)   # abandoned passes were re-streamed
+    ids = [r["id"] for rows in partitions for r in rows]
+    expected = [a["id"] for a in _artists() if cleanup._artist_key(a)]
+    assert sorted(ids) == sorted(expected)
+    # Rows sharing a key always land in the same partition
+    owner = {}
+    for n, rows in enumerate(partitions):
+        for r in rows:
+            assert owner.setdefault(cleanup._artist_key(r), n) == n
+
+
+def test_partitioned_plans_match_a_single_pass(cleanup, tmp_path, monkeypatch):
+    write_snapshot(tmp_path / "snap.sqlite", {"artists": _artists()})
+    args = (cleanup._artist_key, cleanup._artist_score, ("name",))
+
+    def plans():
+        with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+            parts = cleanup.fetch_partitions(client, "artists", "id, name", cleanup._artist_key, page_size=10)
+            return sorted((key, [r["id"] for r in rows]) for key, rows in cleanup.plan_merges(parts, *args))
+
+    single = plans()
+    rss = itertools.count(0, MB // 4)
+    monkeypatch.setattr(cleanup, "current_rss", lambda: next(rss))
+    cleanup.MEMORY.max_bytes = 10 * MB
+    assert plans() == single and len(single) == 98
@@ -0,0 +1,74 @@
+"""plan_merges: sharded across a process pool, the plans match the in-process ones."""
+
+import random
+
+import pytest
+
+from compact_rows import CompactTable
+
+
+@pytest.fixture
+def cleanup():
+    try:
+        # The repo's supabase/ directory would satisfy a plain `import supabase`
+        from supabase import create_client  # noqa: F401
+    except ImportError:
+        pytest.skip("supabase-py not installed")
+    import daily_db_cleanup
+    yield daily_db_cleanup
+    daily_db_cleanup.stop_shard_pool()
+
+
+def _artists() -> CompactTable:
+    """600 artists over 150 spellings of 50 names, score ties included; some names normalize to ''."""
+    rng = random.Random(37)
+    names = [f"Artist {i}" for i in range(50)]
+    spellings = [name for base in names for name in (base, base.upper(), f"{base}!")] + ["!!!", "???"]
+    table = CompactTable("id, name, sets_count, tracks_count, verified, spotify_url")
+    table.extend({"id": f"a{i:04d}", "name": rng.choice(spellings), "sets_count": rng.choice([0, 1, 2, None]),
+                  "tracks_count": rng.randint(0, 3), "verified": rng.random() < 0.05,
+                  "spotify_url": rng.choice([None, "", "sp"])} for i in range(600))
+    return table
+
+
+def _tracks() -> CompactTable:
+    rng = random.Random(38)
+    table = CompactTable("id, title, title_normalized, artist_name, verified, enriched_at, spotify_url, "
+                         "bpm, label, beatport_url, times_played")
+    table.extend({"id": f"t{i:04d}", "title": title, "title_normalized": rng.choice([None, title.lower()]),
+                  "artist_name": rng.choice(["Prunk", "PRUNK", "Chris Stussy"]), "verified": False,
+                  "enriched_at": rng.choice([None, "2026-10-01"]), "spotify_url": None,
+                  "bpm": rng.choice([None, 124]), "label": None, "beatport_url": None,
+                  "times_played": rng.randint(0, 2)}
+                 for i, title in enumerate(rng.choice(["Desire", "Over", "Rise", "Lone", "Café"])
+                                           for _ in range(400)))
+    return table
+
+
+def _plans(cleanup, rows, key_fn, score_fn, columns) -> list:
+    return [(key, [r["id"] for r in group])
+            for key, group in cleanup.plan_merges([rows], key_fn, score_fn, columns)]
+
+
+@pytest.mark.parametrize("table,key,score,columns", [
+    (_artists, "_artist_key", "_artist_score", "ARTIST_PLAN_COLUMNS"),
+    (_tracks, "_track_key", "_track_score", "TRACK_PLAN_COLUMNS"),
+])
+def test_sharded_plans_match_in_process(cleanup, monkeypatch, table, key, score, columns):
+    rows = table()
+    args = (getattr(cleanup, key), getattr(cleanup, score), getattr(cleanup, columns))
+    in_process = _plans(cleanup, rows, *args)
+    assert len(in_process) >= 8
+
+    cleanup.start_shard_pool(2)
+    submitted = []
+    submit = cleanup._shard_pool.submit
+    monkeypatch.setattr(cleanup._shard_pool, "submit", lambda *a, **kw: submitted.append(a[0]) or submit(*a, **kw))
+
+    # Below SHARD_MIN_ROWS the pool isn't used
+    assert _plans(cleanup, rows, *args) == in_process
+    assert submitted == []
+
+    monkeypatch.setattr(cleanup, "SHARD_MIN_ROWS", 100)
+    assert _plans(cleanup, rows, *args) == in_process
+    assert submitted.count(cleanup._rank_shard) == 2 and cleanup._key_chunk in submitted
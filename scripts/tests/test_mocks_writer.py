@@ -0,0 +1,77 @@
+"""mocks_writer.py: sharded set library, and the string-aware mockSetLists scanner."""
+
+from conftest import PROJECT_ROOT
+from mocks_writer import (append_sets, ensure_wired, find_array_span, read_shard, set_records,
+                          shard_numbers)
+
+TRACKS_TS = """import { Track, SetList } from '@/types';
+
+export const mockTracks: Track[] = [];
+
+export const mockSetLists: SetList[] = [
+  // a comment with a ] bracket
+  {
+    id: '1',
+    name: "Live [at] Fabric ]]",
+    notes: `template ] ${'x'}`,
+    venue: 'Club \\' ]',
+    tracks: [{ id: 't1' }],
+    /* block ] */
+  },
+];
+
+export const mockUsers = [];
+"""
+
+
+def _set(i, tracks=1):
+    return {"title": f"Set {i}", "artist": "Luke Dean", "venue": None, "date": None,
+            "url": f"https://www.1001tracklists.com/tracklist/{i}/set.html", "thumbnail": None,
+            "tracks": [{"title": f"T{j}", "artist": "A", "timestamp": "1:05"} for j in range(tracks)]}
+
+
+def test_array_span_skips_strings_and_comments():
+    start, end = find_array_span(TRACKS_TS, "mockSetLists")
+    assert TRACKS_TS[start] == "[" and TRACKS_TS[end:end + 3] == "];\n"
+    assert TRACKS_TS[end + 3:].strip().startswith("export const mockUsers")
+    assert find_array_span(TRACKS_TS, "missing") is None
+
+
+def test_wiring_tracks_ts_is_idempotent(tmp_path):
+    path = tmp_path / "tracks.ts"
+    path.write_text(TRACKS_TS)
+    assert ensure_wired(path)
+    source = path.read_text()
+    assert source.splitlines()[1] == "import { scrapedSetLists } from './scraped';"
+    assert "export const mockSetLists: SetList[] = [\n  ...scrapedSetLists,\n  // a comment" in source
+    assert not ensure_wired(path)
+    assert path.read_text() == source
+
+
+def test_the_app_library_is_wired():
+    source = (PROJECT_ROOT / "mocks" / "tracks.ts").read_text()
+    start, _ = find_array_span(source, "mockSetLists")
+    assert source[start:].startswith("[\n  ...scrapedSetLists,")
+
+
+def test_appends_fill_the_last_shard_then_start_new_ones(tmp_path):
+    records = set_records([_set(i) for i in range(3)] + [_set(9, tracks=0)], "luke-dean")
+    assert len(records) == 3
+    assert records[0]["tracks"][0]["timestamp"] == 65 and "venue" not in records[0]
+
+    written = append_sets(records, tmp_path, shard_sets=2)
+    assert [p.name for p in written] == ["sets-0000.ts", "sets-0001.ts"]
+    index = (tmp_path / "index.ts").read_text()
+    assert "import shard0001 from './sets-0001';" in index and "[...shard0000, ...shard0001]" in index
+
+    more = set_records([_set(3), _set(4)], "luke-dean")
+    index_mtime = (tmp_path / "index.ts").stat().st_mtime_ns
+    written = append_sets(more[:1], tmp_path, shard_sets=2)
+    assert [p.name for p in written] == ["sets-0001.ts"]                 # only the last shard is rewritten
+    assert (tmp_path / "index.ts").stat().st_mtime_ns == index_mtime      # and the index is left alone
+
+    append_sets(more[1:], tmp_path, shard_sets=2)
+    assert shard_numbers(tmp_path) == [0, 1, 2]
+    names = [r["name"] for n in shard_numbers(tmp_path) for r in read_shard(tmp_path / f"sets-{n:04d}.ts")]
+    assert names == ["Set 0", "Set 1", "Set 2", "Set 3", "Set 4"]
+    assert not list(tmp_path.glob(".*.tmp"))
@@ -0,0 +1,77 @@
+"""Orphaned set_tracks: the streaming anti-join against sets and tracks."""
+
+import tracemalloc
+
+import pytest
+
+from cleanup_snapshot import open_snapshot, write_snapshot
+
+OLD = "2025-01-01T00:00:00+00:00"
+SINCE = "2026-10-01T00:00:00+00:00"
+
+
+@pytest.fixture
+def cleanup():
+    try:
+        # The repo's supabase/ directory would satisfy a plain `import supabase`
+        from supabase import create_client  # noqa: F401
+    except ImportError:
+        pytest.skip("supabase-py not installed")
+    import daily_db_cleanup
+    return daily_db_cleanup
+
+
+def _tables():
+    """st2's set and st3's track were deleted long after the set_tracks were created."""
+    def set_track(i, set_id, track_id):
+        return {"id": f"st{i}", "set_id": set_id, "track_id": track_id, "position": i,
+                "created_at": OLD, "updated_at": OLD}
+
+    return {
+        "sets": [{"id": "s1", "name": "Live", "updated_at": OLD}],
+        "tracks": [{"id": "t1", "title": "Desire", "updated_at": OLD}],
+        "set_tracks": [set_track(1, "s1", "t1"), set_track(2, "s9", "t1"), set_track(3, "s1", "t9"),
+                       set_track(4, "s1", None)],
+    }
+
+
+@pytest.mark.parametrize("since", [None, SINCE])
+def test_old_orphans_are_found_on_every_run(cleanup, tmp_path, since):
+    write_snapshot(tmp_path / "snap.sqlite", _tables())
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        stats = cleanup.clean_orphaned_set_tracks(client, since=since)
+        rows = client.table("set_tracks").select("id, track_id").order("id").execute().data
+
+    assert stats["orphans_cleaned"] == 2
+    assert rows == [{"id": "st1", "track_id": "t1"}, {"id": "st3", "track_id": None},
+                    {"id": "st4", "track_id": None}]
+
+
+def test_dry_run_only_counts(cleanup, tmp_path):
+    write_snapshot(tmp_path / "snap.sqlite", _tables())
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        stats = cleanup.clean_orphaned_set_tracks(client, dry_run=True, since=SINCE)
+        rows = client.table("set_tracks").select("id").execute().data
+
+    assert stats["orphans_cleaned"] == 2
+    assert len(rows) == 4
+
+
+def test_peak_is_counted_per_scan_and_leaves_tracing_alone(cleanup, tmp_path):
+    tables = _tables()
+    tables["set_tracks"] = [{"id": f"st{i:04d}", "set_id": "s1" if i % 3 else f"gone{i}", "track_id": "t1",
+                             "position": i, "created_at": OLD} for i in range(500)]
+    write_snapshot(tmp_path / "snap.sqlite", tables)
+
+    tracemalloc.start()
+    try:
+        with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+            stats = cleanup.clean_orphaned_set_tracks(client, page_size=50)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+    assert stats["orphans_cleaned"] == 167
+    # One page of set_tracks and one of ids, plus at most one batch of fixes
+    assert 50 < stats["orphan_scan_peak_rows"] <= 2 * 50 + cleanup.IN_CHUNK_SIZE
+    assert stats["orphan_scan_peak_mb"] > 0
@@ -0,0 +1,162 @@
+"""scrape_1001_python.py: --serve worker, --http service, batch NDJSON mode and the artist crawl."""
+
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import pytest
+
+pytest.importorskip("tracklists")
+import scrape_1001_python as scraper  # noqa: E402
+from tracklist_cache import ScrapeService  # noqa: E402
+
+
+def _serve(lines, handler, workers=4) -> list:
+    out = io.StringIO()
+    scraper.serve(io.StringIO("".join(line + "\n" for line in lines)), out, workers=workers, handler=handler)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_results_are_written_as_they_complete():
+    slow_started = threading.Event()
+    fast_done = threading.Event()
+
+    def handler(line):
+        request = json.loads(line)
+        if request["id"] == "slow":
+            slow_started.set()
+            fast_done.wait(5)
+        else:
+            slow_started.wait(5)
+            fast_done.set()
+        return {"id": request["id"], "success": True}
+
+    results = _serve(['{"id": "slow"}', '{"id": "fast"}'], handler)
+    assert [r["id"] for r in results] == ["fast", "slow"]
+
+
+def test_bad_requests_get_an_error_line(monkeypatch):
+    monkeypatch.setattr(scraper, "scrape_url", lambda url: {"success": True, "url": url})
+    results = _serve(["not json", "", '{"id": 7}', '{"id": "a", "url": "https://x/tracklist/1/"}'],
+                     scraper.handle_request, workers=1)
+    assert results == [
+        {"id": None, "success": False, "error": "Invalid request: Expecting value: line 1 column 1 (char 0)"},
+        {"id": 7, "success": False, "error": "Request needs a url"},
+        {"id": "a", "success": True, "url": "https://x/tracklist/1/"},
+    ]
+
+
+def test_batch_streams_results_with_bounded_parallelism():
+    lock = threading.Lock()
+    in_flight = peak = 0
+
+    def scrape(url):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        if url.endswith("bad"):
+            return {"success": False, "error": "boom", "url": url}
+        return {"success": True, "url": url, "tracks": [{"title": "t"}] * 2}
+
+    urls = [f"https://x/tracklist/{i}/" for i in range(10)] + ["https://x/tracklist/0/", "https://x/bad"]
+    out = io.StringIO()
+    stats = scraper.run_batch(iter(urls), workers=3, out=out, scrape=scrape)
+
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert peak <= 3
+    assert len(lines) == 12 and lines[-1] == {"stats": stats}
+    assert ", " not in out.getvalue().splitlines()[0]      # compact NDJSON
+    assert {k: v for k, v in stats.items() if k != "elapsed_seconds"} == {
+        "total": 11, "succeeded": 10, "failed": 1, "duplicates": 1, "tracks": 20}
+
+
+def test_url_files_skip_comments_and_blank_lines():
+    stream = io.StringIO("# sets\n\n https://x/tracklist/1/ \n#https://x/tracklist/2/\nhttps://x/tracklist/3/\n")
+    assert list(scraper.read_url_lines(stream)) == ["https://x/tracklist/1/", "https://x/tracklist/3/"]
+
+
+def _site(pages):
+    bs4 = pytest.importorskip("bs4")
+    fetched = []
+
+    def get_soup(url):
+        fetched.append(url)
+        if url not in pages:
+            raise Exception("404")
+        return bs4.BeautifulSoup(pages[url], "html.parser")
+    return get_soup, fetched
+
+
+def _listing(sets, pages):
+    links = [f'<a href="/tracklist/{s}/set-{s}.html">Set</a>' for s in sets]
+    links += [f'<a href="/dj/lukedean/index{n}.html">{n}</a>' for n in pages]
+    return "".join(links)
+
+
+def test_artist_crawl_follows_every_listing_page():
+    base = scraper.BASE_URL
+    get_soup, fetched = _site({
+        scraper.DJ_SEARCH_URL.format(query="Luke+Dean"):
+            '<a href="/dj/lukedeanfan/index.html">x</a><a href="/dj/lukedean/index.html">Luke Dean</a>',
+        f"{base}/dj/lukedean/index.html": _listing(["a1", "a2"], [2, 3]),
+        f"{base}/dj/lukedean/index2.html": _listing(["a2", "a3"], [1, 3]),
+        f"{base}/dj/lukedean/index3.html": _listing(["a4"], [1, 2]),
+    })
+    urls = list(scraper.iter_artist_set_urls("Luke Dean", get_soup=get_soup))
+    assert urls == [f"{base}/tracklist/{s}/set-{s}.html" for s in ["a1", "a2", "a3", "a4"]]
+    assert fetched[-1] == f"{base}/dj/lukedean/index3.html"
+
+
+def test_artist_crawl_stops_at_max_sets_without_fetching_further_pages():
+    base = scraper.BASE_URL
+    get_soup, fetched = _site({
+        f"{base}/dj/lukedean/index.html": _listing(["a1", "a2"], [2]),
+        f"{base}/dj/lukedean/index2.html": _listing(["a3", "a4"], []),
+    })
+    urls = list(scraper.iter_artist_set_urls(f"{base}/dj/lukedean/index.html", max_sets=2, get_soup=get_soup))
+    assert len(urls) == 2
+    assert fetched == [f"{base}/dj/lukedean/index.html"]
+
+
+def test_http_service_coalesces_and_caches_by_tracklist_id():
+    calls = []
+
+    def scrape(url):
+        calls.append(url)
+        time.sleep(0.2)
+        return {"success": True, "url": url, "tracks": []}
+
+    server = scraper.make_http_server(ScrapeService(scrape), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def get(path):
+        try:
+            with urllib.request.urlopen(base + path, timeout=5) as response:
+                return response.status, response.headers.get("X-Cache"), json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, None, json.loads(e.read())
+
+    def scrape_path(slug):
+        return "/scrape?url=" + quote(f"https://www.1001tracklists.com/tracklist/2abc9/{slug}.html")
+
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            first = list(pool.map(get, [scrape_path("a"), scrape_path("b"), scrape_path("a"), scrape_path("c")]))
+        assert len(calls) == 1
+        assert sorted(cache for _, cache, _ in first) == ["coalesced"] * 3 + ["miss"]
+        assert get(scrape_path("d"))[:2] == (200, "hit")
+        assert get("/stats")[2] == {"hits": 1, "misses": 1, "coalesced": 3, "entries": 1}
+        assert get("/scrape?url=https://x/dj/y/")[0] == 400
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,50 @@
+"""scrape_1001_python.py cold start: --help and usage errors skip the heavy imports."""
+
+import subprocess
+import sys
+
+from conftest import SCRIPTS_DIR
+
+SCRIPT = SCRIPTS_DIR / "scrape_1001_python.py"
+
+# Modules only a scrape or export needs
+HEAVY_MODULES = {"tracklists", "bs4", "requests", "pyarrow", "numpy", "concurrent.futures"}
+# The script's own imports, after interpreter startup (measured ~7ms)
+IMPORT_BUDGET_MS = 40
+
+
+def import_profile(*args):
+    """
+    Run the script under -X importtime. Returns (exit code, modules imported
+    after interpreter startup, their cumulative import time in ms).
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", str(SCRIPT), *args],
+                          capture_output=True, text=True, timeout=60)
+    lines = [line for line in proc.stderr.splitlines() if line.startswith("import time:")]
+    startup_end = next(i for i, line in enumerate(lines) if line.rstrip().endswith("| site"))
+    modules, total_us = set(), 0
+    for line in lines[startup_end + 1:]:
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):      # top level: cumulative covers its children
+            total_us += int(cumulative)
+    return proc.returncode, modules, total_us / 1000
+
+
+def test_help_skips_heavy_imports():
+    code, modules, _ = import_profile("--help")
+    assert code == 0
+    assert not HEAVY_MODULES & modules
+
+
+def test_usage_error_skips_heavy_imports():
+    code, modules, _ = import_profile("--workers", "many")
+    assert code == 2
+    assert not HEAVY_MODULES & modules
+
+
+def test_import_time_budget(record_property):
+    import_ms = min(import_profile("--help")[2] for _ in range(3))
+    record_property("cold_start_import_ms", import_ms)
+    print(f"cold start imports: {import_ms:.1f} ms")
+    assert import_ms < IMPORT_BUDGET_MS
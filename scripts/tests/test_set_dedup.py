@@ -0,0 +1,89 @@
+"""Set dedup: union-find clustering of external_id and name matches."""
+
+import pytest
+
+from cleanup_snapshot import open_snapshot, write_snapshot
+
+OLD = "2025-01-01T00:00:00+00:00"
+NEW = "2026-10-10T00:00:00+00:00"
+SINCE = "2026-10-01T00:00:00+00:00"
+
+
+@pytest.fixture
+def cleanup():
+    try:
+        # The repo's supabase/ directory would satisfy a plain `import supabase`
+        from supabase import create_client  # noqa: F401
+    except ImportError:
+        pytest.skip("supabase-py not installed")
+    import daily_db_cleanup
+    daily_db_cleanup.COUNT_DELTAS.clear()
+    yield daily_db_cleanup
+    daily_db_cleanup.COUNT_DELTAS.clear()
+
+
+def _set(cleanup, id, name, external_id, tracks, created=OLD, updated=OLD):
+    return {"id": id, "name": name, "name_normalized": cleanup.normalize_text(name), "artist_id": "a1",
+            "artist_name": "Chris Stussy", "external_id": external_id, "tracks_count": tracks,
+            "created_at": created, "updated_at": updated}
+
+
+def _tables(cleanup, changed: str = None):
+    """s1~s2 by external_id, s2~s3 by name, s3~s4 by external_id; s5 stands alone."""
+    def dj_set(id, name, external_id, tracks, created=OLD):
+        return _set(cleanup, id, name, external_id, tracks, created, NEW if id == changed else OLD)
+
+    return {
+        "sets": [
+            dj_set("s1", "Boiler Room London", "x1", 12, created="2025-03-01T00:00:00+00:00"),
+            dj_set("s2", "Live at Hi Ibiza", "x1", 20, created="2025-02-01T00:00:00+00:00"),
+            dj_set("s3", "LIVE at Hi  Ibiza!", "x3", 20, created="2025-02-01T00:00:00+00:00"),
+            dj_set("s4", "Hi Ibiza closing", "x3", 5),
+            dj_set("s5", "Lot Radio", "x5", 30),
+        ],
+        "set_tracks": [{"id": f"st{i}", "set_id": f"s{i}", "track_id": None, "position": 1,
+                        "created_at": OLD} for i in range(1, 6)],
+    }
+
+
+def test_union_find_merges_transitively():
+    from daily_db_cleanup import UnionFind
+    uf = UnionFind()
+    uf.union_all(["a", "b"])
+    uf.union_all(["c", "d", "e"])
+    uf.union_all(["b", "c"])
+    uf.find("lonely")
+    assert sorted(sorted(c) for c in uf.components()) == [["a", "b", "c", "d", "e"]]
+    assert uf.find("a") == uf.find("e") != uf.find("lonely")
+
+
+@pytest.mark.parametrize("since,changed", [(None, None), (SINCE, "s4")])
+def test_chained_duplicates_form_one_cluster_with_a_deterministic_keeper(cleanup, tmp_path, since, changed):
+    write_snapshot(tmp_path / "snap.sqlite", _tables(cleanup, changed))
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        stats = cleanup.dedup_sets(client, since=since)
+        sets = [s["id"] for s in client.table("sets").select("id").order("id").execute().data]
+        set_tracks = [st["set_id"] for st in client.table("set_tracks").select("set_id").order("id").execute().data]
+
+    # s2 and s3 tie on tracks and age; the lower id is kept
+    assert stats == {"duplicates_found": 3, "sets_merged": 3}
+    assert sets == ["s2", "s5"]
+    assert set_tracks == ["s2", "s5"]
+    assert {r["artist_id"]: r["sets_delta"] for r in cleanup.COUNT_DELTAS.rows()} == {"a1": -3}
+
+
+def test_keeper_does_not_depend_on_row_order(cleanup, tmp_path):
+    tables = _tables(cleanup)
+    tables["sets"].reverse()
+    write_snapshot(tmp_path / "snap.sqlite", tables)
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        cleanup.dedup_sets(client)
+        assert [s["id"] for s in client.table("sets").select("id").order("id").execute().data] == ["s2", "s5"]
+
+
+def test_dry_run_only_counts(cleanup, tmp_path):
+    write_snapshot(tmp_path / "snap.sqlite", _tables(cleanup))
+    with open_snapshot(tmp_path / "snap.sqlite", tmp_path / "plan.jsonl") as client:
+        stats = cleanup.dedup_sets(client, dry_run=True)
+        assert len(client.table("sets").select("id").execute().data) == 5
+    assert stats == {"duplicates_found": 3, "sets_merged": 0}
@@ -0,0 +1,320 @@
+"""
+The set-based SQL engine (migration 029) against the Python phases.
+
+Needs a throwaway local Postgres; every test runs in its own schema:
+    CLEANUP_TEST_DATABASE_URL=postgresql://postgres@localhost/postgres \\
+        python -m pytest scripts/tests/test_sql_dedup_engine.py
+
+The Python phases run against a SQLite snapshot of the same fixture
+(cleanup_snapshot.SnapshotClient), so both engines start from identical rows.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+DATABASE_URL = os.environ.get("CLEANUP_TEST_DATABASE_URL")
+if not DATABASE_URL:
+    pytest.skip("CLEANUP_TEST_DATABASE_URL not set", allow_module_level=True)
+psycopg2 = pytest.importorskip("psycopg2")
+try:
+    # The repo's supabase/ directory would satisfy a plain `import supabase`
+    from supabase import create_client  # noqa: F401
+except ImportError:
+    pytest.skip("supabase-py not installed", allow_module_level=True)
+
+from conftest import PROJECT_ROOT  # noqa: E402
+
+import daily_db_cleanup  # noqa: E402
+from cleanup_snapshot import open_snapshot, write_snapshot  # noqa: E402
+
+MIGRATIONS = PROJECT_ROOT / "supabase" / "migrations"
+# 002_enrichment_columns.sql also indexes columns from the other 002 schema;
+# only its tracks.enriched_at and tracks.artwork_url matter here
+SCHEMA_SQL = (
+    (MIGRATIONS / "001_initial_schema.sql").read_text(),
+    "ALTER TABLE tracks ADD COLUMN IF NOT EXISTS enriched_at TIMESTAMPTZ;",
+    "ALTER TABLE tracks ADD COLUMN IF NOT EXISTS artwork_url TEXT;",
+    (MIGRATIONS / "029_cleanup_set_based_dedup.sql").read_text(),
+    (MIGRATIONS / "030_artist_count_deltas.sql").read_text(),
+)
+
+PHASES = (
+    ("artist_dedup", daily_db_cleanup.dedup_artists),
+    ("track_dedup", daily_db_cleanup.dedup_tracks),
+    ("set_dedup", daily_db_cleanup.dedup_sets),
+    ("counts", daily_db_cleanup.update_counts),
+)
+
+COMPARED = {
+    "artists": ("id", "name", "slug", "tracks_count", "sets_count", "verified", "spotify_url"),
+    "artist_aliases": ("artist_id", "alias", "alias_lower"),
+    "tracks": ("id", "title", "artist_id", "artist_name", "label", "bpm", "key", "spotify_url",
+               "beatport_url", "soundcloud_url", "youtube_url", "release_year", "isrc", "artwork_url",
+               "duration_seconds", "times_played"),
+    "track_aliases": ("track_id", "title_alias", "title_alias_normalized"),
+    "sets": ("id", "name", "artist_id", "artist_name", "external_id", "tracks_count"),
+    "set_tracks": ("id", "set_id", "track_id", "raw_artist", "position"),
+}
+
+
+def _id(prefix: int, n: int) -> str:
+    # Ordered like the rows are inserted, so Python's stable ties match SQL's id tie-break
+    return str(uuid.UUID(int=(prefix << 64) | n))
+
+
+def _fixture() -> dict:
+    a = [_id(1, i) for i in range(10)]
+    t = [_id(2, i) for i in range(14)]
+    s = [_id(3, i) for i in range(8)]
+    ts = "2026-10-01T00:00:00+00:00"
+
+    def artist(i, name, slug, sets=0, tracks=0, verified=False, spotify=None):
+        return {"id": a[i], "name": name, "slug": slug, "sets_count": sets, "tracks_count": tracks,
+                "verified": verified, "spotify_url": spotify, "updated_at": ts}
+
+    def track(i, title, artist_i, artist_name, norm=None, **extra):
+        row = {"id": t[i], "title": title, "title_normalized": norm or title.lower(), "artist_id": a[artist_i],
+               "artist_name": artist_name, "times_played": 0, "verified": False, "updated_at": ts}
+        row.update(extra)
+        return row
+
+    def dj_set(i, name, artist_i, artist_name, external_id=None, tracks_count=0, created_at=ts):
+        return {"id": s[i], "name": name, "artist_id": a[artist_i], "artist_name": artist_name,
+                "external_id": external_id, "tracks_count": tracks_count, "created_at": created_at,
+                "updated_at": ts}
+
+    return {
+        "artists": [
+            artist(0, "Chris Stussy", "chris-stussy", sets=2),
+            artist(1, "CHRIS STUSSY!", "chris-stussy-2", sets=5),
+            artist(2, "chris stussy", "chris-stussy-3", verified=True),
+            artist(3, "Sonny Fodera", "sonny-fodera", spotify="https://open.spotify.com/artist/x"),
+            artist(4, "Sonny  Fodera", "sonny-fodera-2"),
+            artist(5, "Âme", "ame"),
+            artist(6, "me", "me"),
+            artist(7, "!!!", "exclamation"),
+            artist(8, "???", "question"),
+            artist(9, "Prunk", "prunk", tracks=3),
+        ],
+        "artist_aliases": [
+            {"id": _id(4, 0), "artist_id": a[1], "alias": "Stussy", "alias_lower": "stussy"},
+        ],
+        "tracks": [
+            track(0, "Desire", 0, "Chris Stussy", times_played=3),
+            track(1, "Desire", 1, "CHRIS STUSSY!", times_played=2, label="Locus", bpm=126, key="",
+                  release_year=0, isrc="GBX1", duration_seconds=0),
+            track(2, "desire!", 2, "chris stussy", norm="desire", times_played=1, spotify_url="sp:1",
+                  beatport_url="bp:1", key="8A", youtube_url="yt:2", release_year=2023),
+            track(3, "Desire (Dub)", 0, "Chris Stussy", norm="desire dub", duration_seconds=412),
+            track(4, "Over", 3, "Sonny Fodera", label=None, soundcloud_url="sc:4"),
+            track(5, "Over", 4, "Sonny  Fodera", label="Solotoko", times_played=4, artwork_url="art:5",
+                  duration_seconds=300),
+            track(6, "Over", 3, "Sonny Fodera", label="Defected", soundcloud_url="sc:6", artwork_url="art:6",
+                  isrc="", youtube_url="yt:6"),
+            track(7, "Untitled", 9, "Prunk", norm=" "),
+            track(8, "Untitled", 9, "Prunk", norm=" "),
+            track(9, "Rise", 5, "Âme"),
+            track(10, "Rise", 6, "me", verified=True),
+            track(11, "Lone", 9, "Prunk"),
+            # title_normalized as the app writes it, accent dropped
+            track(12, "Café", 9, "Prunk", norm="caf"),
+            track(13, "Caf", 9, "Prunk"),
+        ],
+        "track_aliases": [
+            {"id": _id(5, 0), "track_id": t[5], "title_alias": "Over (Edit)", "title_alias_normalized": "over edit"},
+        ],
+        "sets": [
+            dj_set(0, "Live at Printworks", 0, "Chris Stussy", external_id="ext-1", tracks_count=2),
+            dj_set(1, "Live @ Printworks", 1, "CHRIS STUSSY!", tracks_count=2, created_at="2026-09-01T00:00:00+00:00"),
+            dj_set(2, "Boiler Room", 2, "chris stussy", external_id="ext-1", tracks_count=1),
+            dj_set(3, "Boiler Room", 2, "Chris Stussy", external_id="ext-9"),
+            dj_set(4, "Essential Mix", 3, "Sonny Fodera", external_id="ext-4", tracks_count=1),
+            dj_set(5, "Essential Mix", 9, "Prunk", external_id="ext-5"),
+            dj_set(6, "", 9, "Prunk", external_id=""),
+            dj_set(7, "", 9, "Prunk", external_id=""),
+        ],
+        "set_tracks": [
+            {"id": _id(6, i), "set_id": s[set_i], "track_id": t[track_i], "raw_artist": raw, "position": pos,
+             "created_at": ts}
+            for i, (set_i, track_i, raw, pos) in enumerate([
+                (0, 0, "Chris Stussy", 1), (0, 4, "Sonny Fodera", 2), (1, 1, "CHRIS STUSSY!", 1),
+                (1, 5, "Sonny  Fodera", 2), (2, 2, "chris stussy", 1), (4, 9, "me", 1), (5, 10, None, 1),
+            ])
+        ],
+    }
+
+
+@pytest.fixture
+def pg():
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    cur = conn.cursor()
+    schema = f"cleanup_test_{uuid.uuid4().hex[:12]}"
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute(f"SET search_path = {schema}, public")
+    try:
+        for sql in SCHEMA_SQL:
+            cur.execute(sql)
+        yield cur
+    finally:
+        cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.close()
+
+
+def _load(cur, tables: dict):
+    for table, rows in tables.items():
+        for row in rows:
+            cols = list(row)
+            cur.execute(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})",
+                        [row[c] for c in cols])
+
+
+def _pg_state(cur) -> dict:
+    state = {}
+    for table, cols in COMPARED.items():
+        cur.execute(f"SELECT {', '.join(cols)} FROM {table}")
+        state[table] = sorted((tuple(str(v) if isinstance(v, uuid.UUID) else v for v in row)
+                               for row in cur.fetchall()), key=repr)
+    return state
+
+
+def _python_run(tmp_path, tables: dict) -> tuple:
+    snapshot = tmp_path / "fixture.sqlite"
+    write_snapshot(snapshot, tables)
+    stats = {}
+    with open_snapshot(snapshot, tmp_path / "plan.jsonl") as client:
+        for name, func in PHASES:
+            stats[name] = func(client, dry_run=False, since=None)
+        state = {}
+        for table, cols in COMPARED.items():
+            rows = client.table(table).select(", ".join(cols)).execute().data
+            state[table] = sorted((tuple(r[c] for c in cols) for r in rows), key=repr)
+    return stats, state
+
+
+def test_sql_engine_matches_python_phases(pg, tmp_path):
+    tables = _fixture()
+    python_stats, python_state = _python_run(tmp_path, tables)
+
+    _load(pg, tables)
+    sql_stats = {}
+    for name, _ in PHASES:
+        pg.execute(f"SELECT {daily_db_cleanup.SQL_ENGINE_FUNCTIONS[name]}(false)")
+        sql_stats[name] = pg.fetchone()[0]
+
+    # Only the Python recount reports drift; the fixture's counts start out wrong
+    assert python_stats["counts"].pop("drift") == python_stats["counts"]["counts_updated"]
+    assert sql_stats == python_stats
+    assert _pg_state(pg) == python_state
+    # Chris Stussy x3, Sonny Fodera x2; Âme and me stay apart
+    assert python_stats["artist_dedup"]["artists_merged"] == 3
+    # Desire x3, Over x3; titles normalizing to "" and lossy app keys are never grouped
+    assert python_stats["track_dedup"]["tracks_merged"] == 4
+    # ext-1 links set 0 to set 2, whose name + artist links set 3
+    assert python_stats["set_dedup"]["sets_merged"] == 2
+    cols = COMPARED["tracks"]
+    desire = dict(zip(cols, next(r for r in python_state["tracks"] if r[1] == "desire!")))
+    assert desire["times_played"] == 6   # plays summed over all duplicates
+    # Blanks filled from the best-ranked duplicate that has a value; "" and 0 count as blank
+    assert (desire["label"], desire["isrc"], desire["key"], desire["duration_seconds"]) == ("Locus", "GBX1", "8A", None)
+    over = dict(zip(cols, next(r for r in python_state["tracks"] if r[1] == "Over")))
+    assert (over["soundcloud_url"], over["youtube_url"], over["artwork_url"]) == ("sc:6", "yt:6", "art:5")
+
+
+def test_sql_engine_dry_run_changes_nothing(pg):
+    tables = _fixture()
+    _load(pg, tables)
+    before = _pg_state(pg)
+    for name, _ in PHASES:
+        pg.execute(f"SELECT {daily_db_cleanup.SQL_ENGINE_FUNCTIONS[name]}(true)")
+    assert _pg_state(pg) == before
+
+
+@pytest.mark.parametrize("case", [
+    "Chris Stussy", "  CHRIS   stussy!! ", "Âme", "Tiësto", "Röyksopp", "日本の夜", "A B", "a_b-c", "﻿X Y", "",
+])
+def test_match_key_matches_normalize_text(pg, case):
+    pg.execute("SELECT cleanup_match_key(%s)", (case,))
+    assert pg.fetchone()[0] == daily_db_cleanup.normalize_text(case)
+
+
+def test_count_deltas_apply_in_one_batch(pg):
+    tables = _fixture()
+    _load(pg, tables)
+    a = [r["id"] for r in tables["artists"]]
+    pg.execute("INSERT INTO artist_count_deltas (artist_id, tracks_delta, sets_delta, source) VALUES "
+                "(%s, 2, 1, 'house_sync'), (%s, -1, 0, 'house_sync'), (%s, 1, 0, 'house_sync'), "
+                "(%s, 0, 1, 'house_sync')", (a[0], a[0], a[9], str(uuid.uuid4())))
+    extra = json.dumps([{"artist_id": a[9], "tracks_delta": -1, "sets_delta": 0},
+                        {"artist_id": a[3], "tracks_delta": 0, "sets_delta": -1}])
+
+    pg.execute("SELECT apply_artist_count_deltas(%s, true)", (extra,))
+    assert pg.fetchone()[0] == {"counts_updated": 2, "deltas_applied": 6}
+    pg.execute("SELECT count(*) FROM artist_count_deltas")
+    assert pg.fetchone()[0] == 4
+
+    pg.execute("SELECT apply_artist_count_deltas(%s)", (extra,))
+    # a9's +1/-1 cancel out; the unknown artist's delta is dropped
+    assert pg.fetchone()[0] == {"counts_updated": 2, "deltas_applied": 6}
+    pg.execute("SELECT id, tracks_count, sets_count FROM artists WHERE id IN %s", ((a[0], a[3], a[9]),))
+    assert {str(r[0]): r[1:] for r in pg.fetchall()} == {a[0]: (1, 3), a[3]: (0, 0), a[9]: (3, 0)}
+    pg.execute("SELECT count(*) FROM artist_count_deltas")
+    assert pg.fetchone()[0] == 0
+
+
+def test_recount_and_journal_clear_share_a_snapshot(pg):
+    tables = _fixture()
+    _load(pg, tables)
+    prunk = tables["artists"][9]["id"]
+    pg.execute("SELECT cleanup_update_counts(false)")
+    pg.execute("SELECT tracks_count FROM artists WHERE id = %s", (prunk,))
+    before = pg.fetchone()[0]
+    pg.execute("INSERT INTO artist_count_deltas (artist_id, source) VALUES (%s, 'test')", (prunk,))
+    pg.execute("SELECT current_schema()")
+    schema = pg.fetchone()[0]
+
+    def connect():
+        conn = psycopg2.connect(DATABASE_URL)
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute(f"SET search_path = {schema}, public")
+        return conn, cur
+
+    # Hold the journal row so the recount's clear waits on it
+    locker, lock_cur = connect()
+    lock_cur.execute("BEGIN")
+    lock_cur.execute("SELECT id FROM artist_count_deltas FOR UPDATE")
+    recount, recount_cur = connect()
+    thread = threading.Thread(target=recount_cur.execute, args=("SELECT cleanup_update_counts(false)",))
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            pg.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+            if pg.fetchone()[0] or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+
+        # A writer commits a track, then journals it, while the recount waits
+        pg.execute("INSERT INTO tracks (id, title, title_normalized, artist_id, artist_name) "
+                   "VALUES (%s, 'Late', 'late', %s, 'Prunk')", (str(uuid.uuid4()), prunk))
+        pg.execute("INSERT INTO artist_count_deltas (artist_id, tracks_delta, source) "
+                   "VALUES (%s, 1, 'house_sync')", (prunk,))
+        lock_cur.execute("COMMIT")
+        thread.join(10)
+    finally:
+        locker.close()
+        recount.close()
+
+    # The recount didn't count the track, so the surviving delta is applied once
+    pg.execute("SELECT count(*) FROM artist_count_deltas WHERE tracks_delta = 1")
+    assert pg.fetchone()[0] == 1
+    pg.execute("SELECT apply_artist_count_deltas()")
+    pg.execute("SELECT tracks_count, (SELECT count(*) FROM tracks WHERE artist_id = %s) FROM artists WHERE id = %s",
+               (prunk, prunk))
+    assert pg.fetchone() == (before + 1, before + 1)
@@ -0,0 +1,133 @@
+"""The bit-parallel edit distance and its NumPy batch path against a plain DP."""
+
+import random
+from functools import lru_cache
+
+import pytest
+
+import string_similarity as ss
+
+EDGE_CASES = [
+    "", "a", "ab", "ba", "aaaa", "abcabc",
+    "x" * 64, "x" * 63 + "y", "y" + "x" * 64, "ab" * 40,     # around and past the 64-bit lane
+    "âme", "ame", "röyksopp", "royksopp", "kölsch", "日本の夜", "日本の朝", "café del mar", "😀 emoji",
+    "a\0b",
+]
+
+
+@lru_cache(maxsize=None)
+def dp_distance(a: str, b: str) -> int:
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def dp_similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return 1 - dp_distance(a, b) / max(len(a), len(b))
+
+
+def _random_strings(rng, n: int, alphabet: str = "abcd é日", max_len: int = 90) -> list:
+    return ["".join(rng.choice(alphabet) for _ in range(rng.choice([0, 1, 3, 8, 20, 63, 64, 65, max_len])))
+            for _ in range(n)]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def batch_path(request, monkeypatch):
+    if request.param == "numpy":
+        if ss.np is None:
+            pytest.skip("numpy not installed")
+    else:
+        monkeypatch.setattr(ss, "np", None)
+    return request.param
+
+
+def test_edit_distance_matches_dp():
+    rng = random.Random(1)
+    strings = EDGE_CASES + _random_strings(rng, 30)
+    for a in strings:
+        for b in strings:
+            assert ss.edit_distance(a, b) == dp_distance(a, b), (a, b)
+            assert ss.similarity(a, b) == pytest.approx(dp_similarity(a, b)), (a, b)
+
+
+def test_distance_limit_only_cuts_off_above_it():
+    rng = random.Random(2)
+    strings = EDGE_CASES + _random_strings(rng, 60)
+    for _ in range(3000):
+        a, b = rng.choice(strings), rng.choice(strings)
+        limit = rng.randint(0, 12)
+        exact = dp_distance(a, b)
+        assert ss.edit_distance(a, b, limit) == (exact if exact <= limit else limit + 1), (a, b, limit)
+
+
+def test_threshold_keeps_every_score_at_or_above_it():
+    rng = random.Random(3)
+    strings = EDGE_CASES + _random_strings(rng, 30, alphabet="ab")
+    for a in strings:
+        for b in strings:
+            expected = dp_similarity(a, b)
+            got = ss.similarity(a, b, threshold=0.8)
+            if expected >= 0.8:
+                assert got == pytest.approx(expected), (a, b)
+            else:
+                assert got == 0.0 or got == pytest.approx(expected), (a, b)
+
+
+def test_batch_matches_dp(batch_path):
+    rng = random.Random(4)
+    candidates = EDGE_CASES + _random_strings(rng, 100)
+    queries = [q for q in EDGE_CASES if "\0" not in q] + _random_strings(rng, 8)
+    for query in queries:
+        scores = ss.similarities(query, candidates)
+        assert scores == pytest.approx([dp_similarity(query, c) for c in candidates]), query
+
+
+def test_batch_with_threshold(batch_path):
+    rng = random.Random(5)
+    base = "".join(rng.choice("abcde") for _ in range(30))
+    candidates = [base]
+    for _ in range(200):
+        c = list(base)
+        for _ in range(rng.randint(0, 6)):
+            c[rng.randrange(len(c))] = rng.choice("abcdeé")
+        candidates.append("".join(c))
+    for query, score in zip(candidates, ss.similarities(base, candidates, threshold=0.9)):
+        expected = dp_similarity(base, query)
+        if expected >= 0.9:
+            assert score == pytest.approx(expected)
+        else:
+            assert score == 0.0     # cut off once it couldn't reach the threshold
+
+
+def test_batch_chunks_and_small_batches(batch_path, monkeypatch):
+    monkeypatch.setattr(ss, "NUMPY_CHUNK_SIZE", 7)
+    rng = random.Random(6)
+    candidates = _random_strings(rng, 50, max_len=30)
+    for n in (0, 1, ss.NUMPY_MIN_BATCH - 1, ss.NUMPY_MIN_BATCH, 50):
+        scores = ss.similarities("abcd", candidates[:n])
+        assert scores == pytest.approx([dp_similarity("abcd", c) for c in candidates[:n]])
+
+
+def test_levenshtein_similarity_normalizes_first():
+    try:
+        # The repo's supabase/ directory would satisfy a plain `import supabase`
+        from supabase import create_client  # noqa: F401
+    except ImportError:
+        pytest.skip("supabase-py not installed")
+    from daily_db_cleanup import levenshtein_similarity, normalize_text
+
+    rng = random.Random(7)
+    strings = EDGE_CASES + ["Chris Stussy", "CHRIS  STUSSY!", "Chris Stussey", "Âme", "Röyksopp"]
+    strings += _random_strings(rng, 30, alphabet="aB ,.é")
+    for a in strings:
+        for b in strings:
+            expected = dp_similarity(normalize_text(a), normalize_text(b))
+            assert levenshtein_similarity(a, b) == pytest.approx(expected), (a, b)
@@ -0,0 +1,84 @@
+import json
+import re
+
+import pytest
+
+from conftest import PROJECT_ROOT
+import text_normalization as tn
+
+GOLDEN = json.loads((PROJECT_ROOT / "__tests__" / "fixtures" / "normalization-golden.json")
+                    .read_text(encoding="utf-8"))["cases"]
+
+
+def script_slug(ts_slug: str) -> str:
+    """The scripts' slug: generateSlug() plus underscore/hyphen-run cleanup."""
+    return re.sub(r"-+", "-", ts_slug.replace("_", "-")).strip("-")
+
+
+# JS and Python disagree on whether these are whitespace (U+FEFF is in JS,
+# U+001C and U+0085 are in Python)
+WHITESPACE_DIFFERENCES = {
+    "byte\ufefforder mark": "byteorder mark",
+    "file\x1cseparator": "file separator",
+    "next\x85line": "next line",
+}
+# The app's ASCII-only \w drops non-ASCII letters; the scripts keep them
+LOSSY = [c for c in GOLDEN if tn.is_lossy_key(c["input"], c["normalized"])]
+PARITY = [c for c in GOLDEN if c not in LOSSY and c["input"] not in WHITESPACE_DIFFERENCES]
+
+
+def _ids(cases):
+    return [ascii(c["input"]) for c in cases]
+
+
+@pytest.mark.parametrize("case", PARITY, ids=_ids(PARITY))
+def test_normalize_text_matches_app(case):
+    assert tn.normalize_text(case["input"]) == case["normalized"]
+
+
+@pytest.mark.parametrize("case", PARITY, ids=_ids(PARITY))
+def test_generate_slug_matches_app(case):
+    assert tn.generate_slug(case["input"]) == script_slug(case["slug"])
+
+
+@pytest.mark.parametrize("case", LOSSY, ids=_ids(LOSSY))
+def test_app_keys_that_lost_letters_are_flagged(case):
+    assert tn.is_lossy_key(case["input"], case["normalized"])
+    assert not tn.normalize_text(case["input"]).isascii()
+    assert not tn.is_lossy_key(case["input"], tn.normalize_text(case["input"]))
+
+
+def test_unicode_letters_are_kept():
+    assert len(LOSSY) > 20
+    assert tn.normalize_text("Âme & Dixon") == "âme dixon"
+    assert tn.normalize_text("Röyksopp") != tn.normalize_text("Ryksopp")
+    assert tn.generate_slug("Sebastián Léger") == "sebastián-léger"
+    assert not tn.is_lossy_key("Ryksopp", "ryksopp")
+    assert not tn.is_lossy_key("Röyksopp", " röyksopp ")
+    assert tn.is_lossy_key("Röyksopp", None)
+
+
+def test_whitespace_differences():
+    for text, expected in WHITESPACE_DIFFERENCES.items():
+        assert tn.normalize_text(text) == expected
+        assert text in {c["input"] for c in GOLDEN}
+
+
+def test_normalize_batch_matches_single_calls():
+    inputs = [c["input"] for c in GOLDEN] * 2 + [None, ""]
+    assert tn.normalize_batch(inputs) == [tn.normalize_text(t) for t in inputs]
+
+
+def test_empty_values():
+    assert tn.normalize_text(None) == ""
+    assert tn.generate_slug(None) == ""
+    assert tn.normalize_batch([]) == []
+
+
+def test_repeated_values_hit_the_cache():
+    tn.clear_caches()
+    for _ in range(3):
+        tn.normalize_text("Chris Stussy")
+    info = tn.cache_info()["normalize_text"]
+    assert info["misses"] == 1
+    assert info["hits"] == 2
@@ -0,0 +1,156 @@
+"""tracklist_cache.py: TTL/LRU result cache, request coalescing and the parsed-tracklist store."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import tracklist_cache
+from tracklist_cache import ResultCache, ScrapeService, SingleFlight, TracklistStore, load_tracklist, tracklist_key
+
+
+def test_urls_for_one_tracklist_share_a_key():
+    urls = ["https://www.1001tracklists.com/tracklist/2abc9/chris-stussy-fabric.html",
+            "https://www.1001tracklists.com/tracklist/2abc9/other-slug.html?x=1",
+            "https://1001.tl/tracklist/2abc9#top"]
+    assert {tracklist_key(url) for url in urls} == {"2abc9"}
+    assert tracklist_key("https://x/dj/y/") == "https://x/dj/y/"
+
+
+def test_entries_expire_and_least_recently_used_is_evicted():
+    now = [0.0]
+    cache = ResultCache(ttl=10, max_entries=2, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1          # a is now the most recent
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    now[0] = 10
+    assert cache.get("a") is None and len(cache) == 1
+
+
+def test_concurrent_calls_share_one_flight():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, "k", fetch)
+        started.wait(5)
+        followers = [pool.submit(flight.do, "k", fetch) for _ in range(3)]
+        time.sleep(0.1)                 # let the followers join the flight
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert results[0] == ("result", False)
+    assert results[1:] == [("result", True)] * 3
+
+
+def test_failed_flight_raises_for_every_caller_and_is_not_kept():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("k", lambda: 2) == (2, False)
+
+
+def test_service_caches_successes_only():
+    results = iter([{"success": False, "error": "403"}, {"success": True, "title": "Set"}])
+    calls = []
+
+    def scrape(url):
+        calls.append(url)
+        return next(results)
+
+    service = ScrapeService(scrape)
+    url = "https://www.1001tracklists.com/tracklist/2abc9/set.html"
+    assert service.fetch(url)[1] == "miss"
+    assert service.fetch(url) == ({"success": True, "title": "Set"}, "miss")
+    assert service.fetch(url.replace("set.html", "renamed.html"))[1] == "hit"
+    assert len(calls) == 2
+    assert service.stats() == {"hits": 1, "misses": 2, "coalesced": 0, "entries": 1}
+
+
+class _Label:
+    def __str__(self):
+        return "Pivot Records"
+
+
+class _Track:
+    def __init__(self, title):
+        self.title, self.artist, self.full_artist, self.time = title, "Chris Stussy", "Chris Stussy", "1:05"
+        self.labels = [_Label()]
+
+
+class _Tracklist:
+    parsed = []
+
+    def __init__(self, url, tracks=2):
+        _Tracklist.parsed.append(url)
+        self.title = "Boiler Room"
+        self.DJs = ["Chris Stussy"]
+        self.sources = {"Club": "Fabric"}
+        self.cues = ["0:00", "1:05"][:tracks]
+        self.tracks = [_Track(f"T{i}") for i in range(tracks)]
+
+
+URL = "https://www.1001tracklists.com/tracklist/2abc9/boiler-room.html"
+
+
+def test_store_round_trips_what_callers_read(tmp_path):
+    store = TracklistStore(str(tmp_path / "parsed.sqlite"), ttl=60)
+    store.put(URL, _Tracklist(URL))
+    tl = store.get(URL.replace("boiler-room", "renamed"))
+
+    assert (tl.title, tl.DJs, tl.sources, tl.cues) == ("Boiler Room", ["Chris Stussy"], {"Club": "Fabric"},
+                                                      ["0:00", "1:05"])
+    assert [(t.title, t.time, t.labels) for t in tl.tracks] == [("T0", "1:05", ["Pivot Records"]),
+                                                               ("T1", "1:05", ["Pivot Records"])]
+    assert not hasattr(tl, "date_recorded") and not hasattr(tl.tracks[0], "genre")
+
+
+def test_store_expires_and_drops_least_recently_read(tmp_path):
+    now = [0.0]
+    store = TracklistStore(str(tmp_path / "parsed.sqlite"), ttl=60, clock=lambda: now[0])
+    urls = [URL.replace("2abc9", str(i)) for i in range(3)]
+    store.put(urls[0], _Tracklist(urls[0]))
+    store.max_bytes = 2 * store._conn().execute("SELECT size FROM parsed_tracklists").fetchone()[0]
+
+    now[0] = 1
+    store.put(urls[1], _Tracklist(urls[1]))
+    now[0] = 2
+    assert store.get(urls[0]) is not None       # read: urls[1] is now the least recently read
+    now[0] = 3
+    store.put(urls[2], _Tracklist(urls[2]))
+    assert [store.get(url) is not None for url in urls] == [True, False, True]
+
+    now[0] = 61
+    assert store.get(urls[0]) is None and store.get(urls[2]) is not None
+
+
+def test_load_reads_through_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracklist_cache, "_store", TracklistStore(str(tmp_path / "parsed.sqlite"), ttl=60))
+    monkeypatch.setattr(tracklist_cache, "_store_configured", True)
+    _Tracklist.parsed = []
+
+    first = load_tracklist(URL, _Tracklist)
+    again = load_tracklist(URL.replace("boiler-room", "other"), _Tracklist)
+    assert isinstance(first, _Tracklist) and again.title == first.title
+    assert _Tracklist.parsed == [URL]
+
+    empty = URL.replace("2abc9", "empty")
+    load_tracklist(empty, lambda url: _Tracklist(url, tracks=0))
+    load_tracklist(empty, lambda url: _Tracklist(url, tracks=0))
+    assert _Tracklist.parsed == [URL, empty, empty]
+
+    monkeypatch.setattr(tracklist_cache, "_store", None)
+    load_tracklist(URL, _Tracklist)
+    assert len(_Tracklist.parsed) == 4
@@ -0,0 +1,62 @@
+"""tracklist_export.py: set_track rows, CSV append and columnar dataset parts."""
+
+import csv
+
+import pytest
+
+from tracklist_export import COLUMNS, cue_seconds, open_export, set_track_rows
+
+
+def _result(set_id, tracks=2):
+    return {
+        "success": True, "title": f"Set {set_id}", "artist": "Chris Stussy",
+        "url": f"https://www.1001tracklists.com/tracklist/{set_id}/chris-stussy.html",
+        "tracks": [{"title": f"T{i}", "artist": "A", "timestamp": f"{i}:05", "label": "PIV" if i else None}
+                   for i in range(tracks)],
+    }
+
+
+def test_one_row_per_track_with_cue_seconds():
+    rows = list(set_track_rows(_result("2abc9", tracks=2)))
+    assert [list(row) for row in rows] == [COLUMNS, COLUMNS]
+    assert rows[1] == {"tracklist_id": "2abc9", "set_url": _result("2abc9")["url"], "set_title": "Set 2abc9",
+                       "set_artist": "Chris Stussy", "position": 2, "cue_seconds": 65, "artist": "A",
+                       "title": "T1", "label": "PIV"}
+    assert list(set_track_rows({"success": False, "url": "x"})) == []
+    assert [cue_seconds(t) for t in ["1:02:03", "45", "", None, "?"]] == [3723, 45, None, None, None]
+
+
+def test_csv_append_writes_the_header_once(tmp_path):
+    path = tmp_path / "sets.csv"
+    for run, append in [("s1", False), ("s2", True)]:
+        export = open_export("csv", str(path), append=append)
+        assert export.write(_result(run)) == 2
+        export.close()
+
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["tracklist_id"], r["position"]) for r in rows] == [("s1", "1"), ("s1", "2"), ("s2", "1"), ("s2", "2")]
+    assert rows[0]["label"] == ""
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_columnar_runs_add_part_files(tmp_path, fmt):
+    ds = pytest.importorskip("pyarrow.dataset")
+    out = tmp_path / "sets"
+
+    export = open_export(fmt, str(out))
+    export.batch_rows = 3
+    for set_id in ["s1", "s2"]:
+        export.write(_result(set_id))
+    export.close()
+    with pytest.raises(ValueError, match="--append"):
+        open_export(fmt, str(out))
+
+    export = open_export(fmt, str(out), append=True)
+    export.write(_result("s3", tracks=1))
+    export.close()
+
+    table = ds.dataset(str(out), format="ipc" if fmt == "arrow" else fmt).to_table()
+    assert table.column_names == COLUMNS
+    assert sorted(table.column("tracklist_id").to_pylist()) == ["s1", "s1", "s2", "s2", "s3"]
+    assert not list(out.glob("*.tmp"))
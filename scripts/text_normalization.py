@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Text normalization shared by the Python sync and cleanup scripts.
+
+normalize_text() produces the merge keys stored in title_normalized and
+compared during dedup: lowercase, drop everything but word characters and
+whitespace, collapse whitespace runs, trim. Word characters are Unicode, so
+'Âme' keeps its accent and doesn't collide with 'Me'. generate_slug() keeps
+hyphens too and turns whitespace and underscores into single hyphens.
+
+normalizeText() in lib/supabase/artistService.ts uses JavaScript's
+ASCII-only \\w, so keys the app writes for names with non-ASCII letters have
+lost them ('Âme' -> 'me'). is_lossy_key() spots such keys; the cleanup
+leaves those rows out of merges rather than match on them.
+
+Both functions are memoized: the cleanup phases normalize the same artist
+names and titles many times over per run. normalize_batch() normalizes a
+list in one call, computing each distinct value once.
+
+The app's outputs are kept in __tests__/fixtures/normalization-golden.json
+(regenerate with node scripts/generate-normalization-golden.mjs):
+    python -m pytest scripts/tests
+    bun test __tests__/normalization.test.ts
+"""
+
+import re
+from functools import lru_cache
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+_NON_SLUG = re.compile(r"[^\w\s-]+")
+_SLUG_SEPARATORS = re.compile(r"[\s_]+")
+_HYPHENS = re.compile(r"-{2,}")
+
+NORMALIZE_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize(text: str) -> str:
+    text = _NON_WORD.sub("", text.lower().strip())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _slug(name: str) -> str:
+    slug = _NON_SLUG.sub("", name.lower().strip())
+    slug = _SLUG_SEPARATORS.sub("-", slug)
+    return _HYPHENS.sub("-", slug).strip("-")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for matching - mirrors lib/supabase/artistService.ts"""
+    if not text:
+        return ""
+    return _normalize(text)
+
+
+def generate_slug(name: str) -> str:
+    """Generate a URL-friendly slug from a name."""
+    if not name:
+        return ""
+    return _slug(name)
+
+
+def normalize_batch(texts) -> list:
+    """normalize_text() over an iterable, computing each distinct value once."""
+    seen = {}
+    result = []
+    for text in texts:
+        if not text:
+            result.append("")
+            continue
+        key = seen.get(text)
+        if key is None:
+            key = seen[text] = _normalize(text)
+        result.append(key)
+    return result
+
+
+def is_lossy_key(text: str, key: str) -> bool:
+    """
+    True if `key` is missing non-ASCII characters normalize_text(text) keeps,
+    as keys written by the app's normalizeText() are.
+    """
+    expected = normalize_text(text)
+    return not expected.isascii() and (key or "").strip() != expected
+
+
+def cache_info() -> dict:
+    """Hit/miss counters for the memoized functions."""
+    return {"normalize_text": _normalize.cache_info()._asdict(),
+            "generate_slug": _slug.cache_info()._asdict()}
+
+
+def clear_caches():
+    _normalize.cache_clear()
+    _slug.cache_clear()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Shared results for repeated tracklist scrapes.
+
+The same tracklist is often asked for several times within minutes (a
+resident worker, a batch run and a manual import overlapping). Results are
+keyed by the tracklist id from /tracklist/<id>/, so URL variants (slug,
+query string, trailing fragment) share one entry:
+
+- ResultCache: parsed results kept for a TTL, least recently used evicted
+  beyond max_entries
+- SingleFlight: concurrent calls for the same key run the fetch once; the
+  callers that arrive while it is in flight wait for and share its result
+
+ScrapeService combines the two in front of a scrape function, so a
+tracklist is fetched from 1001tracklists at most once per TTL however many
+callers ask for it.
+
+Across processes and runs, TracklistStore keeps the parsed Tracklist itself
+(title, DJs, date_recorded, sources, cues, and each track's title, artist,
+labels, ...) in a SQLite file, by tracklist id, for STORE_TTL seconds and up
+to STORE_MAX_BYTES, least recently read dropped first. load_tracklist() reads
+through it, so the sync, scrape_1001_python.py, add-sets-from-urls.py and
+add-luke-dean-with-api.py share one parse of a tracklist instead of each
+constructing Tracklist(url). TRACKLIST_CACHE_DB moves the file and
+TRACKLIST_CACHE_TTL sets the TTL (0 turns the store off).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+DEFAULT_TTL = 3600          # seconds a parsed tracklist is served from the cache
+DEFAULT_MAX_ENTRIES = 1000
+
+STORE_TTL = 6 * 3600
+STORE_MAX_BYTES = 64 * 1024 * 1024     # compressed
+STORE_PATH = os.path.join(tempfile.gettempdir(), "parsed_tracklists.sqlite")
+BUSY_TIMEOUT = 30
+
+# What callers read from Tracklist and its Track objects; absent attributes stay absent
+TRACKLIST_FIELDS = ("title", "artist", "DJs", "date_recorded", "sources", "cues", "venue", "date", "image_url")
+TRACK_FIELDS = ("title", "artist", "full_title", "full_artist", "time", "labels", "genre")
+
+
+def tracklist_key(url):
+    """The tracklist id of a /tracklist/<id>/ URL, else the URL itself."""
+    match = re.search(r'/tracklist/([^/?#]+)', url or '')
+    return match.group(1) if match else url
+
+
+class ResultCache:
+    """TTL + LRU cache of scrape results, safe to share between threads."""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()   # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers for that key share its result."""
+
+    def __init__(self):
+        self._calls = {}                # key -> [done event, result, exception]
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Returns (result, shared): shared is True for callers that waited on another's call."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1], True
+
+        try:
+            call[1] = fn()
+        except BaseException as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+        return call[1], False
+
+
+class ScrapeService:
+    """A scrape function behind the result cache and request coalescing."""
+
+    def __init__(self, scrape, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self._scrape = scrape
+        self.cache = ResultCache(ttl, max_entries)
+        self._flight = SingleFlight()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, outcome):
+        with self._stats_lock:
+            self._stats[outcome] += 1
+
+    def fetch(self, url):
+        """Returns (result, source), source being 'hit', 'miss' or 'coalesced'."""
+        key = tracklist_key(url)
+        result = self.cache.get(key)
+        if result is not None:
+            self._count("hits")
+            return result, "hit"
+
+        def scrape():
+            result = self.cache.get(key)     # a flight that just finished may have filled it
+            if result is not None:
+                return result
+            result = self._scrape(url)
+            if result.get("success"):    # failures are retried on the next request
+                self.cache.put(key, result)
+            return result
+
+        result, shared = self._flight.do(key, scrape)
+        self._count("coalesced" if shared else "misses")
+        return result, "coalesced" if shared else "miss"
+
+    def scrape(self, url):
+        return self.fetch(url)[0]
+
+    def stats(self):
+        with self._stats_lock:
+            return {**self._stats, "entries": len(self.cache)}
+
+
+# ----------------------------------------------------------------------------
+# Parsed tracklists on disk
+# ----------------------------------------------------------------------------
+
+class ParsedRecord:
+    """Attribute access over a stored Tracklist or Track, like the library's objects."""
+
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+
+
+def _plain(value):
+    """Library values as JSON: lists and dicts kept, other objects (labels, dates) as strings."""
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def snapshot_tracklist(tracklist) -> dict:
+    """The fields of a parsed Tracklist that callers use, as plain data."""
+    data = {name: _plain(getattr(tracklist, name)) for name in TRACKLIST_FIELDS if hasattr(tracklist, name)}
+    data["tracks"] = [{name: _plain(getattr(track, name)) for name in TRACK_FIELDS if hasattr(track, name)}
+                      for track in getattr(tracklist, "tracks", None) or []]
+    return data
+
+
+def restore_tracklist(data) -> ParsedRecord:
+    return ParsedRecord({**data, "tracks": [ParsedRecord(track) for track in data.get("tracks", [])]})
+
+
+class TracklistStore:
+    """Parsed tracklists by id in SQLite, with a TTL and a size bound; shared between processes."""
+
+    def __init__(self, path=None, ttl=None, max_bytes=STORE_MAX_BYTES, clock=time.time):
+        self.path = path or os.environ.get("TRACKLIST_CACHE_DB") or STORE_PATH
+        self.ttl = float(os.environ.get("TRACKLIST_CACHE_TTL", STORE_TTL)) if ttl is None else ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS parsed_tracklists ("
+                         "key TEXT PRIMARY KEY, url TEXT NOT NULL, data BLOB NOT NULL, size INTEGER NOT NULL, "
+                         "stored_at REAL NOT NULL, read_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS parsed_tracklists_read_at ON parsed_tracklists (read_at)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url):
+        """The stored parse of `url`'s tracklist, or None if missing or older than the TTL."""
+        key, now = tracklist_key(url), self._clock()
+        conn = self._conn()
+        row = conn.execute("SELECT data FROM parsed_tracklists WHERE key = ? AND stored_at > ?",
+                           (key, now - self.ttl)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE parsed_tracklists SET read_at = ? WHERE key = ?", (now, key))
+        return restore_tracklist(json.loads(zlib.decompress(row[0])))
+
+    def put(self, url, tracklist):
+        """Store a parsed Tracklist, then drop expired entries and, over max_bytes, the least recently read."""
+        data = zlib.compress(json.dumps(snapshot_tracklist(tracklist), separators=(",", ":")).encode())
+        now = self._clock()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO parsed_tracklists (key, url, data, size, stored_at, read_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (tracklist_key(url), url, data, len(data), now, now))
+            conn.execute("DELETE FROM parsed_tracklists WHERE stored_at <= ?", (now - self.ttl,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM parsed_tracklists").fetchone()[0]
+            if total > self.max_bytes:
+                keep, drop = 0, []
+                for key, size in conn.execute("SELECT key, size FROM parsed_tracklists ORDER BY read_at DESC"):
+                    keep += size
+                    if keep > self.max_bytes:
+                        drop.append((key,))
+                conn.executemany("DELETE FROM parsed_tracklists WHERE key = ?", drop)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM parsed_tracklists").fetchone()[0]
+
+
+_store = None
+_store_configured = False
+_store_lock = threading.Lock()
+
+
+def use_store(store):
+    """Read tracklists through `store` (None: always parse afresh)."""
+    global _store, _store_configured
+    with _store_lock:
+        _store, _store_configured = store, True
+
+
+def get_store():
+    """The process's store, configured from the environment on first use; None when turned off."""
+    global _store, _store_configured
+    with _store_lock:
+        if not _store_configured:
+            store = TracklistStore()
+            _store, _store_configured = (store if store.ttl > 0 else None), True
+        return _store
+
+
+def load_tracklist(url, tracklist_class):
+    """
+    The parsed tracklist at `url`: from the store when a fresh parse is kept
+    there, else tracklist_class(url), stored for the next caller.
+    """
+    store = get_store()
+    if store is not None:
+        try:
+            cached = store.get(url)
+        except sqlite3.Error:
+            cached = None           # an unusable cache file never blocks a scrape
+        if cached is not None:
+            return cached
+    tracklist = tracklist_class(url)
+    # A parse with no tracks is often a blocked or half-rendered page; don't keep it
+    if store is not None and getattr(tracklist, "tracks", None):
+        try:
+            store.put(url, tracklist)
+        except sqlite3.Error:
+            pass
+    return tracklist
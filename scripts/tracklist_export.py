@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Bulk export of scraped tracklists, one row per set track.
+
+scrape_1001_python.py results are nested JSON (a set with its tracks). For
+analytics or a bulk load they are flattened to one row per set_track:
+
+    tracklist_id, set_url, set_title, set_artist, position, cue_seconds,
+    artist, title, label
+
+- csv: streamed as results arrive, to stdout or a file. Appending to an
+  existing file skips the header, so several batch runs build one file that
+  loads with a single `\\copy ... FROM 'sets.csv' CSV HEADER`.
+- parquet / arrow: columnar, written in record batches of BATCH_ROWS. The
+  output path is a dataset directory; each run adds one part file
+  (part-<time>-<random>.parquet or .arrow), written under a temporary name
+  and renamed when complete, so readers (pyarrow.dataset, DuckDB, Polars)
+  only ever see finished parts. Needs pyarrow, which is optional and is
+  imported only when a columnar export is opened.
+"""
+
+import csv
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+COLUMNS = ["tracklist_id", "set_url", "set_title", "set_artist", "position", "cue_seconds",
+           "artist", "title", "label"]
+FORMATS = ["json", "csv", "parquet", "arrow"]
+BATCH_ROWS = 10_000
+
+
+def tracklist_id(url):
+    """The id segment of a /tracklist/<id>/ URL, or None."""
+    match = re.search(r'/tracklist/([^/?#]+)', url or '')
+    return match.group(1) if match else None
+
+
+def cue_seconds(timestamp):
+    """'1:02:03' / '62:03' / '45' -> seconds; None for a missing or unreadable cue."""
+    if timestamp is None or timestamp == '':
+        return None
+    try:
+        seconds = 0
+        for part in str(timestamp).strip().split(':'):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def set_track_rows(result):
+    """One row per track of a successful scrape result (none for a failed one)."""
+    if not result.get('success'):
+        return
+    url = result.get('url')
+    for position, track in enumerate(result.get('tracks') or [], 1):
+        yield {
+            "tracklist_id": tracklist_id(url),
+            "set_url": url,
+            "set_title": result.get('title') or None,
+            "set_artist": result.get('artist') or None,
+            "position": position,
+            "cue_seconds": cue_seconds(track.get('timestamp')),
+            "artist": track.get('artist') or None,
+            "title": track.get('title') or None,
+            "label": track.get('label') or None,
+        }
+
+
+# ----------------------------------------------------------------------------
+# Writers
+# ----------------------------------------------------------------------------
+
+class CsvExport:
+    """Streams set_track rows as CSV; the header is written once per file."""
+
+    def __init__(self, stream, header=True, close_stream=False):
+        self._stream = stream
+        self._close_stream = close_stream
+        self._writer = csv.DictWriter(stream, fieldnames=COLUMNS, lineterminator='\n')
+        if header:
+            self._writer.writeheader()
+
+    def write(self, result) -> int:
+        rows = list(set_track_rows(result))
+        self._writer.writerows(rows)
+        self._stream.flush()
+        return len(rows)
+
+    def close(self):
+        if self._close_stream:
+            self._stream.close()
+
+
+class ColumnarExport:
+    """Buffers set_track rows into record batches for one Parquet or Arrow IPC part file."""
+
+    def __init__(self, directory, fmt, batch_rows=BATCH_ROWS):
+        try:
+            import pyarrow as pa
+        except ImportError:  # optional: only the columnar formats need it
+            raise RuntimeError(f"--format {fmt} needs pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self.schema = pa.schema([
+            ("tracklist_id", pa.string()), ("set_url", pa.string()), ("set_title", pa.string()),
+            ("set_artist", pa.string()), ("position", pa.int32()), ("cue_seconds", pa.int32()),
+            ("artist", pa.string()), ("title", pa.string()), ("label", pa.string()),
+        ])
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%dT%H%M%S')
+        self.path = self.directory / f"part-{stamp}-{os.urandom(4).hex()}.{fmt}"
+        self._tmp = self.path.with_name(self.path.name + '.tmp')
+        self._columns = {name: [] for name in COLUMNS}
+        self._buffered = 0
+        self._writer = None
+
+    def write(self, result) -> int:
+        written = 0
+        for row in set_track_rows(result):
+            for name in COLUMNS:
+                self._columns[name].append(row[name])
+            self._buffered += 1
+            written += 1
+            if self._buffered >= self.batch_rows:
+                self._flush()
+        return written
+
+    def _flush(self):
+        if not self._buffered:
+            return
+        pa = self._pa
+        batch = pa.record_batch([self._columns[name] for name in COLUMNS], schema=self.schema)
+        if self._writer is None:
+            if self.fmt == 'parquet':
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self._tmp, self.schema)
+            else:
+                self._writer = pa.ipc.new_file(self._tmp, self.schema)
+        self._writer.write_batch(batch)
+        self._columns = {name: [] for name in COLUMNS}
+        self._buffered = 0
+
+    def close(self):
+        """Finish the part file; a run that exported no rows leaves none."""
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._tmp, self.path)
+
+
+def open_export(fmt, output=None, append=False):
+    """
+    A writer for `fmt` ('csv', 'parquet' or 'arrow'). CSV goes to stdout
+    without `output`; columnar formats need an output directory and refuse
+    to add to one that already has parts unless `append` is set.
+    """
+    if fmt == 'csv':
+        if not output or output == '-':
+            return CsvExport(sys.stdout)
+        path = Path(output)
+        header = not (append and path.exists() and path.stat().st_size > 0)
+        stream = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        return CsvExport(stream, header=header, close_stream=True)
+
+    if not output:
+        raise ValueError(f"--format {fmt} needs --output DIR")
+    directory = Path(output)
+    if directory.exists() and not directory.is_dir():
+        raise ValueError(f"{output} is a file; --format {fmt} writes a dataset directory")
+    if not append and directory.is_dir() and any(directory.glob(f"part-*.{fmt}")):
+        raise ValueError(f"{output} already has {fmt} parts; pass --append to add to it")
+    return ColumnarExport(directory, fmt)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Pooled HTTP for 1001tracklists fetches.
+
+The tracklists library fetches each page with its own get_soup(): a bare
+requests.get(), which opens (and TLS-handshakes) a new connection per page.
+use_pooled_session() points the library at get_soup() here instead, which
+goes through one requests.Session whose keep-alive pool is shared by every
+thread of the process. A resident scraper (scrape_1001_python.py --serve)
+then pays for a connection once, not once per tracklist.
+
+set_min_interval() spaces request starts process-wide, so concurrent
+crawls stay within a politeness budget however many threads fetch. On top
+of that every fetch takes a token from the host-wide budget shared with all
+other processes (host_rate_limit.py).
+
+use_archive() keeps every fetched page in an html_archive.HtmlArchive
+(SCRAPE_ARCHIVE_DIR does the same for any entry point), and with
+replay=True serves pages from the archive instead of the network, so
+tracklists can be re-parsed offline after a parser fix (the parsed-tracklist
+store is bypassed while replaying, so every page really is parsed again).
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+
+import requests
+from bs4 import BeautifulSoup
+from fake_headers import Headers
+from requests.adapters import HTTPAdapter
+
+from host_rate_limit import acquire
+
+POOL_SIZE = 8               # keep-alive connections per host
+REQUEST_TIMEOUT = 30
+RETRIES = 3
+
+_session = None
+_session_lock = threading.Lock()
+
+_min_interval = 0.0
+_next_slot = 0.0
+_throttle_lock = threading.Lock()
+
+_archive = None
+_replay = False
+_archive_lock = threading.Lock()
+
+log = logging.getLogger("tracklist_http")
+
+
+def get_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    """The process-wide session, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def set_min_interval(seconds: float):
+    """Start at most one request per `seconds` across all threads (0 = no limit)."""
+    global _min_interval
+    _min_interval = max(0.0, seconds)
+
+
+def _wait_turn():
+    global _next_slot
+    with _throttle_lock:
+        now = time.monotonic()
+        slot = max(now, _next_slot)
+        _next_slot = slot + _min_interval
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def use_archive(directory: str, replay: bool = False):
+    """Record fetched pages into the archive at `directory`; with `replay`, read them from it instead."""
+    global _archive, _replay
+    from html_archive import HtmlArchive
+    with _archive_lock:
+        _archive = HtmlArchive(directory)
+        _replay = replay
+    if replay:
+        from tracklist_cache import use_store
+        use_store(None)
+
+
+def _get_archive():
+    global _archive
+    with _archive_lock:
+        if _archive is None and os.environ.get("SCRAPE_ARCHIVE_DIR"):
+            from html_archive import HtmlArchive
+            _archive = HtmlArchive(os.environ["SCRAPE_ARCHIVE_DIR"])
+        return _archive
+
+
+def get_soup(url: str, *_, **__) -> BeautifulSoup:
+    """Fetch a page through the pooled session and parse it, with retry."""
+    archive = _get_archive()
+    if _replay:
+        html = archive.latest(url)
+        if html is None:
+            raise LookupError(f"Not in the archive: {url}")
+        return BeautifulSoup(html, "html.parser")
+
+    for attempt in range(RETRIES):
+        try:
+            _wait_turn()
+            acquire(url)
+            response = get_session().get(url, headers=Headers().generate(), timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            soup = BeautifulSoup(response.text, "html.parser")
+            if soup.title and "Error 403" in soup.title.text:
+                raise Exception("403 - possibly rate limited or captcha")
+            break
+        except Exception as e:
+            log.warning(f"Attempt {attempt + 1} failed for {url}: {e}")
+            if attempt == RETRIES - 1:
+                raise
+    else:
+        raise Exception(f"Failed to fetch {url}")
+
+    # A full disk or broken archive must not cost a page already fetched
+    if archive is not None:
+        try:
+            archive.put(url, response.text)
+        except Exception as e:
+            log.error(f"Could not archive {url}: {e}")
+    return soup
+
+
+def use_pooled_session(pool_size: int = POOL_SIZE) -> int:
+    """
+    Route the tracklists library's page fetches through get_soup() here.
+    Returns the number of library modules patched (0 if the library fetches
+    some other way, in which case it keeps its own connections).
+    """
+    get_session(pool_size)
+    patched = 0
+    for name, module in list(sys.modules.items()):
+        if (name == "tracklists" or name.startswith("tracklists.")) and callable(getattr(module, "get_soup", None)):
+            if module.get_soup is not get_soup:
+                module.get_soup = get_soup
+            patched += 1
+    return patched
@@ -0,0 +1,34 @@
+-- Incremental cleanup support for scripts/daily_db_cleanup.py
+-- Safe, forward-only migration. No destructive changes.
+--
+-- The incremental mode fetches only rows changed since the last run, then
+-- looks up rows sharing their normalized key with indexed IN (...) queries.
+
+-- ============================================================
+-- NORMALIZED MATCH KEYS
+-- Mirrors normalize_text(): lowercase, strip non-word chars, collapse whitespace.
+-- Used only to find candidates; the script re-checks keys in Python.
+-- ============================================================
+
+ALTER TABLE artists ADD COLUMN IF NOT EXISTS name_normalized TEXT
+  GENERATED ALWAYS AS (
+    btrim(regexp_replace(regexp_replace(lower(name), '[^\w\s]', '', 'g'), '\s+', ' ', 'g'))
+  ) STORED;
+
+ALTER TABLE sets ADD COLUMN IF NOT EXISTS name_normalized TEXT
+  GENERATED ALWAYS AS (
+    btrim(regexp_replace(regexp_replace(lower(name), '[^\w\s]', '', 'g'), '\s+', ' ', 'g'))
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_artists_name_normalized ON artists(name_normalized);
+CREATE INDEX IF NOT EXISTS idx_sets_name_normalized ON sets(name_normalized);
+CREATE INDEX IF NOT EXISTS idx_sets_external_id ON sets(external_id);
+
+-- ============================================================
+-- CHANGE WATERMARK INDEXES
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_artists_updated_at ON artists(updated_at);
+CREATE INDEX IF NOT EXISTS idx_tracks_updated_at ON tracks(updated_at);
+CREATE INDEX IF NOT EXISTS idx_sets_updated_at ON sets(updated_at);
+CREATE INDEX IF NOT EXISTS idx_set_tracks_created_at ON set_tracks(created_at);
@@ -0,0 +1,10 @@
+-- Intentionally empty: keeps the migration sequence contiguous.
+--
+-- 028 used to recreate the generated artists/sets name_normalized columns
+-- with normalizeText()'s ASCII-only word class. That changed merge keys
+-- for names with non-ASCII letters ('Âme' became 'me' and merged with a
+-- different artist), so it was withdrawn before release. The keys keep the
+-- Unicode expression from 027; scripts/text_normalization.py is_lossy_key()
+-- handles the lossy keys the app writes instead.
+
+SELECT 1;
@@ -0,0 +1,366 @@
+-- Set-based dedup engine for scripts/daily_db_cleanup.py (--engine sql)
+-- Safe, forward-only migration. Only adds functions; nothing runs until called.
+--
+-- The same artist, track and set dedup and the count recalculation the
+-- Python phases do row by row, as a handful of set-based statements per
+-- phase: window functions rank each duplicate group and pick its canonical
+-- row, UPDATE ... FROM re-points every reference in one statement, and the
+-- duplicates are deleted with DELETE ... USING. Each function runs in one
+-- transaction and returns the same stats object as its Python phase.
+-- Merge results match the Python phases (scripts/tests/test_sql_dedup_engine.py).
+
+-- ============================================================
+-- MATCH KEYS
+-- Mirrors normalize_text() in scripts/text_normalization.py: lowercase, drop
+-- everything but word characters and whitespace, collapse whitespace runs to
+-- one space, trim. Same expression as the generated name_normalized columns
+-- (027).
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION cleanup_match_key(input TEXT)
+RETURNS TEXT AS $$
+  SELECT btrim(regexp_replace(regexp_replace(lower(COALESCE(input, '')), '[^\w\s]', '', 'g'), '\s+', ' ', 'g'));
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Python's str.strip(), used on stored title_normalized values
+CREATE OR REPLACE FUNCTION cleanup_strip(input TEXT)
+RETURNS TEXT AS $$
+  SELECT regexp_replace(COALESCE(input, ''),
+    '^[\t\n\v\f\r\u001c-\u001f \u0085\u00a0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+|[\t\n\v\f\r\u001c-\u001f \u0085\u00a0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+$',
+    '', 'g');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ============================================================
+-- 1. ARTIST DEDUP
+-- Group by match key of the name; the canonical artist is verified first,
+-- then has the most sets + tracks, then has Spotify (ties: lowest id).
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION cleanup_dedup_artists(dry_run BOOLEAN DEFAULT FALSE)
+RETURNS JSONB AS $$
+DECLARE
+  v_found INTEGER;
+  v_merged INTEGER;
+BEGIN
+  DROP TABLE IF EXISTS cleanup_artist_merges;
+  CREATE TEMP TABLE cleanup_artist_merges ON COMMIT DROP AS
+  SELECT dup_id, dup_name, merge_key, dup_rank, canonical_id, canonical_name
+  FROM (
+    SELECT
+      a.id AS dup_id,
+      a.name AS dup_name,
+      a.merge_key,
+      row_number() OVER w AS dup_rank,
+      first_value(a.id) OVER w AS canonical_id,
+      first_value(a.name) OVER w AS canonical_name
+    FROM (
+      SELECT
+        id, name,
+        cleanup_match_key(name) AS merge_key,
+        COALESCE(sets_count, 0) + COALESCE(tracks_count, 0)
+          + CASE WHEN verified THEN 10000 ELSE 0 END
+          + CASE WHEN COALESCE(spotify_url, '') <> '' THEN 100 ELSE 0 END AS score
+      FROM artists
+    ) a
+    WHERE a.merge_key <> ''
+    WINDOW w AS (PARTITION BY a.merge_key ORDER BY a.score DESC, a.id)
+  ) ranked
+  WHERE dup_rank > 1;
+
+  SELECT count(*) INTO v_found FROM cleanup_artist_merges;
+  IF dry_run OR v_found = 0 THEN
+    RETURN jsonb_build_object('duplicates_found', v_found, 'artists_merged', 0);
+  END IF;
+
+  UPDATE tracks t
+  SET artist_id = m.canonical_id, artist_name = m.canonical_name
+  FROM cleanup_artist_merges m
+  WHERE t.artist_id = m.dup_id;
+
+  UPDATE sets s
+  SET artist_id = m.canonical_id, artist_name = m.canonical_name
+  FROM cleanup_artist_merges m
+  WHERE s.artist_id = m.dup_id;
+
+  UPDATE set_tracks st
+  SET raw_artist = m.canonical_name
+  FROM cleanup_artist_merges m
+  WHERE st.raw_artist = m.dup_name AND m.dup_name <> m.canonical_name;
+
+  UPDATE artist_aliases al
+  SET artist_id = m.canonical_id
+  FROM cleanup_artist_merges m
+  WHERE al.artist_id = m.dup_id;
+
+  -- One alias per group: the best-ranked duplicate spelled differently
+  INSERT INTO artist_aliases (artist_id, alias, alias_lower)
+  SELECT DISTINCT ON (m.canonical_id) m.canonical_id, m.dup_name, m.merge_key
+  FROM cleanup_artist_merges m
+  WHERE m.dup_name <> m.canonical_name
+    AND NOT EXISTS (
+      SELECT 1 FROM artist_aliases al
+      WHERE al.artist_id = m.canonical_id AND al.alias_lower = m.merge_key
+    )
+  ORDER BY m.canonical_id, m.dup_rank
+  ON CONFLICT (alias_lower) DO NOTHING;
+
+  DELETE FROM artists a
+  USING cleanup_artist_merges m
+  WHERE a.id = m.dup_id;
+  GET DIAGNOSTICS v_merged = ROW_COUNT;
+
+  RETURN jsonb_build_object('duplicates_found', v_found, 'artists_merged', v_merged);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================
+-- 2. TRACK DEDUP
+-- Group by (normalized title, match key of the artist name); the canonical
+-- track is verified, then enriched, then has the most metadata and plays.
+-- Blank metadata on the canonical is filled from the best-ranked duplicate
+-- that has it, and plays are summed.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION cleanup_dedup_tracks(dry_run BOOLEAN DEFAULT FALSE)
+RETURNS JSONB AS $$
+DECLARE
+  v_found INTEGER;
+  v_merged INTEGER;
+BEGIN
+  DROP TABLE IF EXISTS cleanup_track_merges;
+  CREATE TEMP TABLE cleanup_track_merges ON COMMIT DROP AS
+  SELECT *
+  FROM (
+    SELECT
+      t.id AS dup_id,
+      t.title AS dup_title,
+      t.label, t.bpm, t.key, t.spotify_url, t.beatport_url, t.soundcloud_url, t.youtube_url,
+      t.release_year, t.isrc, t.artwork_url, t.duration_seconds, t.times_played,
+      row_number() OVER w AS dup_rank,
+      first_value(t.id) OVER w AS canonical_id,
+      first_value(t.title) OVER w AS canonical_title
+    FROM (
+      SELECT
+        tr.*,
+        cleanup_strip(COALESCE(NULLIF(tr.title_normalized, ''), cleanup_match_key(tr.title))) AS title_key,
+        cleanup_match_key(tr.artist_name) AS artist_key,
+        -- is_lossy_key(): a title_normalized the app wrote with the title's
+        -- accents dropped would match the wrong track, so it isn't merged
+        (COALESCE(tr.title_normalized, '') <> ''
+          AND cleanup_match_key(tr.title) ~ '[^\x01-\x7f]'
+          AND cleanup_strip(tr.title_normalized) <> cleanup_match_key(tr.title)) AS lossy_key,
+        CASE WHEN tr.verified THEN 10000 ELSE 0 END
+          + CASE WHEN tr.enriched_at IS NOT NULL THEN 1000 ELSE 0 END
+          + CASE WHEN COALESCE(tr.spotify_url, '') <> '' THEN 100 ELSE 0 END
+          + CASE WHEN COALESCE(tr.bpm, 0) <> 0 THEN 50 ELSE 0 END
+          + CASE WHEN COALESCE(tr.label, '') <> '' THEN 25 ELSE 0 END
+          + CASE WHEN COALESCE(tr.beatport_url, '') <> '' THEN 25 ELSE 0 END
+          + COALESCE(tr.times_played, 0) AS score
+      FROM tracks tr
+    ) t
+    WHERE t.title_key <> '' AND NOT t.lossy_key
+    WINDOW w AS (PARTITION BY t.title_key, t.artist_key ORDER BY t.score DESC, t.id)
+  ) ranked
+  WHERE dup_rank > 1;
+
+  SELECT count(*) INTO v_found FROM cleanup_track_merges;
+  IF dry_run OR v_found = 0 THEN
+    RETURN jsonb_build_object('duplicates_found', v_found, 'tracks_merged', 0);
+  END IF;
+
+  UPDATE set_tracks st
+  SET track_id = m.canonical_id
+  FROM cleanup_track_merges m
+  WHERE st.track_id = m.dup_id;
+
+  UPDATE track_aliases ta
+  SET track_id = m.canonical_id
+  FROM cleanup_track_merges m
+  WHERE ta.track_id = m.dup_id;
+
+  INSERT INTO track_aliases (track_id, title_alias, title_alias_normalized)
+  SELECT DISTINCT ON (m.canonical_id, cleanup_match_key(m.dup_title))
+    m.canonical_id, m.dup_title, cleanup_match_key(m.dup_title)
+  FROM cleanup_track_merges m
+  WHERE COALESCE(m.dup_title, '') <> ''
+    AND m.dup_title IS DISTINCT FROM m.canonical_title
+    AND NOT EXISTS (
+      SELECT 1 FROM track_aliases ta
+      WHERE ta.track_id = m.canonical_id
+        AND ta.title_alias_normalized = cleanup_match_key(m.dup_title)
+    )
+  ORDER BY m.canonical_id, cleanup_match_key(m.dup_title), m.dup_rank
+  ON CONFLICT DO NOTHING;
+
+  UPDATE tracks t
+  SET
+    label = CASE WHEN COALESCE(t.label, '') = '' THEN COALESCE(f.label, t.label) ELSE t.label END,
+    bpm = CASE WHEN COALESCE(t.bpm, 0) = 0 THEN COALESCE(f.bpm, t.bpm) ELSE t.bpm END,
+    key = CASE WHEN COALESCE(t.key, '') = '' THEN COALESCE(f.key, t.key) ELSE t.key END,
+    spotify_url = CASE WHEN COALESCE(t.spotify_url, '') = '' THEN COALESCE(f.spotify_url, t.spotify_url) ELSE t.spotify_url END,
+    beatport_url = CASE WHEN COALESCE(t.beatport_url, '') = '' THEN COALESCE(f.beatport_url, t.beatport_url) ELSE t.beatport_url END,
+    soundcloud_url = CASE WHEN COALESCE(t.soundcloud_url, '') = '' THEN COALESCE(f.soundcloud_url, t.soundcloud_url) ELSE t.soundcloud_url END,
+    youtube_url = CASE WHEN COALESCE(t.youtube_url, '') = '' THEN COALESCE(f.youtube_url, t.youtube_url) ELSE t.youtube_url END,
+    release_year = CASE WHEN COALESCE(t.release_year, 0) = 0 THEN COALESCE(f.release_year, t.release_year) ELSE t.release_year END,
+    isrc = CASE WHEN COALESCE(t.isrc, '') = '' THEN COALESCE(f.isrc, t.isrc) ELSE t.isrc END,
+    artwork_url = CASE WHEN COALESCE(t.artwork_url, '') = '' THEN COALESCE(f.artwork_url, t.artwork_url) ELSE t.artwork_url END,
+    duration_seconds = CASE WHEN COALESCE(t.duration_seconds, 0) = 0 THEN COALESCE(f.duration_seconds, t.duration_seconds) ELSE t.duration_seconds END,
+    times_played = COALESCE(t.times_played, 0) + f.plays
+  FROM (
+    SELECT
+      canonical_id,
+      (array_agg(label ORDER BY dup_rank) FILTER (WHERE COALESCE(label, '') <> ''))[1] AS label,
+      (array_agg(bpm ORDER BY dup_rank) FILTER (WHERE COALESCE(bpm, 0) <> 0))[1] AS bpm,
+      (array_agg(key ORDER BY dup_rank) FILTER (WHERE COALESCE(key, '') <> ''))[1] AS key,
+      (array_agg(spotify_url ORDER BY dup_rank) FILTER (WHERE COALESCE(spotify_url, '') <> ''))[1] AS spotify_url,
+      (array_agg(beatport_url ORDER BY dup_rank) FILTER (WHERE COALESCE(beatport_url, '') <> ''))[1] AS beatport_url,
+      (array_agg(soundcloud_url ORDER BY dup_rank) FILTER (WHERE COALESCE(soundcloud_url, '') <> ''))[1] AS soundcloud_url,
+      (array_agg(youtube_url ORDER BY dup_rank) FILTER (WHERE COALESCE(youtube_url, '') <> ''))[1] AS youtube_url,
+      (array_agg(release_year ORDER BY dup_rank) FILTER (WHERE COALESCE(release_year, 0) <> 0))[1] AS release_year,
+      (array_agg(isrc ORDER BY dup_rank) FILTER (WHERE COALESCE(isrc, '') <> ''))[1] AS isrc,
+      (array_agg(artwork_url ORDER BY dup_rank) FILTER (WHERE COALESCE(artwork_url, '') <> ''))[1] AS artwork_url,
+      (array_agg(duration_seconds ORDER BY dup_rank) FILTER (WHERE COALESCE(duration_seconds, 0) <> 0))[1] AS duration_seconds,
+      sum(COALESCE(times_played, 0)) AS plays
+    FROM cleanup_track_merges
+    GROUP BY canonical_id
+  ) f
+  WHERE t.id = f.canonical_id;
+
+  DELETE FROM tracks t
+  USING cleanup_track_merges m
+  WHERE t.id = m.dup_id;
+  GET DIAGNOSTICS v_merged = ROW_COUNT;
+
+  RETURN jsonb_build_object('duplicates_found', v_found, 'tracks_merged', v_merged);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================
+-- 3. SET DEDUP
+-- Sets sharing an external_id or a (name, artist) match key are clustered
+-- transitively: every set starts as its own component and repeatedly takes
+-- the smallest component label in either of its groups until nothing
+-- changes. The canonical set has the most tracks, then is the oldest.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION cleanup_dedup_sets(dry_run BOOLEAN DEFAULT FALSE)
+RETURNS JSONB AS $$
+DECLARE
+  v_found INTEGER;
+  v_merged INTEGER;
+BEGIN
+  DROP TABLE IF EXISTS cleanup_set_nodes;
+  CREATE TEMP TABLE cleanup_set_nodes ON COMMIT DROP AS
+  SELECT
+    id,
+    id::TEXT AS component,
+    COALESCE('x:' || NULLIF(external_id, ''), 'id:' || id) AS external_group,
+    CASE WHEN cleanup_match_key(name) <> ''
+      THEN 'n:' || cleanup_match_key(name) || chr(31) || cleanup_match_key(artist_name)
+      ELSE 'id:' || id
+    END AS name_group
+  FROM sets;
+
+  -- Sets alone in both of their groups can't be duplicates
+  DELETE FROM cleanup_set_nodes n
+  USING (
+    SELECT id,
+           count(*) OVER (PARTITION BY external_group) AS external_size,
+           count(*) OVER (PARTITION BY name_group) AS name_size
+    FROM cleanup_set_nodes
+  ) g
+  WHERE n.id = g.id AND g.external_size = 1 AND g.name_size = 1;
+
+  LOOP
+    UPDATE cleanup_set_nodes n
+    SET component = p.component
+    FROM (
+      SELECT id, least(min(component) OVER (PARTITION BY external_group),
+                       min(component) OVER (PARTITION BY name_group)) AS component
+      FROM cleanup_set_nodes
+    ) p
+    WHERE n.id = p.id AND p.component < n.component;
+    EXIT WHEN NOT FOUND;
+  END LOOP;
+
+  DROP TABLE IF EXISTS cleanup_set_merges;
+  CREATE TEMP TABLE cleanup_set_merges ON COMMIT DROP AS
+  SELECT dup_id, canonical_id
+  FROM (
+    SELECT
+      s.id AS dup_id,
+      row_number() OVER w AS dup_rank,
+      first_value(s.id) OVER w AS canonical_id
+    FROM cleanup_set_nodes n
+    JOIN sets s ON s.id = n.id
+    WINDOW w AS (PARTITION BY n.component
+                 ORDER BY COALESCE(s.tracks_count, 0) DESC, s.created_at NULLS FIRST, s.id)
+  ) ranked
+  WHERE dup_rank > 1;
+
+  SELECT count(*) INTO v_found FROM cleanup_set_merges;
+  IF dry_run OR v_found = 0 THEN
+    RETURN jsonb_build_object('duplicates_found', v_found, 'sets_merged', 0);
+  END IF;
+
+  -- Cascade would handle this, but be explicit to avoid orphans
+  DELETE FROM set_tracks st
+  USING cleanup_set_merges m
+  WHERE st.set_id = m.dup_id;
+
+  DELETE FROM sets s
+  USING cleanup_set_merges m
+  WHERE s.id = m.dup_id;
+  GET DIAGNOSTICS v_merged = ROW_COUNT;
+
+  RETURN jsonb_build_object('duplicates_found', v_found, 'sets_merged', v_merged);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================
+-- 4. DENORMALIZED COUNTS
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION cleanup_update_counts(dry_run BOOLEAN DEFAULT FALSE)
+RETURNS JSONB AS $$
+DECLARE
+  v_updated INTEGER;
+BEGIN
+  DROP TABLE IF EXISTS cleanup_count_fixes;
+  CREATE TEMP TABLE cleanup_count_fixes ON COMMIT DROP AS
+  SELECT a.id, COALESCE(t.n, 0) AS tracks_count, COALESCE(s.n, 0) AS sets_count
+  FROM artists a
+  LEFT JOIN (SELECT artist_id, count(*) AS n FROM tracks WHERE artist_id IS NOT NULL GROUP BY artist_id) t
+    ON t.artist_id = a.id
+  LEFT JOIN (SELECT artist_id, count(*) AS n FROM sets WHERE artist_id IS NOT NULL GROUP BY artist_id) s
+    ON s.artist_id = a.id
+  WHERE COALESCE(a.tracks_count, 0) <> COALESCE(t.n, 0)
+     OR COALESCE(a.sets_count, 0) <> COALESCE(s.n, 0);
+
+  SELECT count(*) INTO v_updated FROM cleanup_count_fixes;
+  IF NOT dry_run AND v_updated > 0 THEN
+    UPDATE artists a
+    SET tracks_count = f.tracks_count, sets_count = f.sets_count
+    FROM cleanup_count_fixes f
+    WHERE a.id = f.id;
+  END IF;
+
+  RETURN jsonb_build_object('counts_updated', v_updated);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Service role only: these rewrite the catalog
+REVOKE EXECUTE ON FUNCTION cleanup_dedup_artists(BOOLEAN) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION cleanup_dedup_tracks(BOOLEAN) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION cleanup_dedup_sets(BOOLEAN) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION cleanup_update_counts(BOOLEAN) FROM PUBLIC;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+    REVOKE EXECUTE ON FUNCTION cleanup_dedup_artists(BOOLEAN) FROM anon, authenticated;
+    REVOKE EXECUTE ON FUNCTION cleanup_dedup_tracks(BOOLEAN) FROM anon, authenticated;
+    REVOKE EXECUTE ON FUNCTION cleanup_dedup_sets(BOOLEAN) FROM anon, authenticated;
+    REVOKE EXECUTE ON FUNCTION cleanup_update_counts(BOOLEAN) FROM anon, authenticated;
+  END IF;
+END $$;
@@ -0,0 +1,130 @@
+-- Delta-maintained artist counts for scripts/daily_db_cleanup.py
+-- Safe, forward-only migration. Adds a journal table and one function, and
+-- redefines cleanup_update_counts() (029) to consume the journal.
+--
+-- The import path (scripts/daily_house_sync.py) and the cleanup merges record
+-- what they changed as per-artist deltas to tracks_count / sets_count. The
+-- daily cleanup applies only those deltas instead of recounting every artist;
+-- a full recount still runs with every full rescan to catch drift from
+-- writers that don't journal (the app, the TS seed scripts).
+
+-- ============================================================
+-- DELTA JOURNAL
+-- No foreign key: deltas for an artist merged away in the meantime are
+-- dropped on apply (the merge re-journals the rows it moved).
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS artist_count_deltas (
+  id BIGSERIAL PRIMARY KEY,
+  artist_id UUID NOT NULL,
+  tracks_delta INTEGER NOT NULL DEFAULT 0,
+  sets_delta INTEGER NOT NULL DEFAULT 0,
+  source TEXT,                          -- "house_sync", "cleanup", ...
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE artist_count_deltas ENABLE ROW LEVEL SECURITY;
+
+-- ============================================================
+-- APPLY
+-- Consumes the journal and `extra` (deltas not journaled yet, as
+-- [{"artist_id", "tracks_delta", "sets_delta"}]) and updates every affected
+-- artist in one statement. The DELETE ... RETURNING and the UPDATE share one
+-- snapshot, so a delta committed concurrently is either applied and removed
+-- here or left for the next run, never both or neither.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION apply_artist_count_deltas(extra JSONB DEFAULT '[]', dry_run BOOLEAN DEFAULT FALSE)
+RETURNS JSONB AS $$
+DECLARE
+  v_deltas INTEGER;
+  v_updated INTEGER;
+BEGIN
+  IF dry_run THEN
+    WITH incoming AS (
+      SELECT artist_id, tracks_delta, sets_delta FROM artist_count_deltas
+      UNION ALL
+      SELECT artist_id, COALESCE(tracks_delta, 0), COALESCE(sets_delta, 0)
+      FROM jsonb_to_recordset(COALESCE(extra, '[]')) AS d(artist_id UUID, tracks_delta INTEGER, sets_delta INTEGER)
+    ), net AS (
+      SELECT artist_id FROM incoming
+      GROUP BY artist_id
+      HAVING sum(tracks_delta) <> 0 OR sum(sets_delta) <> 0
+    )
+    SELECT (SELECT count(*) FROM incoming),
+           (SELECT count(*) FROM net JOIN artists a ON a.id = net.artist_id)
+    INTO v_deltas, v_updated;
+  ELSE
+    WITH consumed AS (
+      DELETE FROM artist_count_deltas RETURNING artist_id, tracks_delta, sets_delta
+    ), incoming AS (
+      SELECT artist_id, tracks_delta, sets_delta FROM consumed
+      UNION ALL
+      SELECT artist_id, COALESCE(tracks_delta, 0), COALESCE(sets_delta, 0)
+      FROM jsonb_to_recordset(COALESCE(extra, '[]')) AS d(artist_id UUID, tracks_delta INTEGER, sets_delta INTEGER)
+    ), net AS (
+      SELECT artist_id, sum(tracks_delta) AS tracks_delta, sum(sets_delta) AS sets_delta
+      FROM incoming
+      GROUP BY artist_id
+      HAVING sum(tracks_delta) <> 0 OR sum(sets_delta) <> 0
+    ), updated AS (
+      UPDATE artists a
+      SET tracks_count = GREATEST(0, COALESCE(a.tracks_count, 0) + net.tracks_delta),
+          sets_count = GREATEST(0, COALESCE(a.sets_count, 0) + net.sets_delta)
+      FROM net
+      WHERE a.id = net.artist_id
+      RETURNING a.id
+    )
+    SELECT (SELECT count(*) FROM incoming), (SELECT count(*) FROM updated)
+    INTO v_deltas, v_updated;
+  END IF;
+
+  RETURN jsonb_build_object('counts_updated', v_updated, 'deltas_applied', v_deltas);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================
+-- FULL RECOUNT (--engine sql)
+-- As in 029, but a recount supersedes every journaled delta. The journal is
+-- cleared and the tables recounted by one statement, so both see the same
+-- snapshot: a delta committed after it stays in the journal and its rows
+-- aren't counted, whatever the isolation level the function is called at.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION cleanup_update_counts(dry_run BOOLEAN DEFAULT FALSE)
+RETURNS JSONB AS $$
+DECLARE
+  v_updated INTEGER;
+BEGIN
+  WITH consumed AS (
+    DELETE FROM artist_count_deltas WHERE NOT dry_run
+  ), fixes AS (
+    SELECT a.id, COALESCE(t.n, 0) AS tracks_count, COALESCE(s.n, 0) AS sets_count
+    FROM artists a
+    LEFT JOIN (SELECT artist_id, count(*) AS n FROM tracks WHERE artist_id IS NOT NULL GROUP BY artist_id) t
+      ON t.artist_id = a.id
+    LEFT JOIN (SELECT artist_id, count(*) AS n FROM sets WHERE artist_id IS NOT NULL GROUP BY artist_id) s
+      ON s.artist_id = a.id
+    WHERE COALESCE(a.tracks_count, 0) <> COALESCE(t.n, 0)
+       OR COALESCE(a.sets_count, 0) <> COALESCE(s.n, 0)
+  ), updated AS (
+    UPDATE artists a
+    SET tracks_count = f.tracks_count, sets_count = f.sets_count
+    FROM fixes f
+    WHERE a.id = f.id AND NOT dry_run
+  )
+  SELECT count(*) INTO v_updated FROM fixes;
+
+  RETURN jsonb_build_object('counts_updated', v_updated);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Service role only
+REVOKE EXECUTE ON FUNCTION apply_artist_count_deltas(JSONB, BOOLEAN) FROM PUBLIC;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+    REVOKE EXECUTE ON FUNCTION apply_artist_count_deltas(JSONB, BOOLEAN) FROM anon, authenticated;
+  END IF;
+END $$;
@@ -0,0 +1,30 @@
+-- Incremental fuzzy candidate lookup for scripts/daily_db_cleanup.py
+-- Safe, forward-only migration. No destructive changes.
+--
+-- Incremental runs of the fuzzy near-duplicate phase fetch only the changed
+-- rows plus the rows containing one of their q-grams, with LIKE '%gram%'
+-- filters on the normalized keys. Trigram indexes keep those lookups off a
+-- sequential scan.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- ============================================================
+-- NORMALIZED ARTIST NAME ON TRACKS
+-- Same expression as artists.name_normalized (027).
+-- ============================================================
+
+ALTER TABLE tracks ADD COLUMN IF NOT EXISTS artist_name_normalized TEXT
+  GENERATED ALWAYS AS (
+    btrim(regexp_replace(regexp_replace(lower(artist_name), '[^\w\s]', '', 'g'), '\s+', ' ', 'g'))
+  ) STORED;
+
+-- ============================================================
+-- TRIGRAM INDEXES
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_artists_name_normalized_trgm
+  ON artists USING gin (name_normalized gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_tracks_title_normalized_trgm
+  ON tracks USING gin (title_normalized gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_tracks_artist_name_normalized_trgm
+  ON tracks USING gin (artist_name_normalized gin_trgm_ops);